@@ -0,0 +1,129 @@
+import json
+import os
+import sys
+
+from dotenv import load_dotenv
+from sse_starlette.sse import EventSourceResponse
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+from src.entity.artifact_entity import AnswerTimingArtifact
+from src.exception import CustomException
+from src.logger import get_logger
+from src.pipeline.qa_service import QAService, UploadedFile
+from src.telemetry import telemetry
+from src.utils import validate_namespace
+
+# Load environment variables
+load_dotenv()
+
+logger = get_logger(__name__)
+qa_service = QAService()
+
+
+async def get_question(request: Request):
+    if request.method == "GET":
+        params = request.query_params
+        # repeated ?document_ids=...&document_ids=... parameters
+        document_ids = params.getlist("document_ids") or None
+    else:
+        params = await request.json()
+        document_ids = params.get("document_ids")
+    return params.get("question"), params.get("namespace"), params.get("conversation_id"), document_ids
+
+
+def invalid_namespace(namespace):
+    try:
+        validate_namespace(namespace)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return None
+
+
+def invalid_document_ids(document_ids):
+    if document_ids is None or (isinstance(document_ids, list)
+                                and all(isinstance(document_id, str) for document_id in document_ids)):
+        return None
+    return JSONResponse({"error": "document_ids must be a list of strings"}, status_code=400)
+
+
+async def health(request: Request):
+    return JSONResponse({"status": "ok"})
+
+
+async def metrics(request: Request):
+    # Prometheus text exposition format
+    return PlainTextResponse(telemetry.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+async def ingest(request: Request):
+    form = await request.form()
+    uploads = [upload for upload in form.getlist("files") if hasattr(upload, "filename")]
+    if not uploads:
+        return JSONResponse({"error": "no files uploaded in the 'files' field"}, status_code=400)
+    namespace = form.get("namespace")
+    if error := invalid_namespace(namespace):
+        return error
+
+    try:
+        files = [UploadedFile(upload.filename, upload.file) for upload in uploads]
+        file_handler_artifact = await qa_service.ingest(files, namespace=namespace,
+                                                        session_id=form.get("session_id"))
+        return JSONResponse({"ingested": [os.path.basename(path) for path in file_handler_artifact.file_paths],
+                             "skipped": file_handler_artifact.skipped_files,
+                             # pass back as document_ids to ask about this batch only
+                             "document_ids": file_handler_artifact.document_ids})
+    finally:
+        await form.close()
+
+
+async def ask(request: Request):
+    question, namespace, conversation_id, document_ids = await get_question(request)
+    if not question:
+        return JSONResponse({"error": "question is required"}, status_code=400)
+    if error := invalid_namespace(namespace) or invalid_document_ids(document_ids):
+        return error
+
+    answer, timing = await qa_service.answer(question, namespace, conversation_id, document_ids)
+    return JSONResponse({"answer": answer,
+                         "time_to_first_token": timing.time_to_first_token,
+                         "total_latency": timing.total_latency})
+
+
+async def ask_stream(request: Request):
+    question, namespace, conversation_id, document_ids = await get_question(request)
+    if not question:
+        return JSONResponse({"error": "question is required"}, status_code=400)
+    if error := invalid_namespace(namespace) or invalid_document_ids(document_ids):
+        return error
+
+    async def events():
+        timing = AnswerTimingArtifact()
+        try:
+            async for chunk in qa_service.stream_answer(question, namespace, timing, conversation_id,
+                                                        document_ids):
+                yield {"event": "token", "data": chunk}
+            yield {"event": "done", "data": json.dumps({"time_to_first_token": timing.time_to_first_token,
+                                                        "total_latency": timing.total_latency})}
+        except Exception as e:
+            logger.error(str(CustomException(e, sys)))
+            yield {"event": "error", "data": "failed to answer the question"}
+
+    return EventSourceResponse(events())
+
+
+app = Starlette(routes=[
+    Route("/health", health, methods=["GET"]),
+    Route("/metrics", metrics, methods=["GET"]),
+    Route("/ingest", ingest, methods=["POST"]),
+    Route("/ask", ask, methods=["POST"]),
+    Route("/ask/stream", ask_stream, methods=["GET", "POST"]),
+])
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="0.0.0.0", port=8000)
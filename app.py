@@ -7,6 +7,7 @@ from src.utils.chatbot_utils import *
 from src.utils import delete_folder
 from dotenv import load_dotenv
 from src.exception import CustomException
+from src.entity.artifact_entity import AnswerTimingArtifact
 
 
 st.header("💬 Chat with DocChat Bot")
@@ -20,14 +21,18 @@ def form_bot(doc_chain):
             with st.chat_message("user"):
                 st.markdown(query)
 
-            # Process query and append assistant's response
-            with st.spinner("Thinking..."):
-                response = doc_chain.invoke(query)  # Process the query
-
-                # Append assistant's response to session state messages
-                st.session_state.messages.append({"role": "assistant", "content": response})
-                with st.chat_message("assistant"):
-                    st.markdown(response)
+            # Stream the assistant's response into the chat message as tokens arrive
+            timing = AnswerTimingArtifact()
+            with st.chat_message("assistant"):
+                response = st.write_stream(QAPipeline.stream_answer(query, doc_chain, timing,
+                                                                      st.session_state.conversation_id,
+                                                                      st.session_state.get("document_ids")))
+                st.caption(f"First token {timing.time_to_first_token or 0:.2f}s · total {timing.total_latency or 0:.2f}s")
+
+            # Append assistant's response to session state messages
+            st.session_state.messages.append({"role": "assistant", "content": response,
+                                              "time_to_first_token": timing.time_to_first_token,
+                                              "total_latency": timing.total_latency})
     except Exception as e:
         raise CustomException(e, sys)
 
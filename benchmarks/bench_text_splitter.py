@@ -0,0 +1,90 @@
+"""
+Chunks/sec of OffsetTextSplitter vs RecursiveCharacterTextSplitter on large PDFs.
+
+    python -m benchmarks.bench_text_splitter --pages 2000
+    python -m benchmarks.bench_text_splitter --pdf path/to/file.pdf --json
+
+Pages are parsed once up front, so only splitting is timed. The run fails if the
+two splitters do not return the same chunks.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from benchmarks.synthetic_pdf import write_pdf
+from src.components.data_transformation import DataTransformation, iter_pdf_pages
+from src.constant import CHUNK_OVERLAP, CHUNK_SIZE
+
+
+def time_splitter(splitter, pages, repeat: int):
+    best, documents = None, None
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        documents = splitter.split_documents(pages)
+        elapsed = time.perf_counter() - started_at
+        best = elapsed if best is None else min(best, elapsed)
+    return best, documents
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", nargs="*", default=[], help="PDFs to split; a synthetic one is used if omitted")
+    parser.add_argument("--pages", type=int, default=1000, help="pages of the synthetic PDF")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--chunk-overlap", type=int, default=CHUNK_OVERLAP)
+    parser.add_argument("--repeat", type=int, default=3, help="best of N runs is reported")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_paths = args.pdf or [write_pdf(os.path.join(tmp_dir, "synthetic.pdf"), args.pages)]
+        pages = [page for pdf_path in pdf_paths for page in iter_pdf_pages(pdf_path)]
+
+    characters = sum(len(page.page_content) for page in pages)
+    splitters = {
+        "recursive_character": RecursiveCharacterTextSplitter(chunk_size=args.chunk_size,
+                                                              chunk_overlap=args.chunk_overlap,
+                                                              separators=["\n\n", "\n", " ", ""]),
+        "offset": DataTransformation.get_splitter(args.chunk_size, args.chunk_overlap),
+    }
+
+    results, outputs = {}, {}
+    for name, splitter in splitters.items():
+        elapsed, documents = time_splitter(splitter, pages, args.repeat)
+        outputs[name] = documents
+        results[name] = {
+            "seconds": round(elapsed, 4),
+            "chunks": len(documents),
+            "chunks_per_sec": round(len(documents) / elapsed, 1),
+            "mb_per_sec": round(characters / elapsed / 1e6, 2),
+        }
+
+    identical = outputs["recursive_character"] == outputs["offset"]
+    report = {
+        "pages": len(pages),
+        "characters": characters,
+        "chunk_size": args.chunk_size,
+        "chunk_overlap": args.chunk_overlap,
+        "identical_output": identical,
+        "speedup": round(results["recursive_character"]["seconds"] / results["offset"]["seconds"], 2),
+        "splitters": results,
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{len(pages)} pages, {characters:,} characters, chunk size {args.chunk_size}/{args.chunk_overlap}")
+        for name, result in results.items():
+            print(f"  {name:<20} {result['seconds']:>8.3f}s  {result['chunks']:>8} chunks  "
+                  f"{result['chunks_per_sec']:>10,.0f} chunks/s  {result['mb_per_sec']:>6.2f} MB/s")
+        print(f"  speedup {report['speedup']}x, identical output: {identical}")
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
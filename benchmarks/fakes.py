@@ -0,0 +1,85 @@
+import time
+import zlib
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Deterministic bag-of-words embeddings: every token is hashed into one of
+    ``dimension`` buckets, so texts sharing words get similar vectors.
+    ``latency`` seconds are added per request to stand in for the API round trip.
+    """
+
+    def __init__(self, dimension: int = 256, latency: float = 0.0):
+        self.dimension = dimension
+        self.latency = latency
+        self.model = f"fake-embeddings-{dimension}"
+        self.requests = 0
+        self._buckets: Dict[str, int] = {}
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for token in text.lower().split():
+            bucket = self._buckets.get(token)
+            if bucket is None:
+                bucket = self._buckets[token] = zlib.crc32(token.encode("utf-8")) % self.dimension
+            vector[bucket] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model answering with the first ``answer_words`` words of the prompt context.
+
+    ``latency`` is the time to the first token and ``token_latency`` the delay between
+    streamed tokens, so streaming and batching behave like a remote model.
+    """
+
+    latency: float = 0.05
+    token_latency: float = 0.0
+    answer_words: int = 40
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _answer_tokens(self, messages: List[BaseMessage]) -> List[str]:
+        prompt = messages[-1].content if messages else ""
+        context = prompt.split("Context:", 1)[-1]
+        words = context.split()[:self.answer_words] or ["I", "don't", "know."]
+        return [word + " " for word in words]
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        tokens = self._answer_tokens(messages)
+        time.sleep(self.latency + self.token_latency * len(tokens))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None,
+                **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency)
+        for i, token in enumerate(self._answer_tokens(messages)):
+            if i and self.token_latency:
+                time.sleep(self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
@@ -0,0 +1,263 @@
+"""
+Offline benchmarks for ingestion and QA; no OpenAI or Pinecone calls are made.
+
+    python -m benchmarks.run_benchmarks --files 4 --pages 100 --output results.json
+    python -m benchmarks.run_benchmarks --baseline results.json --tolerance 0.2
+
+Synthetic PDFs are ingested with deterministic fake embeddings into the in-process
+"memory" vector store, and questions are answered by a fake chat model with
+configurable latency. Every stage runs in a fresh working directory and reports wall
+time, throughput, peak RSS and allocation counts as JSON. With ``--baseline`` the
+exit code is 1 when a stage got slower than the baseline by more than ``--tolerance``.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List
+
+# must be set before src is imported: the backend and cache settings are read at import time
+os.environ["VECTOR_STORE_BACKEND"] = "memory"
+os.environ["ANSWER_CACHE_ENABLED"] = "false"
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+
+from benchmarks.fakes import FakeChatModel, FakeEmbeddings  # noqa: E402
+from benchmarks.synthetic_pdf import WORDS, write_pdf  # noqa: E402
+from src.components.data_transformation import DataTransformation  # noqa: E402
+from src.components.qa_chain_formation import QAFormatter  # noqa: E402
+from src.components.vector_ingestion import VectorIngestion  # noqa: E402
+from src.constant import PINECONE_INDEX_NAME  # noqa: E402
+from src.embedding_cache import CachedEmbeddings  # noqa: E402
+from src.entity.artifact_entity import FileHandlerArtifact  # noqa: E402
+from src.entity.config_entity import DataTransformationConfig  # noqa: E402
+from src.pipeline.qa_pipeline import QAPipeline  # noqa: E402
+from src.pipeline.qa_service import UploadedFile  # noqa: E402
+from src.utils.registry import resource_registry  # noqa: E402
+from src.vector_db_connection import VectorStore  # noqa: E402
+
+
+def reset_peak_rss() -> bool:
+    # Linux only: writing 5 to clear_refs resets VmHWM, so each stage gets its own peak
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # process lifetime peak; kilobytes on Linux, bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def reset_vector_store():
+    resource_registry.invalidate(prefix="memory-index")
+    resource_registry.invalidate(prefix="memory-record-manager")
+    resource_registry.invalidate(prefix="memory-lexical-index")
+
+
+def run_stage(name: str, func: Callable[[], Dict], trace_allocations: bool) -> Dict:
+    """Runs ``func`` once and returns its counters plus time, memory and allocation figures."""
+    gc.collect()
+    rss_reset = reset_peak_rss()
+    collections_before = sum(stat["collections"] for stat in gc.get_stats())
+    blocks_before = sys.getallocatedblocks()
+    if trace_allocations:
+        tracemalloc.start()
+
+    started_at = time.perf_counter()
+    counters = func() or {}
+    elapsed = time.perf_counter() - started_at
+
+    result = {"wall_seconds": round(elapsed, 4)}
+    for unit, count in counters.items():
+        result[unit] = count
+        if isinstance(count, int) and unit in ("pages", "chunks", "questions", "files"):
+            result[f"{unit}_per_sec"] = round(count / elapsed, 2) if elapsed else None
+    if trace_allocations:
+        traced_current, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["traced_peak_mb"] = round(traced_peak / 1e6, 2)
+    result["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    result["peak_rss_is_process_lifetime"] = not rss_reset
+    result["gc_collections"] = sum(stat["collections"] for stat in gc.get_stats()) - collections_before
+    result["allocated_blocks_delta"] = sys.getallocatedblocks() - blocks_before
+    print(f"  {name:<28} {elapsed:>8.3f}s", file=sys.stderr)
+    return result
+
+
+def make_questions(count: int) -> List[str]:
+    return [f"What does the document say about {WORDS[i % len(WORDS)]} and {WORDS[(i * 7 + 3) % len(WORDS)]}?"
+            for i in range(count)]
+
+
+def index_size() -> int:
+    return VectorStore(PINECONE_INDEX_NAME).get_memory_index().count
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=4, help="synthetic PDFs to ingest")
+    parser.add_argument("--pages", type=int, default=50, help="pages per synthetic PDF")
+    parser.add_argument("--lines-per-page", type=int, default=60)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--qa-concurrency", type=int, default=4, help="max_concurrency of the batched QA stage")
+    parser.add_argument("--embedding-dimension", type=int, default=256)
+    parser.add_argument("--embedding-latency", type=float, default=0.0, help="seconds per embedding request")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds to the first token")
+    parser.add_argument("--llm-token-latency", type=float, default=0.0, help="seconds between streamed tokens")
+    parser.add_argument("--no-streaming", dest="streaming", action="store_false",
+                        help="run the end-to-end stage without streaming ingestion")
+    parser.add_argument("--embedding-cache", action="store_true",
+                        help="wrap the fake embeddings in the on-disk embedding cache, as in production")
+    parser.add_argument("--trace-allocations", action="store_true",
+                        help="also report tracemalloc peaks (slows every stage down)")
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    parser.add_argument("--baseline", help="JSON report to compare wall times against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown against the baseline")
+    args = parser.parse_args(argv)
+
+    root_dir = os.getcwd()
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "git_commit": subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                         text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip(),
+            "parameters": vars(args),
+        },
+        "stages": {},
+    }
+    stages = report["stages"]
+
+    with tempfile.TemporaryDirectory(prefix="rag-bench-") as work_dir:
+        pdf_dir = os.path.join(work_dir, "pdfs")
+        os.makedirs(pdf_dir)
+        pdf_paths = [write_pdf(os.path.join(pdf_dir, f"synthetic-{i}.pdf"), args.pages,
+                               lines_per_page=args.lines_per_page, seed=i)
+                     for i in range(args.files)]
+        total_pages = args.files * args.pages
+
+        def fresh_stage_dir(name: str):
+            # artifacts (file storage, registries, record managers) live under the working directory
+            stage_dir = os.path.join(work_dir, name)
+            os.makedirs(stage_dir)
+            os.chdir(stage_dir)
+            reset_vector_store()
+
+        def embeddings():
+            fake = FakeEmbeddings(args.embedding_dimension, latency=args.embedding_latency)
+            return CachedEmbeddings(fake) if args.embedding_cache else fake
+
+        try:
+            fresh_stage_dir("transform")
+            artifacts = []
+
+            def transform():
+                data_transformation = DataTransformation(FileHandlerArtifact(file_storage_dir=pdf_dir),
+                                                         DataTransformationConfig())
+                artifacts.extend(data_transformation.transform_data())
+                return {"files": len(pdf_paths), "pages": total_pages,
+                        "chunks": sum(len(artifact.documents) for artifact in artifacts)}
+
+            stages["transform_data"] = run_stage("transform_data", transform, args.trace_allocations)
+
+            fresh_stage_dir("vector_ingestion")
+
+            def vector_ingestion():
+                result = VectorIngestion(artifacts).ingest_data_to_vectordb(embeddings=embeddings())
+                return {"chunks": index_size(), **result}
+
+            stages["ingest_data_to_vectordb"] = run_stage("ingest_data_to_vectordb", vector_ingestion,
+                                                          args.trace_allocations)
+            del artifacts[:]
+
+            fresh_stage_dir("end_to_end")
+            QAPipeline.embedding_function = embeddings()
+
+            def processing_documents():
+                files = [UploadedFile(os.path.basename(path), open(path, "rb")) for path in pdf_paths]
+                try:
+                    QAPipeline(files=files).start_processing_documents(streaming=args.streaming)
+                finally:
+                    for file in files:
+                        file.file.close()
+                return {"files": len(files), "pages": total_pages, "chunks": index_size()}
+
+            stages["start_processing_documents"] = run_stage("start_processing_documents", processing_documents,
+                                                             args.trace_allocations)
+
+            # QA runs against the index built by the end-to-end stage
+            llm = FakeChatModel(latency=args.llm_latency, token_latency=args.llm_token_latency)
+            qa_chain = QAFormatter(llm=llm).form_qa_chain(embeddings=QAPipeline.embedding_function)
+            questions = make_questions(args.questions)
+
+            def qa_stream():
+                first_token, total = [], []
+                for question in questions:
+                    started_at = time.perf_counter()
+                    for i, _ in enumerate(qa_chain.stream(question)):
+                        if i == 0:
+                            first_token.append(time.perf_counter() - started_at)
+                    total.append(time.perf_counter() - started_at)
+                return {
+                    "questions": len(questions),
+                    "time_to_first_token_p50": round(statistics.median(first_token), 4),
+                    "latency_p50": round(statistics.median(total), 4),
+                    "latency_p95": round(sorted(total)[max(0, int(len(total) * 0.95) - 1)], 4),
+                }
+
+            stages["qa_chain_stream"] = run_stage("qa_chain_stream", qa_stream, args.trace_allocations)
+
+            def qa_batch():
+                qa_chain.batch(questions, config={"max_concurrency": args.qa_concurrency})
+                return {"questions": len(questions)}
+
+            stages["qa_chain_batch"] = run_stage("qa_chain_batch", qa_batch, args.trace_allocations)
+
+        finally:
+            os.chdir(root_dir)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(output + "\n")
+    else:
+        print(output)
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)["stages"]
+    regressions = 0
+    for name, result in stages.items():
+        if name not in baseline or not baseline[name]["wall_seconds"]:
+            continue
+        ratio = result["wall_seconds"] / baseline[name]["wall_seconds"]
+        regressed = ratio > 1 + args.tolerance
+        regressions += regressed
+        print(f"  {name:<28} {ratio:>6.2f}x baseline{'  REGRESSION' if regressed else ''}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
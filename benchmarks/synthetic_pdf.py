@@ -0,0 +1,62 @@
+import random
+from typing import List
+
+WORDS = ("retrieval augmented generation document chunk vector index embedding query answer "
+         "context model latency throughput pinecone upload page section table figure summary "
+         "result method dataset evaluation baseline system performance memory batch stream").split()
+
+
+def make_page_lines(rng: random.Random, lines_per_page: int, words_per_line: int) -> List[str]:
+    lines = []
+    for _ in range(lines_per_page):
+        # blank lines give the splitter paragraph boundaries to work with
+        if rng.random() < 0.08:
+            lines.append("")
+            continue
+        lines.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(words_per_line // 2, words_per_line))))
+    return lines
+
+
+def write_pdf(path: str,
+              pages: int,
+              lines_per_page: int = 60,
+              words_per_line: int = 12,
+              seed: int = 0) -> str:
+    """
+    Writes a deterministic text-only PDF with ``pages`` pages, without any PDF library.
+    Objects are written one page at a time, so large files do not need to fit in memory.
+    """
+    rng = random.Random(seed)
+    offsets = []
+
+    with open(path, "wb") as pdf:
+        def write_object(number: int, body: bytes):
+            offsets.append((number, pdf.tell()))
+            pdf.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+
+        pdf.write(b"%PDF-1.4\n")
+        # 1: catalog, 2: page tree, 3: font, then a (page, content) object pair per page
+        page_numbers = [4 + 2 * i for i in range(pages)]
+        write_object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        kids = b" ".join(b"%d 0 R" % number for number in page_numbers)
+        write_object(2, b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % pages)
+        write_object(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+        for page_number in page_numbers:
+            text = [b"BT /F1 9 Tf 11 TL 40 800 Td"]
+            for line in make_page_lines(rng, lines_per_page, words_per_line):
+                text.append(b"(" + line.encode("latin-1") + b") Tj T*")
+            text.append(b"ET")
+            stream = b"\n".join(text)
+            write_object(page_number, b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                                      b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+                         % (page_number + 1))
+            write_object(page_number + 1, b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+        xref_offset = pdf.tell()
+        object_count = 4 + 2 * pages
+        pdf.write(b"xref\n0 %d\n0000000000 65535 f \n" % object_count)
+        for _, offset in sorted(offsets):
+            pdf.write(b"%010d 00000 n \n" % offset)
+        pdf.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (object_count, xref_offset))
+    return path
@@ -1,11 +1,10 @@
 import os
 import sys 
+import uuid
 import streamlit as st 
 from datetime import datetime
-from src.constant import ARTIFACT_DIR
 from src.pipeline.qa_pipeline import QAPipeline
 from src.utils.chatbot_utils import *
-from src.utils import delete_folder
 from dotenv import load_dotenv
 from src.exception import CustomException
 
@@ -25,37 +24,42 @@ time_now = datetime.now()
 # Ensure session state has a messages list initialized
 if "messages" not in st.session_state:
     st.session_state.messages = [{"role": "assistant", "content": "I am ready to use. Ask anything about the document."}]
+# tagged on the chunks this browser session uploads
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
 
 # Function to handle file upload and document processing
 def upload_files():
     st.header("📁 Upload Your Documents")
 
     # File uploader
-    uploaded_files = st.file_uploader("Upload a file", type=["pdf", "csv", "zip"],
-                                     accept_multiple_files=True)
+    # office documents are converted to PDF during ingestion
+    uploaded_files = st.file_uploader("Upload a file",
+                                      type=["pdf", "csv", "zip", "doc", "docx", "odt", "rtf",
+                                            "ppt", "pptx", "odp", "xls", "xlsx", "ods"],
+                                      accept_multiple_files=True)
     
-    for uploaded_file in uploaded_files:
+    if uploaded_files:
+        # Store the uploaded file names in session state
+        st.session_state["uploaded_file_name"] = ", ".join(file.name for file in uploaded_files)
 
-        if uploaded_file:
-            if os.path.exists(ARTIFACT_DIR):
-                # Delete the existing artifact folder to save space
-                delete_folder(ARTIFACT_DIR)
+        # Process the whole batch in one run; files that are already indexed are skipped
+        pipeline = QAPipeline(files=uploaded_files, session_id=st.session_state.session_id)
+        file_handler_artifact = pipeline.start_processing_documents()  # Ingest docs into vector store
+        # the chat only searches the documents of this upload, already indexed ones included
+        st.session_state.document_ids = file_handler_artifact.document_ids
 
-            # Store the uploaded file name in session state
-            st.session_state["uploaded_file_name"] = uploaded_file.name
+        for file_path in file_handler_artifact.file_paths:
+            st.success(f"{os.path.basename(file_path)} uploaded and processed successfully!")
+        for file_name in file_handler_artifact.skipped_files:
+            st.info(f"{file_name} is already indexed, skipped.")
 
-            # Initialize the pipeline and process the uploaded document
-            pipeline = QAPipeline(file=uploaded_file)
-            pipeline.start_processing_documents()  # Ingest docs into vector store
-
-            st.success(f"{uploaded_file.name} uploaded and processed successfully!")
-
-            # Clear previous messages when a new file is uploaded
+        if file_handler_artifact.file_paths:
+            # Clear previous messages when new files are uploaded
             st.session_state.messages = [{"role": "assistant",
                                         "content": "I am ready to use. Ask anything about the document."}]
-        else:
-            st.info("Please upload a file.")
-        
+    else:
+        st.info("Please upload a file.")
         
 if __name__ == "__main__":
     upload_files()
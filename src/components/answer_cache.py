@@ -0,0 +1,293 @@
+import asyncio
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from src.components.mmr_retriever import DOCUMENT_IDS_KEY, QUERY_EMBEDDING_KEY, QueryEmbedding, get_scope_key
+from src.entity.config_entity import AnswerCacheConfig
+from src.exception import CustomException
+from src.logger import get_logger
+from src.telemetry import telemetry
+from src.vector_db_connection.document_registry import DocumentVersionRegistry
+
+
+@dataclass
+class _CacheEntry:
+    answer: str
+    vector: Optional[np.ndarray]
+    created_at: float
+    scope: str = ""
+
+
+class AnswerCache:
+    """
+    Answer cache keyed on the normalised question and the indexed document versions.
+
+    ``lookup`` matches the normalised question exactly and needs no embedding, so it runs
+    before retrieval. ``lookup_similar`` then finds the most similar cached question
+    (cosine similarity of the query embeddings) above ``similarity_threshold``; it runs
+    after retrieval on the query embedding retrieval computed, so a question answered by
+    the lexical fast path is never embedded for the cache. Entries are evicted least recently used,
+    expire after ``ttl_seconds`` and are dropped as soon as the document version
+    fingerprint changes.
+
+    Answers are only served to questions asked with the same document ``scope`` (see
+    ``get_scope_key``), so an answer grounded in one document set never leaks into another.
+    """
+
+    def __init__(self,
+                 answer_cache_config: AnswerCacheConfig = None,
+                 version_registry: DocumentVersionRegistry = None):
+        self.answer_cache_config = answer_cache_config or AnswerCacheConfig()
+        self.version_registry = version_registry or DocumentVersionRegistry.open()
+        self.logger = get_logger(__name__)
+
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._fingerprint: Optional[str] = None
+        # scope -> (keys, normalised query vectors) of its entries
+        self._matrices: Dict[str, Tuple[List[str], np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def normalize(question: str) -> str:
+        question = re.sub(r"\s+", " ", question.strip().lower())
+        return question.rstrip("?!. ")
+
+    @staticmethod
+    def get_key(question: str, scope: str = "") -> str:
+        normalized = AnswerCache.normalize(question)
+        return f"{scope}:{normalized}" if scope else normalized
+
+    def _check_fingerprint(self):
+        fingerprint = self.version_registry.fingerprint()
+        if fingerprint != self._fingerprint:
+            if self._entries:
+                self.invalidations += 1
+                self.logger.info(f"Document versions changed, dropping {len(self._entries)} cached answers")
+            self._entries.clear()
+            self._matrices = {}
+            self._fingerprint = fingerprint
+
+    def _is_expired(self, entry: _CacheEntry) -> bool:
+        return time.time() - entry.created_at > self.answer_cache_config.ttl_seconds
+
+    @staticmethod
+    def _normalize_vector(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _similarity_matrix(self, scope: str = "") -> Tuple[List[str], np.ndarray]:
+        if scope not in self._matrices:
+            keys = [key for key, entry in self._entries.items() if entry.vector is not None and entry.scope == scope]
+            matrix = (np.stack([self._entries[key].vector for key in keys])
+                      if keys else np.zeros((0, 0), dtype=np.float32))
+            self._matrices[scope] = (keys, matrix)
+        return self._matrices[scope]
+
+    def lookup(self, question: str, scope: str = "") -> Optional[str]:
+        """
+        Returns the answer cached for exactly this (normalised) question, or None. A None
+        is not counted as a miss yet: follow up with ``lookup_similar``.
+        """
+        try:
+            key = self.get_key(question, scope)
+            with self._lock:
+                self._check_fingerprint()
+                entry = self._entries.get(key)
+                if entry is not None and not self._is_expired(entry):
+                    self._entries.move_to_end(key)
+                    self.exact_hits += 1
+                    telemetry.record_cache("answer", hits=1)
+                    return entry.answer
+            return None
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def lookup_similar(self, embedding: Optional[List[float]],
+                       scope: str = "") -> Tuple[Optional[str], Optional[np.ndarray]]:
+        """
+        Returns ``(answer, query_vector)`` for the cached question most similar to the query
+        ``embedding``; the answer is None on a miss. Without an embedding (the question was
+        not embedded) this is a miss. Hand the query vector back to ``store``.
+        """
+        try:
+            vector = self._normalize_vector(embedding) if embedding is not None else None
+            with self._lock:
+                self._check_fingerprint()
+                keys, matrix = self._similarity_matrix(scope)
+                if vector is not None and len(keys):
+                    scores = matrix @ vector
+                    best = int(np.argmax(scores))
+                    entry = self._entries.get(keys[best])
+                    if (scores[best] >= self.answer_cache_config.similarity_threshold
+                            and entry is not None and not self._is_expired(entry)):
+                        self._entries.move_to_end(keys[best])
+                        self.semantic_hits += 1
+                        telemetry.record_cache("answer", hits=1)
+                        return entry.answer, vector
+
+                self.misses += 1
+                telemetry.record_cache("answer", misses=1)
+                return None, vector
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def store(self, question: str, answer: str, vector: Optional[np.ndarray] = None,
+              fingerprint: Optional[str] = None, scope: str = ""):
+        """
+        Caches ``answer`` for ``scope``. Pass the ``fingerprint`` seen before answering so an
+        answer produced while documents were being re-ingested is not cached as current.
+        Without a query ``vector`` the entry is only served to exact matches.
+        """
+        try:
+            key = self.get_key(question, scope)
+            with self._lock:
+                self._check_fingerprint()
+                if fingerprint is not None and fingerprint != self._fingerprint:
+                    return
+                self._entries[key] = _CacheEntry(answer=answer, vector=vector, created_at=time.time(), scope=scope)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.answer_cache_config.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+                self._matrices = {}
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrices = {}
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        hits = self.exact_hits + self.semantic_hits
+        lookups = hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+
+class CachedQAChain(Runnable[str, str]):
+    """
+    Puts an :class:`AnswerCache` in front of the generation step of a RAG chain.
+
+    An exact cache hit is returned before retrieval. Otherwise ``retrieval_chain``
+    (question -> context) runs with a shared :class:`QueryEmbedding` in the run metadata,
+    and the similar-question tier is checked with the vector it computed before
+    ``generation_chain`` ({"question", "context"} -> answer) is called. Supports
+    ``invoke``/``stream`` and their async variants; a cached answer is returned (or
+    streamed as a single chunk). Answers are cached per document scope (``document_ids``
+    in the run metadata).
+    """
+
+    def __init__(self, retrieval_chain: Runnable, generation_chain: Runnable, answer_cache: AnswerCache,
+                 embeddings: Embeddings):
+        self.retrieval_chain = retrieval_chain
+        self.generation_chain = generation_chain
+        self.answer_cache = answer_cache
+        self.embeddings = embeddings
+
+    @staticmethod
+    def get_scope(config: Optional[RunnableConfig]) -> str:
+        return get_scope_key(((config or {}).get("metadata") or {}).get(DOCUMENT_IDS_KEY))
+
+    def with_query_embedding(self, input: str,
+                             config: Optional[RunnableConfig]) -> Tuple[RunnableConfig, QueryEmbedding]:
+        query_embedding = QueryEmbedding(self.embeddings, input)
+        config = dict(config or {})
+        config["metadata"] = {**(config.get("metadata") or {}), QUERY_EMBEDDING_KEY: query_embedding}
+        return config, query_embedding
+
+    def invoke(self, input: str, config: Optional[RunnableConfig] = None, **kwargs: Any) -> str:
+        scope = self.get_scope(config)
+        answer = self.answer_cache.lookup(input, scope)
+        if answer is not None:
+            return answer
+        fingerprint = self.answer_cache.version_registry.fingerprint()
+        retrieval_config, query_embedding = self.with_query_embedding(input, config)
+        context = self.retrieval_chain.invoke(input, retrieval_config)
+        answer, vector = self.answer_cache.lookup_similar(query_embedding.vector, scope)
+        if answer is not None:
+            return answer
+        answer = self.generation_chain.invoke({"context": context, "question": input}, config, **kwargs)
+        self.answer_cache.store(input, answer, vector, fingerprint, scope)
+        return answer
+
+    def stream(self, input: str, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Iterator[str]:
+        scope = self.get_scope(config)
+        answer = self.answer_cache.lookup(input, scope)
+        if answer is not None:
+            yield answer
+            return
+        fingerprint = self.answer_cache.version_registry.fingerprint()
+        retrieval_config, query_embedding = self.with_query_embedding(input, config)
+        context = self.retrieval_chain.invoke(input, retrieval_config)
+        answer, vector = self.answer_cache.lookup_similar(query_embedding.vector, scope)
+        if answer is not None:
+            yield answer
+            return
+        chunks = []
+        for chunk in self.generation_chain.stream({"context": context, "question": input}, config, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+        self.answer_cache.store(input, "".join(chunks), vector, fingerprint, scope)
+
+    async def ainvoke(self, input: str, config: Optional[RunnableConfig] = None, **kwargs: Any) -> str:
+        scope = self.get_scope(config)
+        answer = await asyncio.to_thread(self.answer_cache.lookup, input, scope)
+        if answer is not None:
+            return answer
+        fingerprint = await asyncio.to_thread(self.answer_cache.version_registry.fingerprint)
+        retrieval_config, query_embedding = self.with_query_embedding(input, config)
+        context = await self.retrieval_chain.ainvoke(input, retrieval_config)
+        answer, vector = await asyncio.to_thread(self.answer_cache.lookup_similar, query_embedding.vector, scope)
+        if answer is not None:
+            return answer
+        answer = await self.generation_chain.ainvoke({"context": context, "question": input}, config, **kwargs)
+        await asyncio.to_thread(self.answer_cache.store, input, answer, vector, fingerprint, scope)
+        return answer
+
+    async def astream(self, input: str, config: Optional[RunnableConfig] = None,
+                      **kwargs: Any) -> AsyncIterator[str]:
+        scope = self.get_scope(config)
+        answer = await asyncio.to_thread(self.answer_cache.lookup, input, scope)
+        if answer is not None:
+            yield answer
+            return
+        fingerprint = await asyncio.to_thread(self.answer_cache.version_registry.fingerprint)
+        retrieval_config, query_embedding = self.with_query_embedding(input, config)
+        context = await self.retrieval_chain.ainvoke(input, retrieval_config)
+        answer, vector = await asyncio.to_thread(self.answer_cache.lookup_similar, query_embedding.vector, scope)
+        if answer is not None:
+            yield answer
+            return
+        chunks = []
+        async for chunk in self.generation_chain.astream({"context": context, "question": input}, config, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+        await asyncio.to_thread(self.answer_cache.store, input, "".join(chunks), vector, fingerprint, scope)
@@ -0,0 +1,184 @@
+import io
+import os
+import sys
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterator, List
+
+from langchain_core.documents import Document
+from pypdf import PdfReader
+
+from src.components.csv_loader import load_csv_member
+from src.components.text_splitter import OffsetTextSplitter
+from src.entity.config_entity import ArchiveConfig
+from src.exception import CustomException
+from src.logger import get_logger
+from src.telemetry import telemetry
+
+
+def is_archive(file_path: str) -> bool:
+    return file_path.lower().endswith(".zip")
+
+
+def load_pdf_member(data: bytes, source: str) -> List[Document]:
+    reader = PdfReader(io.BytesIO(data))
+    return [Document(page_content=page.extract_text(), metadata={"source": source, "page": page_number})
+            for page_number, page in enumerate(reader.pages)]
+
+
+def load_text_member(data: bytes, source: str) -> List[Document]:
+    return [Document(page_content=data.decode("utf-8", errors="replace"), metadata={"source": source, "page": 0})]
+
+
+# member extension -> loader turning the member bytes into page documents
+MEMBER_LOADERS: Dict[str, Callable[[bytes, str], List[Document]]] = {
+    ".pdf": load_pdf_member,
+    ".txt": load_text_member,
+    ".md": load_text_member,
+}
+
+
+# member extension -> loader producing retrieval-sized documents itself, given (bytes, source, chunk size, overlap)
+MEMBER_DOCUMENT_LOADERS: Dict[str, Callable[[bytes, str, int, int], List[Document]]] = {
+    ".csv": load_csv_member,
+}
+
+
+def get_extension(member_name: str) -> str:
+    return os.path.splitext(member_name)[1].lower()
+
+
+def is_supported_member(member_name: str) -> bool:
+    extension = get_extension(member_name)
+    return extension in MEMBER_LOADERS or extension in MEMBER_DOCUMENT_LOADERS
+
+
+def load_and_split_member(archive_path: str,
+                          member_name: str,
+                          max_member_bytes: int,
+                          chunk_size: int,
+                          chunk_overlap: int,
+                          archive_source: str = None) -> List[Document]:
+    """
+    Reads one member straight from the archive (nothing is extracted to disk), parses it
+    with the loader of its extension and splits it. Module level so it can be pickled
+    into the process pool; every worker opens the archive itself.
+    """
+    with zipfile.ZipFile(archive_path) as archive, archive.open(member_name) as member:
+        # the declared size was checked, but never trust it with an unbounded read
+        data = member.read(max_member_bytes + 1)
+    if len(data) > max_member_bytes:
+        raise ValueError(f"{member_name} in {archive_path} exceeds {max_member_bytes} bytes")
+    archive_source = archive_source or archive_path
+    source = os.path.join(archive_source, member_name)
+    extension = get_extension(member_name)
+    if extension in MEMBER_DOCUMENT_LOADERS:
+        documents = MEMBER_DOCUMENT_LOADERS[extension](data, source, chunk_size, chunk_overlap)
+    else:
+        splitter = OffsetTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        documents = splitter.split_documents(MEMBER_LOADERS[extension](data, source))
+    for document in documents:
+        document.metadata["archive"] = archive_source
+    return documents
+
+
+class ArchiveLoader:
+    """
+    Loads the supported members (pdf, txt, md, csv) of a ZIP archive.
+
+    The central directory is checked against the member count, size and compression
+    ratio limits before anything is decompressed, and the whole archive is rejected if
+    one is exceeded. Members are then read as streams and parsed in a process pool,
+    with a bounded window of members in flight; chunks are yielded in archive order.
+    Each member becomes its own source (``<archive source>/<member name>``).
+    """
+
+    def __init__(self,
+                 archive_path: str,
+                 chunk_size: int,
+                 chunk_overlap: int,
+                 archive_config: ArchiveConfig = None,
+                 source: str = None):
+        self.archive_path = archive_path
+        # the document path members are attributed to, when the bytes live elsewhere
+        self.source = source or archive_path
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.archive_config = archive_config or ArchiveConfig()
+        self.logger = get_logger(__name__)
+
+    def get_members(self) -> List[zipfile.ZipInfo]:
+        """Returns the members to load, in archive order, after checking the limits."""
+        config = self.archive_config
+        with zipfile.ZipFile(self.archive_path) as archive:
+            members = [info for info in archive.infolist() if not info.is_dir()]
+
+        if len(members) > config.max_members:
+            raise ValueError(f"{self.archive_path} has {len(members)} members, the limit is {config.max_members}")
+        total_size = sum(info.file_size for info in members)
+        total_compressed = sum(info.compress_size for info in members)
+        if total_size > config.max_total_bytes:
+            raise ValueError(f"{self.archive_path} expands to {total_size} bytes, "
+                             f"the limit is {config.max_total_bytes}")
+        if total_size > config.ratio_min_bytes and total_size / max(total_compressed, 1) > config.max_compression_ratio:
+            raise ValueError(f"{self.archive_path} has a compression ratio above {config.max_compression_ratio}")
+
+        supported = []
+        for info in members:
+            if info.file_size > config.max_member_bytes:
+                raise ValueError(f"{info.filename} in {self.archive_path} has {info.file_size} bytes, "
+                                 f"the limit is {config.max_member_bytes}")
+            if (info.file_size > config.ratio_min_bytes
+                    and info.file_size / max(info.compress_size, 1) > config.max_compression_ratio):
+                raise ValueError(f"{info.filename} in {self.archive_path} has a compression ratio above "
+                                 f"{config.max_compression_ratio}")
+            name = os.path.basename(info.filename)
+            if info.flag_bits & 0x1:
+                self.logger.warning(f"Skipping encrypted member {info.filename} of {self.archive_path}")
+            elif name.startswith(".") or info.filename.startswith("__MACOSX/"):
+                continue
+            elif not is_supported_member(info.filename):
+                self.logger.info(f"Skipping unsupported member {info.filename} of {self.archive_path}")
+            else:
+                supported.append(info)
+        return supported
+
+    def _member_chunks(self, future) -> List[Document]:
+        documents = future.result()
+        telemetry.record_chunks("split", len(documents))
+        return documents
+
+    def stream_documents(self) -> Iterator[Document]:
+        """Lazily yields the split documents of every supported member."""
+        try:
+            config = self.archive_config
+            with telemetry.span("archive_load", source=self.archive_path) as span:
+                members = self.get_members()
+                span.set(members=len(members))
+            self.logger.info(f"Loading {len(members)} members of {self.archive_path}")
+
+            arguments = [(self.archive_path, info.filename, config.max_member_bytes,
+                          self.chunk_size, self.chunk_overlap, self.source) for info in members]
+            if config.max_workers <= 1 or len(members) <= 1:
+                for member_arguments in arguments:
+                    documents = load_and_split_member(*member_arguments)
+                    telemetry.record_chunks("split", len(documents))
+                    yield from documents
+                return
+
+            # only a bounded window of members is decompressed and parsed ahead of the consumer
+            window = deque()
+            with ProcessPoolExecutor(max_workers=min(config.max_workers, len(members))) as executor:
+                for member_arguments in arguments:
+                    if len(window) >= 2 * config.max_workers:
+                        yield from self._member_chunks(window.popleft())
+                    window.append(executor.submit(load_and_split_member, *member_arguments))
+                while window:
+                    yield from self._member_chunks(window.popleft())
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def load(self) -> List[Document]:
+        return list(self.stream_documents())
@@ -0,0 +1,127 @@
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore as LangchainVectorStore
+
+from src.components.answer_cache import AnswerCache
+from src.components.hybrid_retriever import HybridRetriever
+from src.components.mmr_retriever import get_scope_filter, get_scope_key, search_with_vectors
+from src.components.qa_chain_formation import QAFormatter
+from src.entity.artifact_entity import BatchAnswerArtifact
+from src.entity.config_entity import BatchQAConfig
+from src.exception import CustomException
+from src.logger import get_logger
+from src.telemetry import telemetry
+from src.vector_db_connection.mmr import maximal_marginal_relevance
+
+
+class BatchQuestionAnswerer:
+    """
+    Answers many questions against the same document set.
+
+    Duplicate questions (after normalisation) are answered once, all query embeddings
+    are computed in a single ``embed_documents`` request, retrieval runs by vector on a
+    small thread pool and LLM calls run with bounded concurrency. Failures are recorded
+    per question instead of aborting the batch.
+    """
+
+    def __init__(self,
+                 qa_formatter: QAFormatter,
+                 embeddings: Embeddings,
+                 vector_store: LangchainVectorStore,
+                 batch_qa_config: BatchQAConfig = None,
+                 answer_cache: Optional[AnswerCache] = None,
+                 hybrid_retriever: Optional[HybridRetriever] = None):
+        self.qa_formatter = qa_formatter
+        self.embeddings = embeddings
+        self.vector_store = vector_store
+        self.batch_qa_config = batch_qa_config or BatchQAConfig()
+        self.answer_cache = answer_cache
+        # fuses BM25 hits with the vector search when the lexical index is enabled
+        self.hybrid_retriever = hybrid_retriever
+        self.generation_chain = qa_formatter.form_generation_chain()
+        self.logger = get_logger(__name__)
+
+    def _answer_one(self, question: str, vector: List[float],
+                    document_ids: Optional[List[str]] = None) -> BatchAnswerArtifact:
+        config = self.batch_qa_config
+        result = BatchAnswerArtifact(question=question)
+        started_at = time.perf_counter()
+        scope = get_scope_key(document_ids)
+        try:
+            if self.answer_cache is not None:
+                answer = self.answer_cache.lookup(question, scope)
+                if answer is None:
+                    # the batch embeds every question up front, so the similar-question tier costs nothing extra
+                    answer, query_vector = self.answer_cache.lookup_similar(vector, scope)
+                if answer is not None:
+                    result.answer, result.cached = answer, True
+                    return result
+                fingerprint = self.answer_cache.version_registry.fingerprint()
+
+            with telemetry.span("retrieval"):
+                if document_ids is not None and not document_ids:
+                    documents = []
+                elif self.hybrid_retriever is not None:
+                    documents = self.hybrid_retriever.search_by_vector(question, vector, document_ids=document_ids)
+                else:
+                    candidates, candidate_vectors = search_with_vectors(self.vector_store, vector, config.fetch_k,
+                                                                        filter=get_scope_filter(document_ids))
+                    documents = [candidates[i] for i in maximal_marginal_relevance(
+                        vector, candidate_vectors, k=config.k, lambda_mult=config.lambda_mult)]
+            telemetry.record_chunks("retrieval", len(documents))
+            result.retrieval_time = time.perf_counter() - started_at
+
+            generation_started_at = time.perf_counter()
+            result.answer = self.generation_chain.invoke({"context": self.qa_formatter.format_docs(documents),
+                                                          "question": question})
+            result.generation_time = time.perf_counter() - generation_started_at
+
+            if self.answer_cache is not None:
+                self.answer_cache.store(question, result.answer, query_vector, fingerprint=fingerprint, scope=scope)
+
+        except Exception as e:
+            result.error = str(e)
+            self.logger.error(f"Batch question failed: {question!r}: {e}")
+
+        finally:
+            result.total_time = time.perf_counter() - started_at
+        return result
+
+    def answer(self, questions: List[str], document_ids: Optional[List[str]] = None) -> List[BatchAnswerArtifact]:
+        """
+        Returns one BatchAnswerArtifact per input question, in input order. Retrieval is
+        restricted to the chunks of ``document_ids`` when given.
+        """
+        try:
+            unique: Dict[str, str] = {}
+            for question in questions:
+                unique.setdefault(AnswerCache.normalize(question), question)
+            unique_questions = list(unique.values())
+
+            with telemetry.span("query_embedding", questions=len(unique_questions)):
+                vectors = self.embeddings.embed_documents(unique_questions)
+
+            # the thread pool bounds concurrent LLM calls; retrieval happens on the same workers
+            workers = max(1, min(self.batch_qa_config.max_concurrency, len(unique_questions)))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch-qa") as executor:
+                answers = list(executor.map(partial(self._answer_one, document_ids=document_ids),
+                                            unique_questions, vectors))
+
+            by_key = {AnswerCache.normalize(result.question): result for result in answers}
+            results = []
+            for question in questions:
+                answer = by_key[AnswerCache.normalize(question)]
+                results.append(answer if answer.question == question
+                               else BatchAnswerArtifact(**{**answer.__dict__, "question": question}))
+
+            failed = sum(1 for result in answers if result.error)
+            self.logger.info(f"Answered {len(questions)} questions ({len(unique_questions)} unique, {failed} failed)")
+            return results
+
+        except Exception as e:
+            raise CustomException(e, sys)
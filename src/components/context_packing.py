@@ -0,0 +1,149 @@
+import math
+import re
+from typing import Callable, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from src.entity.config_entity import ContextPackingConfig
+from src.logger import get_logger
+from src.telemetry import telemetry
+
+# roughly how cl100k-style tokenizers pre-split text: words, groups of up to 3 digits, single symbols
+_PRETOKEN_PATTERN = re.compile(r"[^\W\d_]+|\d{1,3}|[^\w\s]|_")
+
+
+def estimate_tokens(text: str) -> int:
+    """Local token count estimate: one token per short word, digit group or symbol."""
+    return sum(math.ceil(len(piece) / 6) if piece[0].isalpha() else 1
+               for piece in _PRETOKEN_PATTERN.findall(text))
+
+
+def text_overlap(left: str, right: str, min_overlap: int, max_overlap: int) -> int:
+    """Length of the longest suffix of ``left`` that is a prefix of ``right`` (0 if shorter than ``min_overlap``)."""
+    if len(left) < min_overlap or len(right) < min_overlap:
+        return 0
+    anchor = right[:min_overlap]
+    tail_start = max(0, len(left) - max_overlap)
+    position = left.find(anchor, tail_start)
+    while position != -1:
+        # the earliest match is the longest overlap
+        if right.startswith(left[position:]):
+            return len(left) - position
+        position = left.find(anchor, position + 1)
+    return 0
+
+
+class _Block:
+    __slots__ = ("text", "rank", "source", "page")
+
+    def __init__(self, text: str, rank: int, source, page):
+        self.text = text
+        self.rank = rank
+        self.source = source
+        self.page = page
+
+
+class ContextPacker:
+    """
+    Turns retrieved chunks into the prompt context.
+
+    Chunks of the same source and page are merged when one contains the other or
+    when they overlap (the splitter repeats up to ``chunk_overlap`` characters
+    between neighbours), exact duplicates are dropped, and the resulting blocks are
+    ordered by the rank of their best chunk. Blocks are then packed until
+    ``max_tokens`` is reached; the block that crosses the budget is truncated at a
+    word boundary if enough of it fits, and dropped otherwise.
+    """
+
+    def __init__(self, context_packing_config: ContextPackingConfig = None):
+        self.context_packing_config = context_packing_config or ContextPackingConfig()
+        self.logger = get_logger(__name__)
+        self._count_tokens: Optional[Callable[[str], int]] = None
+
+    @property
+    def count_tokens(self) -> Callable[[str], int]:
+        if self._count_tokens is None:
+            self._count_tokens = estimate_tokens
+            if self.context_packing_config.tokenizer == "tiktoken":
+                try:
+                    import tiktoken
+                    encoding = tiktoken.get_encoding(self.context_packing_config.tiktoken_encoding)
+                    self._count_tokens = lambda text: len(encoding.encode(text, disallowed_special=()))
+                except Exception as e:
+                    self.logger.warning(f"tiktoken unavailable, estimating context tokens locally: {e}")
+        return self._count_tokens
+
+    def _merge_into(self, blocks: List[_Block], block: _Block) -> bool:
+        config = self.context_packing_config
+        for existing in blocks:
+            if existing.source != block.source or existing.page != block.page:
+                continue
+            if block.text in existing.text:
+                merged = existing.text
+            elif existing.text in block.text:
+                merged = block.text
+            elif overlap := text_overlap(existing.text, block.text, config.min_overlap, config.max_overlap):
+                merged = existing.text + block.text[overlap:]
+            elif overlap := text_overlap(block.text, existing.text, config.min_overlap, config.max_overlap):
+                merged = block.text + existing.text[overlap:]
+            else:
+                continue
+            blocks.remove(existing)
+            # the merged block may now reach another block of the same page
+            if not self._merge_into(blocks, _Block(merged, min(existing.rank, block.rank),
+                                                   block.source, block.page)):
+                blocks.append(_Block(merged, min(existing.rank, block.rank), block.source, block.page))
+            return True
+        return False
+
+    def merge(self, documents: List[Document]) -> List[str]:
+        """Deduplicated and merged texts of ``documents`` (given best first), best first."""
+        blocks: List[_Block] = []
+        seen = set()
+        for rank, document in enumerate(documents):
+            text = document.page_content.strip()
+            if not text or text in seen:
+                continue
+            seen.add(text)
+            block = _Block(text, rank, document.metadata.get("source"), document.metadata.get("page"))
+            if not self._merge_into(blocks, block):
+                blocks.append(block)
+        return [block.text for block in sorted(blocks, key=lambda block: block.rank)]
+
+    def _truncate(self, text: str, tokens: int, budget: int) -> str:
+        cut = int(len(text) * budget / tokens)
+        while cut > 0 and self.count_tokens(text[:cut]) > budget:
+            cut = int(cut * 0.9)
+        boundary = text.rfind(" ", 0, cut)
+        return text[:boundary if boundary > 0 else cut].rstrip()
+
+    def pack_texts(self, texts: List[str]) -> Tuple[List[str], int]:
+        """Takes texts in order until the token budget is used; returns them and their token count."""
+        config = self.context_packing_config
+        packed, used = [], 0
+        for text in texts:
+            tokens = self.count_tokens(text)
+            if used + tokens <= config.max_tokens:
+                packed.append(text)
+                used += tokens
+                continue
+            remaining = config.max_tokens - used
+            if remaining >= config.min_block_tokens:
+                truncated = self._truncate(text, tokens, remaining)
+                if truncated:
+                    packed.append(truncated)
+                    used += self.count_tokens(truncated)
+            break
+        return packed, used
+
+    def pack(self, documents: List[Document]) -> str:
+        """Returns the context for ``documents`` (most relevant first) as one string."""
+        with telemetry.span("prompt_assembly", documents=len(documents)) as span:
+            blocks = self.merge(documents)
+            packed, tokens = self.pack_texts(blocks)
+            span.set(blocks=len(blocks), packed=len(packed), tokens=tokens)
+            return "\n\n".join(packed)
+
+
+# shared by every chain; configured through the CONTEXT_* settings
+context_packer = ContextPacker()
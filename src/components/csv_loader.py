@@ -0,0 +1,152 @@
+import csv
+import io
+import sys
+from itertools import islice
+from typing import Iterator, List, TextIO
+
+from langchain_core.documents import Document
+
+from src.components.text_splitter import OffsetTextSplitter
+from src.entity.config_entity import CSVConfig
+from src.exception import CustomException
+from src.telemetry import telemetry
+
+
+def is_csv(file_path: str) -> bool:
+    return file_path.lower().endswith(".csv")
+
+
+def format_row(header: List[str], row: List[str]) -> str:
+    """One ``column: value`` line per non-empty cell, so every chunk carries its column names."""
+    return "\n".join(f"{name}: {value.strip()}" for name, value in zip(header, row) if value.strip())
+
+
+def split_row(header: List[str], row: List[str], chunk_size: int, chunk_overlap: int) -> List[str]:
+    """
+    Splits a row longer than ``chunk_size`` cell by cell, so a value is never separated
+    from its column name: short cells are grouped into pieces of at most ``chunk_size``
+    characters and a long value is split on its own, every piece prefixed with the column.
+    """
+    lines = []
+    for name, value in zip(header, row):
+        value = value.strip()
+        if not value:
+            continue
+        label = f"{name}: "
+        if len(label) + len(value) <= chunk_size:
+            lines.append(label + value)
+            continue
+        # a column name close to chunk_size would leave no room for the value; the piece runs over instead
+        budget = max(chunk_size - len(label), chunk_size // 2)
+        splitter = OffsetTextSplitter(chunk_size=budget, chunk_overlap=min(chunk_overlap, budget // 2))
+        lines.extend(label + piece for piece in splitter.split_text(value))
+
+    pieces, piece = [], []
+    piece_size = 0
+    for line in lines:
+        if piece and piece_size + len(line) + 1 > chunk_size:
+            pieces.append("\n".join(piece))
+            piece, piece_size = [], 0
+        piece.append(line)
+        piece_size += len(line) + 1
+    if piece:
+        pieces.append("\n".join(piece))
+    return pieces
+
+
+def get_dialect(stream: TextIO, sniff_bytes: int):
+    if not stream.seekable():
+        return csv.excel
+    sample = stream.read(sniff_bytes)
+    stream.seek(0)
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=",;\t|")
+    except csv.Error:
+        return csv.excel
+
+
+def iter_csv_documents(stream: TextIO,
+                       source: str,
+                       chunk_size: int,
+                       chunk_overlap: int,
+                       csv_config: CSVConfig = None) -> Iterator[Document]:
+    """
+    Yields row-group documents of the CSV in ``stream``.
+
+    Rows are read ``batch_rows`` at a time and formatted as ``column: value`` lines;
+    consecutive rows are grouped into documents of at most ``chunk_size`` characters,
+    with the 1-based data row range in ``row_start``/``row_end``. Only the current
+    batch and group are held in memory. A single row longer than ``chunk_size`` is
+    split on its own by ``split_row``, every piece keeping the row's range.
+    """
+    csv_config = csv_config or CSVConfig()
+    reader = csv.reader(stream, get_dialect(stream, csv_config.sniff_bytes))
+    header = [name.strip() or f"column_{i + 1}" for i, name in enumerate(next(reader, []))]
+    group: List[str] = []
+    group_size = group_start = group_end = row_number = 0
+
+    def emit() -> Document:
+        return Document(page_content="\n\n".join(group),
+                        metadata={"source": source, "row_start": group_start, "row_end": group_end})
+
+    while batch := list(islice(reader, csv_config.batch_rows)):
+        with telemetry.span("csv_load", source=source, rows=len(batch)):
+            documents = []
+            for row in batch:
+                row_number += 1
+                if len(row) > len(header):
+                    header.extend(f"column_{i + 1}" for i in range(len(header), len(row)))
+                text = format_row(header, row)
+                if not text:
+                    continue
+                if group and group_size + len(text) + 2 > chunk_size:
+                    documents.append(emit())
+                    group, group_size = [], 0
+                if not group:
+                    group_start = row_number
+                if len(text) > chunk_size:
+                    documents.extend(Document(page_content=piece,
+                                              metadata={"source": source, "row_start": row_number,
+                                                        "row_end": row_number})
+                                     for piece in split_row(header, row, chunk_size, chunk_overlap))
+                    continue
+                group.append(text)
+                group_size += len(text) + 2
+                group_end = row_number
+        telemetry.record_chunks("split", len(documents))
+        yield from documents
+
+    if group:
+        telemetry.record_chunks("split", 1)
+        yield emit()
+
+
+class CSVLoader:
+    """Streams a CSV file from disk as row-group documents; see ``iter_csv_documents``."""
+
+    def __init__(self, file_path: str, chunk_size: int, chunk_overlap: int, csv_config: CSVConfig = None,
+                 source: str = None):
+        self.file_path = file_path
+        # the document path chunks are attributed to, when the bytes live elsewhere
+        self.source = source or file_path
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.csv_config = csv_config or CSVConfig()
+
+    def stream_documents(self) -> Iterator[Document]:
+        try:
+            with open(self.file_path, newline="", encoding=self.csv_config.encoding, errors="replace") as csv_file:
+                yield from iter_csv_documents(csv_file, self.source, self.chunk_size, self.chunk_overlap,
+                                              self.csv_config)
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def load(self) -> List[Document]:
+        return list(self.stream_documents())
+
+
+def load_csv_member(data: bytes, source: str, chunk_size: int, chunk_overlap: int) -> List[Document]:
+    """Row-group documents of a CSV member of an archive."""
+    stream = io.StringIO(data.decode(CSVConfig().encoding, errors="replace"), newline="")
+    return list(iter_csv_documents(stream, source, chunk_size, chunk_overlap))
@@ -1,8 +1,12 @@
 import os, sys
+import hashlib
+import tempfile
+from typing import Iterable, Optional, Tuple
 from src.logger import get_logger
 from src.exception import CustomException
 from src.entity.config_entity import FileHandlerConfig
 from src.entity.artifact_entity import FileHandlerArtifact
+from src.vector_db_connection.document_registry import FileManifest, IndexedFileRegistry
 
 
 class DataIngestion:
@@ -10,21 +14,146 @@ class DataIngestion:
         self.file_handler_config = file_handler_config
         self.logger = get_logger(__name__)
 
-    def ingest(self,
-               file):
-        try:
-        
-            file_name = file.name.lower().replace(" ", "-").strip()
-            file_full_path = os.path.join(self.file_handler_config.file_storage_dir, file_name)
-            os.makedirs(os.path.dirname(file_full_path), exist_ok=True)
-            with open(file_full_path, "wb") as file_handler:
-                file_handler.write(file.read())
+    @staticmethod
+    def normalize_file_name(name: str) -> str:
+        return name.lower().replace(" ", "-").strip()
+
+    @staticmethod
+    def get_file_name(file) -> str:
+        return DataIngestion.normalize_file_name(file.name)
+
+    def get_document_path(self, name: str) -> str:
+        """The document path (source of the chunks) an upload called ``name`` is stored under."""
+        return os.path.join(self.file_handler_config.file_storage_dir, self.normalize_file_name(name))
+
+    def store_file(self, file, file_full_path: str) -> Tuple[str, str]:
+        """
+        Copies ``file`` in chunks to a temporary file next to ``file_full_path`` and returns
+        ``(temporary path, sha256 of the content)``; the hash is computed in the same pass.
+        The caller moves the copy into place or discards it.
+        """
+        os.makedirs(os.path.dirname(file_full_path), exist_ok=True)
+        if hasattr(file, "seek"):
+            # Streamlit keeps the uploaded file objects across reruns
+            file.seek(0)
+
+        digest = hashlib.sha256()
+        # unique temporary name, so concurrent uploads of the same file never share it
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(file_full_path), suffix=".part",
+                                         delete=False) as file_handler:
+            tmp_path = file_handler.name
+            # copy in chunks rather than holding the whole upload in memory twice
+            while True:
+                chunk = file.read(self.file_handler_config.copy_buffer_size)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                file_handler.write(chunk)
+        return tmp_path, digest.hexdigest()
 
+    def get_object_path(self, content_hash: str, file_name: str) -> str:
+        # the extension is kept so loaders can still be picked by file type
+        return os.path.join(self.file_handler_config.object_storage_dir, content_hash[:2],
+                            content_hash + os.path.splitext(file_name)[1])
+
+    def store_object(self, file) -> Tuple[str, str, int]:
+        """
+        Stores ``file`` content-addressed and returns ``(object path, sha256, size)``.
+        Content that is already stored is not written a second time.
+        """
+        object_dir = self.file_handler_config.object_storage_dir
+        tmp_path, content_hash = self.store_file(file, os.path.join(object_dir, self.get_file_name(file)))
+        size = os.path.getsize(tmp_path)
+        object_path = self.get_object_path(content_hash, self.get_file_name(file))
+        if os.path.exists(object_path):
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            os.replace(tmp_path, object_path)
+        return object_path, content_hash, size
+
+    def ingest_files(self, files: Iterable, skip_indexed: bool = True,
+                     session_id: Optional[str] = None) -> FileHandlerArtifact:
+        """
+        Stores every file of an upload batch. Files whose document path already holds the
+        same indexed content are left out of ``file_paths``, so only new or changed files
+        are parsed, embedded and upserted. The same content under another name is indexed
+        under its own source: every name keeps its own chunks, whatever happens to the others.
+
+        Bytes go to the content-addressed object store, once per distinct content. The
+        manifest is not touched here: ``commit_files`` points each document path
+        (``file_storage_dir/<upload name>``, the source of its chunks) at its new content
+        once the batch is indexed, so a failed run leaves the previous content in place.
+
+        ``document_ids`` of the artifact lists the content hash of every upload, skipped
+        or not, so the batch can be used as a retrieval scope right away.
+        """
+        try:
+            indexed_files = IndexedFileRegistry.open(self.file_handler_config.indexed_files_path)
+            # the manifest is only updated once a batch is indexed, so it holds the indexed content per path
+            manifest = FileManifest.open(self.file_handler_config.manifest_path)
             file_handler_artifact = FileHandlerArtifact(
-                file_storage_dir=self.file_handler_config.file_storage_dir
+                file_storage_dir=self.file_handler_config.file_storage_dir,
+                file_paths=[],
+                session_id=session_id
             )
+            for file in files:
+                file_full_path = self.get_document_path(file.name)
+                object_path, content_hash, size = self.store_object(file)
+                replaced = file_handler_artifact.stored_files.get(file_full_path)
+                if replaced is not None and replaced[2] != object_path:
+                    # the same name twice in one batch: the earlier upload's object may be left unreferenced
+                    file_handler_artifact.superseded_objects.append(replaced[2])
+                file_handler_artifact.stored_files[file_full_path] = (file.name, content_hash, object_path, size)
+                if content_hash not in file_handler_artifact.document_ids:
+                    file_handler_artifact.document_ids.append(content_hash)
+
+                if file_full_path in file_handler_artifact.content_hashes:
+                    # the same name twice in one batch: the last upload wins, as it does across batches
+                    file_handler_artifact.file_paths.remove(file_full_path)
+                    del file_handler_artifact.content_hashes[file_full_path]
+                    del file_handler_artifact.object_paths[file_full_path]
+                if (skip_indexed and manifest.get_hash(file_full_path) == content_hash
+                        and indexed_files.get_indexed_path(content_hash) is not None):
+                    # re-upload of unchanged content
+                    file_handler_artifact.skipped_files.append(file.name)
+                    continue
+                file_handler_artifact.file_paths.append(file_full_path)
+                file_handler_artifact.content_hashes[file_full_path] = content_hash
+                file_handler_artifact.object_paths[file_full_path] = object_path
+
+            self.logger.info(f"Stored {len(file_handler_artifact.file_paths)} files, skipped "
+                             f"{len(file_handler_artifact.skipped_files)} already indexed")
             return file_handler_artifact
 
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def commit_files(self, file_handler_artifact: FileHandlerArtifact):
+        """
+        Points the manifest at the content of every upload stored by ``ingest_files``, then
+        deletes the objects no document refers to any more. Call it once the batch is
+        indexed: until then the previous content stays stored and in the manifest.
+        """
+        try:
+            manifest = FileManifest.open(self.file_handler_config.manifest_path)
+            superseded_objects = set(file_handler_artifact.superseded_objects)
+            for file_full_path, (name, content_hash, object_path, size) in \
+                    file_handler_artifact.stored_files.items():
+                superseded_object = manifest.record(file_full_path, name, content_hash, object_path, size)
+                if superseded_object is not None:
+                    superseded_objects.add(superseded_object)
+            for object_path in superseded_objects:
+                if not manifest.is_referenced(object_path) and os.path.exists(object_path):
+                    os.remove(object_path)
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def ingest(self,
+               file):
+        try:
+            return self.ingest_files([file], skip_indexed=False)
 
         except Exception as e:
             raise CustomException(e, sys)
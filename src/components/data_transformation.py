@@ -1,15 +1,56 @@
 import os, sys
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
 
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+from pypdf import PdfReader
 
+from src.components.archive_loader import ArchiveLoader, is_archive
+from src.components.csv_loader import CSVLoader, is_csv
+from src.components.text_splitter import OffsetTextSplitter
+from src.constant import DOCUMENT_ID_METADATA_KEY, SESSION_ID_METADATA_KEY
 from src.entity.config_entity import DataTransformationConfig
 from src.entity.artifact_entity import FileHandlerArtifact, DataTransformationArtifact
 from src.logger import get_logger
+from src.telemetry import telemetry
+from src.utils.convert_docx import get_document_converter, is_office_document
 
 from langchain_community.document_loaders import PyPDFLoader
 from src.exception import CustomException
 
 
+def iter_pdf_pages(file_path: str,
+                   start_page: int = 0,
+                   end_page: Optional[int] = None,
+                   source: Optional[str] = None) -> Iterator[Document]:
+    """
+    Yields one Document per page in ``[start_page, end_page)``, with the same
+    content and metadata as ``PyPDFLoader``. ``source`` overrides the source
+    metadata, e.g. with the office document a PDF was converted from.
+    """
+    # reading through the open handle keeps pypdf from loading the whole file into memory
+    with open(file_path, "rb") as pdf_file:
+        reader = PdfReader(pdf_file)
+        end_page = len(reader.pages) if end_page is None else end_page
+        for page_number in range(start_page, end_page):
+            with telemetry.span("pdf_load"):
+                page_content = reader.pages[page_number].extract_text()
+            yield Document(page_content=page_content,
+                           metadata={"source": source or file_path, "page": page_number})
+
+
+def load_and_split_pages(file_path: str,
+                         start_page: int,
+                         end_page: int,
+                         chunk_size: int,
+                         chunk_overlap: int,
+                         source: Optional[str] = None) -> List[Document]:
+    # module level so it can be pickled into the process pool
+    splitter = DataTransformation.get_splitter(chunk_size, chunk_overlap)
+    return splitter.split_documents(list(iter_pdf_pages(file_path, start_page, end_page, source)))
+
+
 class DataTransformation:
     def __init__(self,
                  file_handler_artifact: FileHandlerArtifact,
@@ -18,45 +59,209 @@ class DataTransformation:
         self.data_transformation_config = data_transformation_config
         self.file_handler_artifact = file_handler_artifact
 
-       
-        
+        # one splitter for every file of the run
+        self.splitter = self.get_splitter(self.data_transformation_config.chunk_size,
+                                          self.data_transformation_config.chunk_overlap)
+        # office document -> the PDF it was converted to
+        self.converted_paths: Dict[str, str] = {}
+
         self.logger = get_logger(__name__)
 
     @staticmethod
     def get_splitter(chunk_size: int = 1000,
-                     chunk_overlap: int = 200) -> RecursiveCharacterTextSplitter:
+                     chunk_overlap: int = 200) -> OffsetTextSplitter:
+        try:
+            # get splitter as per the configuration; produces the same chunks as
+            # RecursiveCharacterTextSplitter without copying the page text around
+            return OffsetTextSplitter(chunk_size=chunk_size,
+                                      chunk_overlap=chunk_overlap,
+                                      separators=["\n\n", "\n", " ", ""])
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def split_documents(self, documents: List[Document]) -> List[Document]:
+        with telemetry.span("split", pages=len(documents)) as span:
+            chunks = self.splitter.split_documents(documents)
+            span.set(chunks=len(chunks))
+        telemetry.record_chunks("split", len(chunks))
+        return chunks
+
+    def get_file_paths(self) -> List[str]:
+        if self.file_handler_artifact.file_paths is not None:
+            # only the files stored by this ingestion run
+            return sorted(self.file_handler_artifact.file_paths)
+        # sorted so that artifacts come back in the same order in serial and parallel mode
+        return [os.path.join(self.file_handler_artifact.file_storage_dir, file)
+                for file in sorted(os.listdir(self.file_handler_artifact.file_storage_dir))
+                if os.path.isfile(os.path.join(self.file_handler_artifact.file_storage_dir, file))]
+
+    def get_object_path(self, file_path: str) -> str:
+        """Where the bytes of ``file_path`` are stored; the path itself unless it was stored content-addressed."""
+        return self.file_handler_artifact.object_paths.get(file_path, file_path)
+
+    def convert_office_documents(self, file_paths: List[str]):
+        """Converts the office documents among ``file_paths`` to PDF in one pass through the converter pool."""
+        office_paths = [file_path for file_path in file_paths
+                        if is_office_document(file_path) and file_path not in self.converted_paths]
+        if office_paths:
+            object_paths = {file_path: self.get_object_path(file_path) for file_path in office_paths}
+            content_hashes = {object_paths[file_path]: self.file_handler_artifact.content_hashes[file_path]
+                              for file_path in office_paths if file_path in self.file_handler_artifact.content_hashes}
+            converted = get_document_converter().convert(list(object_paths.values()), content_hashes)
+            self.converted_paths.update({file_path: converted[object_paths[file_path]] for file_path in office_paths})
+
+    def get_pdf_path(self, file_path: str) -> str:
+        """The PDF to parse for ``file_path``: the file itself, or its conversion for office documents."""
+        if is_office_document(file_path):
+            self.convert_office_documents([file_path])
+            return self.converted_paths[file_path]
+        return self.get_object_path(file_path)
+
+    def tag_document(self, document: Document) -> Document:
+        """Adds the document id (content hash of the upload) and the uploading session to a chunk's metadata."""
+        # archive members are tagged with the archive they were uploaded in
+        document_path = document.metadata.get("archive", document.metadata.get("source"))
+        document_id = self.file_handler_artifact.content_hashes.get(document_path)
+        if document_id is not None:
+            document.metadata[DOCUMENT_ID_METADATA_KEY] = document_id
+        if self.file_handler_artifact.session_id is not None:
+            document.metadata[SESSION_ID_METADATA_KEY] = self.file_handler_artifact.session_id
+        return document
+
+    def get_page_ranges(self, file_path: str) -> List[Tuple[int, int]]:
+        pages_per_task = self.data_transformation_config.pages_per_task
+        with open(self.get_pdf_path(file_path), "rb") as pdf_file:
+            page_count = len(PdfReader(pdf_file).pages)
+        return [(start, min(start + pages_per_task, page_count))
+                for start in range(0, page_count, pages_per_task)]
+
+    @staticmethod
+    def is_pdf(file_path: str) -> bool:
+        return not is_archive(file_path) and not is_csv(file_path)
+
+    def get_document_loader(self, file_path: str):
+        """Loader streaming retrieval-sized documents for non-PDF files (archives and CSV)."""
+        loader_class = ArchiveLoader if is_archive(file_path) else CSVLoader
+        return loader_class(self.get_object_path(file_path),
+                            self.data_transformation_config.chunk_size,
+                            self.data_transformation_config.chunk_overlap,
+                            source=file_path)
+
+    def transform_file(self, file_path: str) -> DataTransformationArtifact:
+        if not self.is_pdf(file_path):
+            # archives parse their members in their own process pool; CSV rows are grouped, not split
+            return DataTransformationArtifact(documents=self.get_document_loader(file_path).load())
+
+        with telemetry.span("pdf_load", source=file_path) as span:
+            documents = PyPDFLoader(self.get_pdf_path(file_path))
+            documents = documents.load()
+            span.set(pages=len(documents))
+        for document in documents:
+            # converted office documents keep their uploaded path as the source
+            document.metadata["source"] = file_path
+
+        # Splitting the documents
+        documents = self.split_documents(documents)
+
+        # getting all the splitted documents
+        return DataTransformationArtifact(documents=documents)
+
+    def transform_data_parallel(self, file_paths: List[str]) -> List[DataTransformationArtifact]:
+        """
+        Parses and splits the page ranges of every file in a process pool.
+
+        Results are collected in submission order, so artifacts and the documents
+        inside them are ordered exactly as in serial mode.
+        """
+        config = self.data_transformation_config
+        tasks = [(file_path, start, end)
+                 for file_path in file_paths if self.is_pdf(file_path)
+                 for start, end in self.get_page_ranges(file_path)]
+
+        if len(tasks) <= 1 or config.max_workers <= 1:
+            return [self.transform_file(file_path) for file_path in file_paths]
+
+        documents_by_file = {file_path: [] for file_path in file_paths}
+        with ProcessPoolExecutor(max_workers=min(config.max_workers, len(tasks))) as executor:
+            futures = [(file_path, executor.submit(load_and_split_pages, self.get_pdf_path(file_path), start, end,
+                                                   config.chunk_size, config.chunk_overlap, file_path))
+                       for file_path, start, end in tasks]
+            for file_path, future in futures:
+                documents_by_file[file_path].extend(self._worker_chunks(future))
+        for file_path in [file_path for file_path in file_paths if not self.is_pdf(file_path)]:
+            documents_by_file[file_path] = self.transform_file(file_path).documents
+
+        self.logger.info(f"Transformed {len(file_paths)} files in {len(tasks)} page-range tasks")
+        return [DataTransformationArtifact(documents=documents_by_file[file_path]) for file_path in file_paths]
+
+    @staticmethod
+    def _worker_chunks(future: "Future[List[Document]]") -> List[Document]:
+        documents = future.result()
+        # spans recorded inside the worker processes stay there; count the chunks here
+        telemetry.record_chunks("split", len(documents))
+        return documents
+
+    def _stream_parallel(self, file_paths: List[str]) -> Iterator[Document]:
+        config = self.data_transformation_config
+        tasks = ((file_path, start, end)
+                 for file_path in file_paths
+                 for start, end in self.get_page_ranges(file_path))
+
+        # only a bounded window of page ranges is parsed ahead of the consumer
+        window = deque()
+        with ProcessPoolExecutor(max_workers=config.max_workers) as executor:
+            for file_path, start, end in tasks:
+                if len(window) >= 2 * config.max_workers:
+                    yield from self._worker_chunks(window.popleft())
+                window.append(executor.submit(load_and_split_pages, self.get_pdf_path(file_path), start, end,
+                                              config.chunk_size, config.chunk_overlap, file_path))
+            while window:
+                yield from self._worker_chunks(window.popleft())
+
+    def stream_documents(self) -> Iterator[Document]:
+        """
+        Lazily yields the split documents of every stored file, page by page.
+
+        Nothing is accumulated: each page is split as soon as it is read, so memory stays
+        flat regardless of document size and the first chunks reach the vector store
+        before the rest of the file is parsed. In parallel mode page ranges are parsed
+        in the process pool and yielded in order. ZIP archives and CSV files come last,
+        streamed by their own loaders. Every chunk is tagged by ``tag_document``.
+        """
         try:
-            # get splitter as per the configuration
-            return RecursiveCharacterTextSplitter(chunk_size=chunk_size,
-                                                  chunk_overlap=chunk_overlap,
-                                                  separators=["\n\n", "\n", " ", ""])
+            all_file_paths = self.get_file_paths()
+            # every office document of the run is converted up front, in batches across the converter pool
+            self.convert_office_documents(all_file_paths)
+            file_paths = [file_path for file_path in all_file_paths if self.is_pdf(file_path)]
+            if self.data_transformation_config.parallel and self.data_transformation_config.max_workers > 1:
+                yield from map(self.tag_document, self._stream_parallel(file_paths))
+            else:
+                for file_path in file_paths:
+                    for page in iter_pdf_pages(self.get_pdf_path(file_path), source=file_path):
+                        yield from map(self.tag_document, self.split_documents([page]))
+
+            for file_path in all_file_paths:
+                if not self.is_pdf(file_path):
+                    yield from map(self.tag_document, self.get_document_loader(file_path).stream_documents())
+
         except Exception as e:
             raise CustomException(e, sys)
 
     def transform_data(self)->list[DataTransformationArtifact]:
         try:
-            data_transformation_artifacts = [] 
-            for file in os.listdir(self.file_handler_artifact.file_storage_dir):
-                file_full_path = os.path.join(self.file_handler_artifact.file_storage_dir,
-                                              file)
-                documents = PyPDFLoader(file_full_path)
-                documents = documents.load()
-                
-                # Splitting the documents
-                splitter = self.get_splitter()
-                documents = splitter.split_documents(documents)
-                    
-            
-                                
-                
-                
-                
-                
-                 # getting all the splitted documents
-                artifact = DataTransformationArtifact(documents=documents)
-                
-                data_transformation_artifacts.append(artifact)
-                
+            file_paths = self.get_file_paths()
+            self.convert_office_documents(file_paths)
+            if self.data_transformation_config.parallel:
+                data_transformation_artifacts = self.transform_data_parallel(file_paths)
+            else:
+                data_transformation_artifacts = []
+                for file_full_path in file_paths:
+                    artifact = self.transform_file(file_full_path)
+                    data_transformation_artifacts.append(artifact)
+
+            for artifact in data_transformation_artifacts:
+                for document in artifact.documents:
+                    self.tag_document(document)
             return data_transformation_artifacts
 
         except Exception as e:
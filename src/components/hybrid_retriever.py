@@ -0,0 +1,94 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from src.components.mmr_retriever import (CONVERSATION_ID_KEY, DOCUMENT_IDS_KEY, QUERY_EMBEDDING_KEY, MMRRetriever,
+                                          QueryEmbedding, get_scope_filter)
+from src.entity.config_entity import HybridRetrievalConfig
+from src.telemetry import telemetry
+from src.vector_db_connection.lexical_index import LexicalHit, LexicalIndex
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Document]], k: int = 60) -> List[Document]:
+    """
+    Merges ranked lists by the sum of ``1 / (k + rank)`` over the lists a document appears in.
+
+    Documents are matched by content and source, since the two retrievers return
+    separate ``Document`` objects for the same chunk.
+    """
+    scores: Dict[Tuple[str, Optional[str]], float] = {}
+    documents: Dict[Tuple[str, Optional[str]], Document] = {}
+    for ranking in rankings:
+        for rank, document in enumerate(ranking, start=1):
+            key = (document.page_content, document.metadata.get("source"))
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            documents.setdefault(key, document)
+    return [documents[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Combines the BM25 lexical index with the vector store.
+
+    Both retrievers contribute ``candidates`` documents (the vector side through
+    :class:`MMRRetriever`, so conversation candidate reuse applies) and
+    the lists are merged with reciprocal rank fusion. When the best lexical hit
+    contains every identifier of the question (part numbers, clause ids) and enough
+    of its BM25 weight, the lexical hits are returned directly and the question is
+    never embedded.
+    """
+
+    vector_retriever: MMRRetriever
+    lexical_index: LexicalIndex
+    config: HybridRetrievalConfig
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def is_strong_lexical_match(self, hits: List[LexicalHit]) -> bool:
+        if not self.config.lexical_fast_path or not hits:
+            return False
+        best = hits[0]
+        return best.identifier_coverage == 1.0 and best.coverage >= self.config.fast_path_min_coverage
+
+    def _lexical_search(self, query: str, document_ids: Optional[List[str]] = None) -> List[LexicalHit]:
+        with telemetry.span("lexical_search") as span:
+            hits = self.lexical_index.search(query, self.config.candidates, filter=get_scope_filter(document_ids))
+            span.set(documents=len(hits))
+        return hits
+
+    def _fuse(self, hits: List[LexicalHit], vector_documents: List[Document]) -> List[Document]:
+        lexical_documents = [hit.document for hit in hits]
+        return reciprocal_rank_fusion([lexical_documents, vector_documents], k=self.config.rrf_k)[:self.config.k]
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return self.search_by_vector(query, conversation_id=run_manager.metadata.get(CONVERSATION_ID_KEY),
+                                     document_ids=run_manager.metadata.get(DOCUMENT_IDS_KEY),
+                                     query_embedding=run_manager.metadata.get(QUERY_EMBEDDING_KEY))
+
+    def search_by_vector(self, query: str, embedding: Optional[List[float]] = None,
+                         conversation_id: Optional[str] = None,
+                         document_ids: Optional[List[str]] = None,
+                         query_embedding: Optional[QueryEmbedding] = None) -> List[Document]:
+        """
+        Same as ``invoke``; pass ``embedding`` when the question is already embedded
+        (batch QA). Without one the question is only embedded if the fast path misses,
+        through ``query_embedding`` when given so the answer cache can reuse the vector.
+        Both halves of the search are restricted to ``document_ids`` when given.
+        """
+        config = self.config
+        hits = self._lexical_search(query, document_ids)
+        if self.is_strong_lexical_match(hits):
+            telemetry.record_cache("lexical_fast_path", hits=1)
+            return [hit.document for hit in hits[:config.k]]
+        telemetry.record_cache("lexical_fast_path", misses=1)
+
+        if embedding is None:
+            embedding = (query_embedding.get() if query_embedding is not None
+                         else self.vector_retriever.vector_store.embeddings.embed_query(query))
+        vector_documents = self.vector_retriever.search_by_vector(embedding, k=config.candidates,
+                                                                  conversation_id=conversation_id,
+                                                                  document_ids=document_ids)
+        return self._fuse(hits, vector_documents)
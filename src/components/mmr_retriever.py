@@ -0,0 +1,206 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import VectorStore as LangchainVectorStore
+from langchain_pinecone import PineconeVectorStore
+
+from src.constant import DOCUMENT_ID_METADATA_KEY
+from src.entity.config_entity import MMRConfig
+from src.telemetry import telemetry
+from src.vector_db_connection.document_registry import DocumentVersionRegistry
+from src.vector_db_connection.local_index import LocalVectorStore
+from src.vector_db_connection.mmr import maximal_marginal_relevance, normalize
+
+# RunnableConfig metadata key naming the conversation a question belongs to
+CONVERSATION_ID_KEY: str = "conversation_id"
+# RunnableConfig metadata key holding the document ids retrieval is restricted to
+DOCUMENT_IDS_KEY: str = "document_ids"
+# RunnableConfig metadata key holding the QueryEmbedding of the question
+QUERY_EMBEDDING_KEY: str = "query_embedding"
+
+
+class QueryEmbedding:
+    """
+    The query embedding of one question, computed on first use. Retrieval and the answer
+    cache share it through the run metadata, so a question is embedded at most once, and
+    not at all when the lexical fast path answers the retrieval.
+    """
+
+    def __init__(self, embeddings: Embeddings, query: str):
+        self.embeddings = embeddings
+        self.query = query
+        # None until something needed the vector
+        self.vector: Optional[List[float]] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> List[float]:
+        with self._lock:
+            if self.vector is None:
+                self.vector = self.embeddings.embed_query(self.query)
+            return self.vector
+
+
+def embed_query(query: str, embeddings: Embeddings, metadata: dict) -> List[float]:
+    """Embeds ``query`` through the QueryEmbedding of the run ``metadata`` when there is one."""
+    query_embedding = metadata.get(QUERY_EMBEDDING_KEY)
+    if query_embedding is not None:
+        return query_embedding.get()
+    return embeddings.embed_query(query)
+
+
+def get_scope_filter(document_ids: Optional[Iterable[str]]) -> Optional[dict]:
+    """Metadata filter matching the chunks of ``document_ids``; None (no filter) when no scope is given."""
+    if document_ids is None:
+        return None
+    return {DOCUMENT_ID_METADATA_KEY: {"$in": sorted(set(document_ids))}}
+
+
+def get_scope_key(document_ids: Optional[Iterable[str]]) -> str:
+    """Short stable key of a document scope, empty for the unscoped index."""
+    if document_ids is None:
+        return ""
+    return hashlib.sha256("\n".join(sorted(set(document_ids))).encode("utf-8")).hexdigest()[:16]
+
+
+def search_with_vectors(vector_store: LangchainVectorStore, embedding: List[float],
+                        k: int, filter: Optional[dict] = None) -> Tuple[List[Document], np.ndarray]:
+    """Returns the ``k`` nearest documents matching the metadata ``filter`` together with their stored vectors."""
+    if isinstance(vector_store, LocalVectorStore):
+        return vector_store.similarity_search_with_vectors(embedding, k, filter=filter)
+    if isinstance(vector_store, PineconeVectorStore):
+        response = vector_store._index.query(vector=embedding, top_k=k, include_values=True,
+                                             include_metadata=True, namespace=vector_store._namespace,
+                                             filter=filter)
+        documents, vectors = [], []
+        for match in response["matches"]:
+            metadata = dict(match["metadata"])
+            documents.append(Document(page_content=metadata.pop(vector_store._text_key), metadata=metadata))
+            vectors.append(match["values"])
+        if not vectors:
+            return documents, np.zeros((0, len(embedding)), dtype=np.float32)
+        return documents, np.asarray(vectors, dtype=np.float32)
+    raise TypeError(f"Unsupported vector store for MMR re-ranking: {type(vector_store).__name__}")
+
+
+class CandidatePool:
+    """Candidates retrieved during one conversation, with the query vectors that fetched them."""
+
+    def __init__(self, fingerprint: str, pool_size: int):
+        self.fingerprint = fingerprint
+        self.pool_size = pool_size
+        self.queries = np.zeros((0, 0), dtype=np.float32)
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.documents: List[Document] = []
+        self.keys: Dict[Tuple[str, Optional[str]], int] = {}
+        self.last_used = time.monotonic()
+
+    def covers(self, query: np.ndarray, min_similarity: float) -> bool:
+        return bool(len(self.queries)) and float(np.max(self.queries @ query)) >= min_similarity
+
+    def add(self, query: np.ndarray, documents: List[Document], vectors: np.ndarray):
+        self.queries = query[None, :] if not len(self.queries) else np.vstack([self.queries, query])
+        new = [i for i, document in enumerate(documents)
+               if (document.page_content, document.metadata.get("source")) not in self.keys]
+        if new:
+            # a new list, so a concurrent reader keeps a consistent (documents, vectors) pair
+            self.documents = self.documents + [documents[i] for i in new]
+            added = normalize(vectors[new])
+            self.vectors = added if not len(self.vectors) else np.vstack([self.vectors, added])
+        if len(self.documents) > self.pool_size:
+            # the oldest candidates go first
+            self.documents = self.documents[-self.pool_size:]
+            self.vectors = self.vectors[-self.pool_size:]
+        self.keys = {(document.page_content, document.metadata.get("source")): i
+                     for i, document in enumerate(self.documents)}
+
+
+class MMRRetriever(BaseRetriever):
+    """
+    Vector retriever re-ranking ``fetch_k`` candidates with maximal marginal relevance
+    computed locally in numpy.
+
+    Candidates fetched for a conversation (``conversation_id`` in the run metadata)
+    are kept in a bounded pool. A follow-up question whose embedding is at least
+    ``reuse_similarity`` similar to an earlier question of the same conversation is
+    re-ranked from that pool without another vector store query. Pools are dropped
+    when the indexed documents change, after ``conversation_ttl_seconds`` of
+    inactivity, and least recently used first beyond ``max_conversations``.
+
+    ``document_ids`` in the run metadata restricts the search to the chunks of those
+    documents; a pool only serves questions asked with the scope it was filled for.
+    """
+
+    vector_store: LangchainVectorStore
+    config: MMRConfig
+    version_registry: DocumentVersionRegistry
+
+    _pools: "OrderedDict[str, CandidatePool]"
+    _lock: threading.Lock
+
+    class Config:
+        arbitrary_types_allowed = True
+        underscore_attrs_are_private = True
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._pools = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_pool(self, conversation_id: str, fingerprint: str) -> CandidatePool:
+        now = time.monotonic()
+        with self._lock:
+            for expired in [key for key, pool in self._pools.items()
+                            if now - pool.last_used > self.config.conversation_ttl_seconds]:
+                del self._pools[expired]
+            pool = self._pools.get(conversation_id)
+            if pool is None or pool.fingerprint != fingerprint:
+                pool = self._pools[conversation_id] = CandidatePool(fingerprint, self.config.pool_size)
+            self._pools.move_to_end(conversation_id)
+            while len(self._pools) > self.config.max_conversations:
+                self._pools.popitem(last=False)
+            pool.last_used = now
+            return pool
+
+    def search_by_vector(self, embedding: List[float], k: int = None,
+                         conversation_id: Optional[str] = None,
+                         document_ids: Optional[List[str]] = None) -> List[Document]:
+        if document_ids is not None and not document_ids:
+            # an empty scope matches no chunk (and Pinecone rejects an empty $in)
+            return []
+        config = self.config
+        k = k or config.k
+        query = normalize(np.asarray(embedding, dtype=np.float32).reshape(-1))
+        pool = None
+        if conversation_id:
+            fingerprint = f"{self.version_registry.fingerprint()}:{get_scope_key(document_ids)}"
+            pool = self._get_pool(conversation_id, fingerprint)
+
+        with self._lock:
+            reused = pool is not None and pool.covers(query, config.reuse_similarity)
+            if reused:
+                documents, vectors = pool.documents, pool.vectors
+        if not reused:
+            documents, vectors = search_with_vectors(self.vector_store, embedding, max(config.fetch_k, k),
+                                                     filter=get_scope_filter(document_ids))
+            if pool is not None:
+                with self._lock:
+                    pool.add(query, documents, vectors)
+        if pool is not None:
+            telemetry.record_cache("mmr_candidates", hits=int(reused), misses=int(not reused))
+
+        with telemetry.span("mmr", candidates=len(documents)):
+            selected = maximal_marginal_relevance(query, vectors, k=k, lambda_mult=config.lambda_mult)
+        return [documents[i] for i in selected]
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        embedding = embed_query(query, self.vector_store.embeddings, run_manager.metadata)
+        return self.search_by_vector(embedding, conversation_id=run_manager.metadata.get(CONVERSATION_ID_KEY),
+                                     document_ids=run_manager.metadata.get(DOCUMENT_IDS_KEY))
@@ -1,20 +1,31 @@
 import sys
+from typing import List, Optional
 
 from langchain import hub
+from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.runnables import Runnable, RunnablePassthrough
 from langchain_pinecone import PineconeVectorStore
 from langchain.prompts import PromptTemplate
 
+from src.components.answer_cache import AnswerCache, CachedQAChain
+from src.components.context_packing import context_packer
+from src.components.hybrid_retriever import HybridRetriever
+from src.components.mmr_retriever import MMRRetriever
 from src.constant import PINECONE_INDEX_NAME
+from src.entity.config_entity import HybridRetrievalConfig, MMRConfig
 from src.exception import CustomException
 from src.logger import get_logger
+from src.telemetry import telemetry
+from src.telemetry.callbacks import telemetry_callback
 from src.vector_db_connection import VectorStore
+from src.vector_db_connection.document_registry import DocumentVersionRegistry
 
 
 class QAFormatter:
-    def __init__(self, llm):
+    def __init__(self, llm, hybrid_retrieval_config: HybridRetrievalConfig = None, mmr_config: MMRConfig = None):
         """
         Initialize a QAFormatter instance.
     
@@ -23,15 +34,19 @@ class QAFormatter:
     
         Parameters:
         llm (LLM): The language model to be used for question answering.
+        hybrid_retrieval_config (HybridRetrievalConfig): Settings for the lexical + vector retriever.
+        mmr_config (MMRConfig): fetch_k, k and lambda_mult of the MMR re-ranking and candidate reuse.
     
         Attributes:
         llm (LLM): The language model to be used for question answering.
         logger (Logger): The logger instance for logging errors and information.
         """
         self.llm = llm
+        self.hybrid_retrieval_config = hybrid_retrieval_config or HybridRetrievalConfig()
+        self.mmr_config = mmr_config or MMRConfig()
         self.logger = get_logger(__name__)
 
-    def get_vector_store(self, embeddings: Embeddings) -> PineconeVectorStore:
+    def get_vector_store(self, embeddings: Embeddings, namespace: str = None) -> PineconeVectorStore:
         """
         Retrieves a vector store instance using the provided embeddings.
 
@@ -40,6 +55,7 @@ class QAFormatter:
 
         Parameters:
         embeddings (Embeddings): The embeddings to be used for vector store creation.
+        namespace (str): The vector store namespace to search.
 
         Returns:
         VectorStore: The created vector store instance.
@@ -49,29 +65,92 @@ class QAFormatter:
         """
         try:
             vector_store = VectorStore(PINECONE_INDEX_NAME)
-            return vector_store.get_vectorstore(embeddings=embeddings)
+            return vector_store.get_vectorstore(embeddings=embeddings, namespace=namespace)
         except Exception as e:
             raise CustomException(e, sys)
 
-    def form_qa_chain(self, embeddings: Embeddings) -> RunnablePassthrough:
+    def get_retriever(self, embeddings: Embeddings, namespace: str = None) -> BaseRetriever:
         """
-        This function forms a QA chain using a Retrieval Augmented Generation (RAG) approach.
-        It retrieves relevant documents from a vector store based on the input embeddings,
-        formats the documents, and uses a language model to answer questions.
-    
+        Builds the retriever used by the QA chain.
+
         Parameters:
         embeddings (Embeddings): The embeddings to be used for document retrieval.
-    
+        namespace (str): The vector store namespace to search.
+
         Returns:
-        RunnablePassthrough: The final QA chain, which can be used to answer questions.
-    
-        Raises:
-        CustomException: If an error occurs during the process.
+        BaseRetriever: The retriever returning the documents relevant to a question.
         """
         try:
-            vector_store = self.get_vector_store(embeddings)
-            retriever = vector_store.as_retriever(search_type="mmr")
+            hybrid_retriever = self.get_hybrid_retriever(embeddings, namespace=namespace)
+            if hybrid_retriever is not None:
+                return hybrid_retriever
+            return self.get_mmr_retriever(embeddings, namespace=namespace)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def get_mmr_retriever(self, embeddings: Embeddings, namespace: str = None) -> MMRRetriever:
+        """
+        Builds the vector retriever re-ranking its candidates with maximal marginal relevance.
+
+        Parameters:
+        embeddings (Embeddings): The embeddings to be used for document retrieval.
+        namespace (str): The vector store namespace to search.
+
+        Returns:
+        MMRRetriever: The retriever configured by ``mmr_config``.
+        """
+        try:
+            return MMRRetriever(vector_store=self.get_vector_store(embeddings, namespace=namespace),
+                                config=self.mmr_config,
+                                version_registry=DocumentVersionRegistry.open())
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def get_hybrid_retriever(self, embeddings: Embeddings, namespace: str = None) -> Optional[HybridRetriever]:
+        """
+        Builds the retriever fusing BM25 and vector search results.
+
+        Parameters:
+        embeddings (Embeddings): The embeddings to be used for the vector half of the search.
+        namespace (str): The vector store namespace to search.
+
+        Returns:
+        Optional[HybridRetriever]: The hybrid retriever, or None when the lexical index is disabled.
+        """
+        try:
+            vector_store = VectorStore(PINECONE_INDEX_NAME)
+            if not vector_store.lexical_index_config.enabled:
+                return None
+            return HybridRetriever(vector_retriever=self.get_mmr_retriever(embeddings, namespace=namespace),
+                                   lexical_index=vector_store.get_lexical_index(namespace),
+                                   config=self.hybrid_retrieval_config)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @staticmethod
+    def format_docs(docs: List[Document]) -> str:
+        """
+        Helper function to format retrieved documents.
+
+        Overlapping chunks of the same page are merged, duplicates dropped and the
+        result packed into the CONTEXT_MAX_TOKENS budget, most relevant first.
+
+        Parameters:
+        docs (List[Document]): The retrieved documents, most relevant first.
+
+        Returns:
+        str: The packed context, blocks separated by blank lines.
+        """
+        return context_packer.pack(docs)
+
+    def form_generation_chain(self) -> Runnable:
+        """
+        Forms the generation half of the RAG chain: prompt, language model and output parser.
 
+        Returns:
+        Runnable: A chain taking {"question": str, "context": str} and producing the answer text.
+        """
+        try:
             # prompt = hub.pull("rlm/rag-prompt")
             # print(prompt)
 
@@ -94,27 +173,66 @@ class QAFormatter:
                 input_variables=["question", "context"],
                 template=template
             )
-            
-            
-            def format_docs(docs):
-                """
-                Helper function to format retrieved documents.
+
+            generation_chain = prompt | self.llm | StrOutputParser()
+            if not telemetry.enabled:
+                return generation_chain
+            # the callback times the LLM call and records its token usage
+            return generation_chain.with_config(callbacks=[telemetry_callback])
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def form_qa_chain(self, embeddings: Embeddings, namespace: str = None) -> RunnablePassthrough:
+        """
+        This function forms a QA chain using a Retrieval Augmented Generation (RAG) approach.
+        It retrieves relevant documents from a vector store based on the input embeddings,
+        formats the documents, and uses a language model to answer questions.
     
-                Parameters:
-                docs (List[Document]): The retrieved documents.
+        Parameters:
+        embeddings (Embeddings): The embeddings to be used for document retrieval.
+        namespace (str): The vector store namespace to search.
     
-                Returns:
-                str: The formatted documents, separated by newlines.
-                """
-                return "\n\n".join(doc.page_content for doc in docs)
+        Returns:
+        RunnablePassthrough: The final QA chain, which can be used to answer questions.
+    
+        Raises:
+        CustomException: If an error occurs during the process.
+        """
+        try:
+            retriever = self.get_retriever(embeddings, namespace=namespace)
 
             rag_chain = (
-                    {"context": retriever | format_docs, "question": RunnablePassthrough()}
-                    | prompt
-                    | self.llm
-                    | StrOutputParser()
+                    {"context": retriever | self.format_docs, "question": RunnablePassthrough()}
+                    | self.form_generation_chain()
             )
-            return rag_chain
+            if not telemetry.enabled:
+                return rag_chain
+            # registered on the whole chain as well, so the retriever run is recorded too
+            return rag_chain.with_config(callbacks=[telemetry_callback])
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def form_cached_qa_chain(self, embeddings: Embeddings, answer_cache: AnswerCache,
+                             namespace: str = None) -> CachedQAChain:
+        """
+        Forms the same RAG chain as ``form_qa_chain`` with ``answer_cache`` checked before
+        retrieval (exact matches) and between retrieval and generation (similar questions).
+
+        Parameters:
+        embeddings (Embeddings): The embeddings to be used for document retrieval.
+        answer_cache (AnswerCache): The cache answers are served from and stored in.
+        namespace (str): The vector store namespace to search.
+
+        Returns:
+        CachedQAChain: The cached QA chain.
+        """
+        try:
+            retrieval_chain = self.get_retriever(embeddings, namespace=namespace) | self.format_docs
+            if telemetry.enabled:
+                retrieval_chain = retrieval_chain.with_config(callbacks=[telemetry_callback])
+            return CachedQAChain(retrieval_chain, self.form_generation_chain(), answer_cache, embeddings)
 
         except Exception as e:
             raise CustomException(e, sys)
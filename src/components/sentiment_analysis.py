@@ -1,80 +1,234 @@
-import os
+import hashlib
+import re
 import sys
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
 
 from dotenv import load_dotenv
-from langchain.agents import AgentType, initialize_agent
-from langchain.tools import StructuredTool
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.language_models import BaseChatModel
+from langchain_core.prompts import ChatPromptTemplate
 from langchain_openai import ChatOpenAI
 from pydantic.v1 import BaseModel, Field
 
+from src.entity.artifact_entity import SentimentArtifact
+from src.entity.config_entity import SentimentConfig
 from src.exception import CustomException
+from src.logger import get_logger
+from src.telemetry import telemetry
+from src.utils.registry import resource_registry
 
 # Load environment variables from .env file
 load_dotenv(override=True)
 
+SENTIMENTS: Tuple[str, ...] = ("Positive", "Neutral", "Negative")
+
+# word -> weight; the score of a text is the sum over its words, so this is a linear classifier
+# over word counts with hand-set weights
+_LEXICON: Dict[str, float] = {
+    **dict.fromkeys(["good", "great", "nice", "helpful", "useful", "clear", "correct", "fast", "easy",
+                     "love", "like", "happy", "glad", "perfect", "works", "worked", "solved", "fixed",
+                     "accurate", "appreciate", "cool", "fine", "pleased", "recommend", "smooth",
+                     "satisfied", "wonderful", "brilliant", "impressive", "reliable"], 1.0),
+    **dict.fromkeys(["excellent", "amazing", "awesome", "fantastic", "outstanding", "thanks", "thank",
+                     "superb", "best", "loved"], 1.5),
+    **dict.fromkeys(["bad", "wrong", "slow", "confusing", "unclear", "useless", "broken", "error",
+                     "fails", "failed", "failing", "crash", "crashes", "bug", "problem", "issue",
+                     "annoying", "disappointed", "disappointing", "difficult", "hard", "incorrect",
+                     "missing", "poor", "unhappy", "frustrated", "frustrating", "stuck", "hate",
+                     "dislike", "waste", "unreliable", "sad", "angry", "upset"], -1.0),
+    **dict.fromkeys(["terrible", "awful", "horrible", "worst", "garbage", "unacceptable", "ridiculous",
+                     "pathetic", "disaster", "hopeless"], -1.5),
+}
+_NEGATIONS = frozenset(["not", "no", "never", "nothing", "hardly", "without", "dont", "doesnt", "didnt",
+                        "isnt", "wasnt", "arent", "cant", "cannot", "wont", "couldnt", "shouldnt"])
+_INTENSIFIERS = frozenset(["very", "really", "so", "extremely", "super", "totally", "absolutely", "too"])
+# a negation flips the polarity of the sentiment words up to this many words after it
+_NEGATION_SCOPE = 3
+_WORD_PATTERN = re.compile(r"[a-z]+")
+
+
+def lexicon_sentiment(text: str) -> Tuple[str, float]:
+    """
+    Scores ``text`` with the built-in lexicon and returns ``(sentiment, confidence)``.
+
+    Confidence is the margin between positive and negative evidence relative to all
+    evidence (plus one, so a single weak word never reaches full confidence); texts
+    without sentiment words or with mixed signals come back with a low confidence.
+    """
+    positive = negative = 0.0
+    negated_until = -1
+    boost = 1.0
+    for position, word in enumerate(_WORD_PATTERN.findall(text.lower().replace("'", ""))):
+        if word in _NEGATIONS:
+            negated_until = position + _NEGATION_SCOPE
+            continue
+        if word in _INTENSIFIERS:
+            boost = 1.5
+            continue
+        weight = _LEXICON.get(word)
+        if weight is not None:
+            weight *= boost * (-1 if position <= negated_until else 1)
+            if weight > 0:
+                positive += weight
+            else:
+                negative -= weight
+        boost = 1.0
+    score = positive - negative
+    if not score:
+        return "Neutral", 0.0
+    return ("Positive" if score > 0 else "Negative"), abs(score) / (positive + negative + 1.0)
+
+
+class SentimentCache:
+    """Thread-safe LRU of model classifications keyed by the sha256 of the text."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
 
-class SearchInput(BaseModel):
-    sentiment: str = Field(
-        description="""Analyse the user sentiment and enter one value out of three sentiments, 
-        which are Positive, Neutral and Negative""")
+    @staticmethod
+    def key(text: str, model: str) -> str:
+        return hashlib.sha256(f"{model}\n{text}".encode("utf-8")).hexdigest()
 
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
 
-class SentimentAnalyzer:
-    def __init__(self):
-        try:
-            openai_api_key = os.getenv("OPENAI_API_KEY")
-        except Exception:
-            raise KeyError('OPENAI_API_KEY environment variable not found.')
+    def store(self, key: str, sentiment: str, confidence: float):
+        with self._lock:
+            self._entries[key] = (sentiment, confidence)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
 
-        self.llm = ChatOpenAI(temperature=0, model="gpt-3.5-turbo", api_key=openai_api_key)
 
-    @staticmethod
-    def _get_sentiment(sentiment):
-        print("The sentiment is ", sentiment)
-        return sentiment
+class SentimentItem(BaseModel):
+    index: int = Field(description="Number of the text, as given in the input")
+    sentiment: str = Field(description="One of Positive, Neutral or Negative")
+    confidence: float = Field(description="Confidence in the sentiment, between 0 and 1")
+
+
+class SentimentBatch(BaseModel):
+    items: List[SentimentItem] = Field(description="One entry per input text")
 
-    def get_agent(self):
+
+class SentimentAnalyzer:
+    """
+    Batch sentiment classification.
+
+    Texts are first looked up in the cache, then scored with the local lexicon; only
+    texts the lexicon is unsure about go to the model, ``batch_size`` texts per
+    structured-output request with at most ``max_concurrency`` requests in flight.
+    Model results are cached by text hash, so repeated chat turns cost nothing.
+    """
+
+    def __init__(self, llm: BaseChatModel = None, sentiment_config: SentimentConfig = None):
         try:
-            sent = StructuredTool.from_function(
-                func=self._get_sentiment,
-                name="Sentiment",
-                description="""Useful for Sentiment analysis, You will have to pass the values out of these, which are Positive, 
-                Neutral, Negative""",
-                args_schema=SearchInput,
-
-            )
-
-            prompt = ChatPromptTemplate.from_messages(
-                [
-                    (
-                        "system",
-                        "You are a bot who will do sentiment analysis"
-                    ),
-                    ("user", "{input}"),
-                    MessagesPlaceholder(variable_name="agent_scratchpad"),
-                ]
-            )
-
-            agent = initialize_agent(
-                agent=AgentType.OPENAI_FUNCTIONS,
-                tools=[sent],
-                llm=self.llm,
-                verbose=True,
-                prompt=prompt
-
-            )
-            return agent
+            self.sentiment_config = sentiment_config or SentimentConfig()
+            self.llm = llm or ChatOpenAI(temperature=0, model=self.sentiment_config.model_name)
+            self.cache: SentimentCache = resource_registry.get_or_create(
+                ("sentiment-cache", self.sentiment_config.model_name),
+                lambda: SentimentCache(self.sentiment_config.cache_max_entries))
+            self.logger = get_logger(__name__)
+            self._chain = None
 
         except Exception as e:
             raise CustomException(e, sys)
 
-    def analyze_sentiment(self, input: str):
+    def get_chain(self):
+        if self._chain is None:
+            prompt = ChatPromptTemplate.from_messages([
+                ("system",
+                 "You classify the sentiment of user messages. For every numbered text return its "
+                 "number, one sentiment out of Positive, Neutral and Negative, and your confidence "
+                 "between 0 and 1. Return exactly one entry per text."),
+                ("user", "{texts}"),
+            ])
+            self._chain = prompt | self.llm.with_structured_output(SentimentBatch)
+        return self._chain
+
+    def _classify_with_llm(self, texts: List[str]) -> List[Optional[Tuple[str, float]]]:
+        config = self.sentiment_config
+        batches = [texts[start:start + config.batch_size] for start in range(0, len(texts), config.batch_size)]
+        inputs = [{"texts": "\n\n".join(f"{number}. {text[:config.max_text_chars]}"
+                                         for number, text in enumerate(batch, start=1))}
+                  for batch in batches]
+        with telemetry.span("sentiment_llm", texts=len(texts), requests=len(batches)):
+            responses = self.get_chain().batch(inputs, config={"max_concurrency": config.max_concurrency})
+
+        results: List[Optional[Tuple[str, float]]] = []
+        for batch, response in zip(batches, responses):
+            by_index = {item.index: item for item in response.items}
+            for number in range(1, len(batch) + 1):
+                item = by_index.get(number)
+                sentiment = item.sentiment.strip().capitalize() if item is not None else None
+                if sentiment in SENTIMENTS:
+                    results.append((sentiment, min(max(item.confidence, 0.0), 1.0)))
+                else:
+                    results.append(None)
+        return results
+
+    def analyze_batch(self, texts: List[str]) -> List[SentimentArtifact]:
+        """
+        Classifies every text of ``texts``.
+
+        Parameters:
+            texts: messages to classify
+
+        Returns:
+            List[SentimentArtifact]: one result per text, in the order of ``texts``
+        """
         try:
-            agent = self.get_agent()
-            analyse = agent({
-                "input": input + " Do sentiment analysis and return answer in one word, You will have to return just one word"})
-            return analyse['output']
+            config = self.sentiment_config
+            results: List[Optional[SentimentArtifact]] = [None] * len(texts)
+            lexicon_results: Dict[int, Tuple[str, float]] = {}
+            # identical texts are sent to the model once
+            pending: Dict[str, List[int]] = {}
+
+            for position, text in enumerate(texts):
+                normalized = " ".join(text.split())
+                if not normalized:
+                    results[position] = SentimentArtifact(text, "Neutral", 1.0, "lexicon")
+                    continue
+                cached = self.cache.get(self.cache.key(normalized, config.model_name))
+                if cached is not None:
+                    results[position] = SentimentArtifact(text, *cached, "cache")
+                    continue
+                lexicon_results[position] = lexicon_sentiment(normalized)
+                sentiment, confidence = lexicon_results[position]
+                if config.fast_path and confidence >= config.fast_path_min_confidence:
+                    results[position] = SentimentArtifact(text, sentiment, confidence, "lexicon")
+                    continue
+                pending.setdefault(normalized, []).append(position)
+
+            cache_hits = sum(result is not None and result.source == "cache" for result in results)
+            telemetry.record_cache("sentiment", hits=cache_hits, misses=len(texts) - cache_hits)
+
+            if pending:
+                for normalized, classified in zip(pending, self._classify_with_llm(list(pending))):
+                    if classified is not None:
+                        self.cache.store(self.cache.key(normalized, config.model_name), *classified)
+                    else:
+                        self.logger.warning("The model returned no valid sentiment for a text, using the lexicon")
+                    for position in pending[normalized]:
+                        if classified is not None:
+                            results[position] = SentimentArtifact(texts[position], *classified, "llm")
+                        else:
+                            results[position] = SentimentArtifact(texts[position], *lexicon_results[position],
+                                                                  "lexicon")
+
+            self.logger.info(f"Classified {len(texts)} texts, {cache_hits} from cache, "
+                             f"{len(pending)} sent to the model")
+            return results
 
         except Exception as e:
             raise CustomException(e, sys)
+
+    def analyze_sentiment(self, input: str) -> str:
+        """Returns Positive, Neutral or Negative for a single text."""
+        return self.analyze_batch([input])[0].sentiment
@@ -1,35 +1,139 @@
 import sys
+from datetime import datetime
+from typing import Dict, List, Optional
 
-from langchain.chains.summarize import load_summarize_chain
-from langchain_openai import ChatOpenAI
+from langchain_core.documents import Document
+from langchain_core.language_models import BaseChatModel
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import PromptTemplate
+from langchain_core.runnables import Runnable
 
-from src.entity.artifact_entity import DataTransformationArtifact
+from src.components.context_packing import context_packer, estimate_tokens
+from src.constant import SUMMARY_CACHE_FILE_NAME
+from src.entity.config_entity import SummarizerConfig
 from src.exception import CustomException
 from src.logger import get_logger
+from src.telemetry import telemetry
+from src.vector_db_connection.document_registry import JsonRegistry
+
+MAP_PROMPT = """Write a concise summary of the following part of a document.
+Keep names, figures and conclusions; leave out repetition.
+
+{text}
+
+CONCISE SUMMARY:"""
+
+COMBINE_PROMPT = """The following are summaries of consecutive parts of one document.
+Combine them into a single concise summary of the whole document, in the order of the document.
+
+{text}
+
+CONCISE SUMMARY:"""
+
+
+class SummaryCache(JsonRegistry):
+    """Summaries keyed by model, prompt version and the sha256 of the summarized file."""
+
+    default_file_name = SUMMARY_CACHE_FILE_NAME
+
+    @staticmethod
+    def key(content_hash: str, model: str, prompt_version: str) -> str:
+        return f"{model}:{prompt_version}:{content_hash}"
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            self._reload_if_changed()
+            entry = self._data.get(key)
+            return entry["summary"] if entry else None
+
+    def store(self, summaries: Dict[str, str]):
+        """Records ``{key: summary}``."""
+        if not summaries:
+            return
+        with self._lock:
+            self._reload_if_changed()
+            summarized_at = datetime.now().isoformat(timespec="seconds")
+            for key, summary in summaries.items():
+                self._data[key] = {"summary": summary, "summarized_at": summarized_at}
+            self._save()
 
 
 class Summarizer:
-    def __init__(self,
-                 data_transformation_artifact: DataTransformationArtifact):
+    """
+    Hierarchical map-reduce summarization of several documents at once.
+
+    The chunks of each document are de-overlapped and grouped into prompts of at most
+    ``max_input_tokens``; every group is summarized (map), then the partial summaries
+    of a document are grouped the same way and combined (reduce) until one summary is
+    left per document. Each level is one batch over all documents, so at most
+    ``max_concurrency`` LLM calls run at a time across chunks and files, and documents
+    of any length fit the context window.
+    """
 
-        self.data_transformation_artifact = data_transformation_artifact
+    def __init__(self, llm: BaseChatModel, summarizer_config: SummarizerConfig = None):
+        self.summarizer_config = summarizer_config or SummarizerConfig()
+        self.map_chain: Runnable = PromptTemplate.from_template(MAP_PROMPT) | llm | StrOutputParser()
+        self.combine_chain: Runnable = PromptTemplate.from_template(COMBINE_PROMPT) | llm | StrOutputParser()
         self.logger = get_logger(__name__)
 
-    def summarize(self):
+    def group_texts(self, texts: List[str]) -> List[List[str]]:
+        """
+        Splits ``texts`` into consecutive groups that fit ``max_input_tokens``. A group
+        always takes at least two texts when more are left, so every reduce level
+        shrinks the number of summaries even if some are over the budget.
+        """
+        budget = self.summarizer_config.max_input_tokens
+        groups, group, used = [], [], 0
+        for text in texts:
+            tokens = estimate_tokens(text)
+            if group and used + tokens > budget and len(group) > 1:
+                groups.append(group)
+                group, used = [], 0
+            group.append(text)
+            used += tokens
+        if group:
+            groups.append(group)
+        return groups
+
+    def _run_level(self, chain: Runnable, groups: Dict[str, List[List[str]]]) -> Dict[str, List[str]]:
+        """Runs ``chain`` over the groups of every document in one bounded batch."""
+        keys = [(name, index) for name in groups for index in range(len(groups[name]))]
+        outputs = chain.batch([{"text": "\n\n".join(groups[name][index])} for name, index in keys],
+                              config={"max_concurrency": self.summarizer_config.max_concurrency})
+        results: Dict[str, List[str]] = {name: [] for name in groups}
+        for (name, _), output in zip(keys, outputs):
+            results[name].append(output.strip())
+        return results
+
+    def summarize(self, documents: Dict[str, List[Document]]) -> Dict[str, str]:
+        """
+        Summarizes every entry of ``{name: chunks in document order}``.
+
+        Parameters:
+            documents: the split documents of each file
+
+        Returns:
+            Dict[str, str]: one summary per name; names without text are left out
+        """
         try:
-            llm = ChatOpenAI(temperature=0, model_name="gpt-3.5-turbo-1106")
-            summarizer_chain = load_summarize_chain(llm=llm, chain_type="stuff")
-            summaries = {}
-            files = self.data_transformation_artifact.documents
-            # documents =
-            for file_name in files:
-                docs = files[file_name]["documents"]
-                summary = summarizer_chain.invoke(docs)
-                summaries[file_name] = summary
-                self.logger.info(f"Summarized {file_name}")
-
-            return summaries
+            with telemetry.span("summarize", documents=len(documents)) as span:
+                # chunks repeat the tail of their predecessor; merging keeps each passage once
+                groups = {name: self.group_texts(context_packer.merge(chunks))
+                          for name, chunks in documents.items()}
+                groups = {name: document_groups for name, document_groups in groups.items() if document_groups}
+                calls = sum(len(document_groups) for document_groups in groups.values())
+                partial = self._run_level(self.map_chain, groups) if groups else {}
+
+                levels = 1
+                while pending := {name: self.group_texts(summaries)
+                                  for name, summaries in partial.items() if len(summaries) > 1}:
+                    calls += sum(len(document_groups) for document_groups in pending.values())
+                    partial.update(self._run_level(self.combine_chain, pending))
+                    levels += 1
+
+                span.set(llm_calls=calls, levels=levels)
+            self.logger.info(f"Summarized {len(partial)} documents with {calls} LLM calls over {levels} levels")
+            return {name: summaries[0] for name, summaries in partial.items()}
 
         except Exception as e:
             raise CustomException(e, sys)
-
@@ -0,0 +1,125 @@
+from typing import Any, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+from langchain_text_splitters import TextSplitter
+
+
+class OffsetTextSplitter(TextSplitter):
+    """
+    Drop-in replacement for ``RecursiveCharacterTextSplitter`` with literal separators,
+    ``len`` as length function and the separator kept at the start of each piece.
+
+    Chunks are computed as ``(start, end)`` offsets into the page text: separators are
+    located with ``str.find`` inside the current range and pieces are merged by moving
+    two cursors over the list of cut points, so nothing is split, joined or copied
+    until a chunk is materialised. The chunks are identical to the ones
+    ``RecursiveCharacterTextSplitter`` returns for the same settings.
+    """
+
+    def __init__(self,
+                 chunk_size: int = 1000,
+                 chunk_overlap: int = 200,
+                 separators: Optional[Sequence[str]] = None,
+                 add_start_index: bool = False,
+                 strip_whitespace: bool = True,
+                 **kwargs: Any):
+        super().__init__(chunk_size=chunk_size,
+                         chunk_overlap=chunk_overlap,
+                         keep_separator="start",
+                         add_start_index=add_start_index,
+                         strip_whitespace=strip_whitespace,
+                         **kwargs)
+        self._separators = list(separators or ["\n\n", "\n", " ", ""])
+
+    @staticmethod
+    def _cut_points(text: str, start: int, end: int, separator: str) -> Sequence[int]:
+        """Boundaries of the pieces of ``text[start:end]``; each piece begins with ``separator``."""
+        if not separator:
+            return range(start, end + 1)
+        find, step = text.find, len(separator)
+        cuts = [start]
+        append = cuts.append
+        position = find(separator, start, end)
+        if position == start:
+            # a leading separator starts the first piece instead of ending an empty one
+            position = find(separator, start + step, end)
+        while position != -1:
+            append(position)
+            position = find(separator, position + step, end)
+        if end > cuts[-1]:
+            append(end)
+        return cuts
+
+    def _emit(self, text: str, start: int, end: int, chunks: List[Tuple[int, int]]):
+        if self._strip_whitespace:
+            while start < end and text[start].isspace():
+                start += 1
+            while end > start and text[end - 1].isspace():
+                end -= 1
+        if end > start:
+            chunks.append((start, end))
+
+    def _merge(self, text: str, cuts: Sequence[int], first: int, last: int, chunks: List[Tuple[int, int]]):
+        """Merges the contiguous pieces ``cuts[first:last + 1]`` into overlapping chunks."""
+        chunk_size, chunk_overlap = self._chunk_size, self._chunk_overlap
+        low = first
+        for i in range(first, last):
+            length = cuts[i + 1] - cuts[i]
+            total = cuts[i] - cuts[low]
+            if total + length > chunk_size and i > low:
+                self._emit(text, cuts[low], cuts[i], chunks)
+                # drop pieces from the front until what is left fits in the overlap
+                while total > chunk_overlap or (total + length > chunk_size and total > 0):
+                    low += 1
+                    total = cuts[i] - cuts[low]
+        self._emit(text, cuts[low], cuts[last], chunks)
+
+    def _split(self, text: str, start: int, end: int, separators: List[str], chunks: List[Tuple[int, int]]):
+        separator, remaining_separators = separators[-1], []
+        for i, candidate in enumerate(separators):
+            if candidate == "":
+                separator = candidate
+                break
+            if text.find(candidate, start, end) != -1:
+                separator, remaining_separators = candidate, separators[i + 1:]
+                break
+
+        cuts = self._cut_points(text, start, end, separator)
+        run_start = 0
+        for i in range(len(cuts) - 1):
+            piece_start, piece_end = cuts[i], cuts[i + 1]
+            if piece_end - piece_start < self._chunk_size:
+                continue
+            if i > run_start:
+                self._merge(text, cuts, run_start, i, chunks)
+            if remaining_separators:
+                self._split(text, piece_start, piece_end, remaining_separators, chunks)
+            else:
+                # like RecursiveCharacterTextSplitter, an unsplittable piece is kept as is
+                chunks.append((piece_start, piece_end))
+            run_start = i + 1
+        if run_start < len(cuts) - 1:
+            self._merge(text, cuts, run_start, len(cuts) - 1, chunks)
+
+    def split_offsets(self, text: str) -> List[Tuple[int, int]]:
+        """Returns the chunks of ``text`` as ``(start, end)`` offsets."""
+        chunks: List[Tuple[int, int]] = []
+        if text:
+            self._split(text, 0, len(text), self._separators, chunks)
+        return chunks
+
+    def split_text(self, text: str) -> List[str]:
+        return [text[start:end] for start, end in self.split_offsets(text)]
+
+    def create_documents(self, texts: List[str], metadatas: Optional[List[dict]] = None) -> List[Document]:
+        metadatas = metadatas or [{}] * len(texts)
+        documents = []
+        for text, metadata in zip(texts, metadatas):
+            for start, end in self.split_offsets(text):
+                # shallow copy: loader metadata (source, page) is flat
+                chunk_metadata = dict(metadata)
+                if self._add_start_index:
+                    chunk_metadata["start_index"] = start
+                # the chunk is a str slice and the metadata a plain dict; skip pydantic validation
+                documents.append(Document.construct(page_content=text[start:end], metadata=chunk_metadata))
+        return documents
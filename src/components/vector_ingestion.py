@@ -1,37 +1,156 @@
 import os, sys
+import contextvars
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Deque, Dict, Iterable, Iterator, List, Tuple
 
+from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings
 from langchain_openai import OpenAIEmbeddings
 
 from src.constant import PINECONE_INDEX_NAME
 from src.entity.artifact_entity import DataTransformationArtifact
+from src.entity.config_entity import VectorIngestionConfig
 from src.logger import get_logger
+from src.telemetry import telemetry
 from src.exception import CustomException
+from src.utils import retry_with_backoff
 from src.vector_db_connection import VectorStore
 
 
+class PrecomputedEmbeddings(Embeddings):
+    """Serves vectors computed ahead of the upsert; texts it has not seen go to ``fallback``."""
+
+    def __init__(self, vectors: Dict[str, List[float]], fallback: Embeddings):
+        self.vectors = vectors
+        self.fallback = fallback
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        missing = [text for text in texts if text not in self.vectors]
+        if missing:
+            self.vectors.update(zip(missing, self.fallback.embed_documents(missing)))
+        return [self.vectors[text] for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.fallback.embed_query(text)
+
+
 class VectorIngestion:
     def __init__(self,
-                 data_transformation_artifacts: list[DataTransformationArtifact]):
-        self.data_transformation_artifact = data_transformation_artifacts
+                 data_transformation_artifacts: list[DataTransformationArtifact] = None,
+                 vector_ingestion_config: VectorIngestionConfig = None,
+                 namespace: str = None):
+        self.data_transformation_artifact = data_transformation_artifacts or []
+        self.vector_ingestion_config = vector_ingestion_config or VectorIngestionConfig()
+        # vector store namespace the chunks are written to; None is the default namespace
+        self.namespace = namespace
         self.logger = get_logger(__name__)
         self.vector_store = VectorStore(pinecone_index_name=PINECONE_INDEX_NAME,
 
                                         )
 
+    def iter_batches(self, documents: Iterable[Document]) -> Iterator[List[Document]]:
+        batch = []
+        for document in documents:
+            batch.append(document)
+            if len(batch) == self.vector_ingestion_config.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _with_retry(self, func):
+        return retry_with_backoff(func,
+                                  max_retries=self.vector_ingestion_config.max_retries,
+                                  base_delay=self.vector_ingestion_config.retry_base_delay,
+                                  max_delay=self.vector_ingestion_config.retry_max_delay,
+                                  logger=self.logger)
+
+    def _embed_batch(self, embeddings: Embeddings, batch: List[Document]) -> Dict[str, List[float]]:
+        texts = list(dict.fromkeys(document.page_content for document in batch))
+        with telemetry.span("embed", texts=len(texts)):
+            vectors = self._with_retry(lambda: embeddings.embed_documents(texts))
+        return dict(zip(texts, vectors))
+
+    def _upsert_batch(self, embeddings: Embeddings, batch: List[Document],
+                      embedded: "Future[Dict[str, List[float]]]") -> dict:
+        precomputed = PrecomputedEmbeddings(embedded.result(), fallback=embeddings)
+        with telemetry.span("upsert", documents=len(batch)):
+            result = self._with_retry(lambda: self.vector_store.upload_document(embeddings=precomputed,
+                                                                                documents=batch,
+                                                                                namespace=self.namespace,
+                                                                                cleanup=None))
+        telemetry.record_chunks("upsert", len(batch))
+        return result
+
+    def ingest_batches(self,
+                       embeddings: Embeddings,
+                       document_batches: Iterable[List[Document]]) -> dict:
+        """
+        Embeds and upserts ``document_batches`` as a bounded pipeline.
+
+        Up to ``embedding_workers`` batches are embedded concurrently while the oldest
+        finished batch is upserted on the calling thread. At most ``max_in_flight``
+        batches are pulled from ``document_batches`` ahead of the upsert, so a lazy
+        iterator is never drained faster than the vector store can absorb it.
+        Chunks of the touched sources that were not re-indexed are removed at the end.
+
+        Returns:
+            dict: totals of the index() results plus the number of stale chunks deleted.
+        """
+        try:
+            config = self.vector_ingestion_config
+            run_started_at = self.vector_store.get_record_manager(self.namespace).get_time()
+            totals = {"num_added": 0, "num_updated": 0, "num_skipped": 0, "num_deleted": 0}
+            sources = set()
+            # members are sources of their own; cleaning under the archive drops the ones it no longer contains
+            archives = set()
+
+            def upsert_oldest():
+                result = self._upsert_batch(embeddings, *in_flight.popleft())
+                for key in totals:
+                    totals[key] += result.get(key, 0)
+
+            in_flight: Deque[Tuple[List[Document], Future]] = deque()
+            with ThreadPoolExecutor(max_workers=config.embedding_workers,
+                                    thread_name_prefix="embed") as executor:
+                for batch in document_batches:
+                    while len(in_flight) >= config.max_in_flight:
+                        upsert_oldest()
+                    sources.update(document.metadata.get("source") for document in batch)
+                    archives.update(document.metadata["archive"] for document in batch
+                                    if document.metadata.get("archive"))
+                    # run in a copy of the caller's context so embed spans join the caller's trace
+                    in_flight.append((batch, executor.submit(contextvars.copy_context().run,
+                                                             self._embed_batch, embeddings, batch)))
+                    # upsert as soon as the oldest embedding is ready instead of waiting for the window to fill
+                    if in_flight[0][1].done():
+                        upsert_oldest()
+
+                while in_flight:
+                    upsert_oldest()
+
+            totals["num_deleted"] += self.vector_store.cleanup_sources(embeddings, sources, before=run_started_at,
+                                                                       namespace=self.namespace,
+                                                                       source_prefixes=[os.path.join(archive, "")
+                                                                                        for archive in archives])
+            return totals
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
     def ingest_data_to_vectordb(self,
                                 embeddings: Embeddings,
                                 ):
         try:
-            
-            for artifact in self.data_transformation_artifact:
-                
-                self.vector_store.upload_document(
-                    embeddings=embeddings,
-                    documents=artifact.documents
-                )
-
-                self.logger.info(f"Data ingested successfully to Pinecone index: {PINECONE_INDEX_NAME}")
+            documents = (document
+                         for artifact in self.data_transformation_artifact
+                         for document in artifact.documents)
+            result = self.ingest_batches(embeddings, self.iter_batches(documents))
+
+            self.logger.info(f"Data ingested successfully to {self.vector_store.backend} index: "
+                             f"{PINECONE_INDEX_NAME} namespace: {self.namespace or 'default'} {result}")
+            return result
 
         except Exception as e:
             raise CustomException(e, sys)
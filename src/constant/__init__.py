@@ -1,10 +1,192 @@
+import os
+
 #artifacts
 
 ARTIFACT_DIR: str = "artifacts"
 LOG_DIR: str = "logs"
 
+#logging
+LOG_FILE_NAME: str = "app.log"
+LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO").upper()
+# write each record as one JSON object per line instead of the text format
+LOG_JSON: bool = os.getenv("LOG_JSON", "false").lower() == "true"
+# "size" rotates at LOG_MAX_BYTES, "time" at every LOG_ROTATE_WHEN interval
+LOG_ROTATION: str = os.getenv("LOG_ROTATION", "size").lower()
+LOG_MAX_BYTES: int = int(os.getenv("LOG_MAX_BYTES", str(20 * 1024 * 1024)))
+LOG_ROTATE_WHEN: str = os.getenv("LOG_ROTATE_WHEN", "midnight")
+# rotated files kept before the oldest is deleted
+LOG_BACKUP_COUNT: int = int(os.getenv("LOG_BACKUP_COUNT", "7"))
+# keep one in every N DEBUG records per logger (1 keeps them all)
+LOG_DEBUG_SAMPLE_EVERY: int = int(os.getenv("LOG_DEBUG_SAMPLE_EVERY", "100"))
+
 #file storage
 FILE_STORAGE_ARTIFACT_DIR_NAME: str = "file_storage"
+FILE_COPY_BUFFER_SIZE: int = 1024 * 1024
+# content hashes of uploads already in the index; unchanged re-uploads are skipped
+INDEXED_FILES_FILE_NAME: str = "indexed_files.json"
+# uploads are stored once per content, as <objects dir>/<sha256[:2]>/<sha256><extension>
+FILE_OBJECTS_DIR_NAME: str = "objects"
+# upload name -> sha256 of its current content
+FILE_MANIFEST_FILE_NAME: str = "file_manifest.json"
+# uploads and ingestion state of a tenant namespace live under ARTIFACT_DIR/<this>/<namespace>
+NAMESPACES_DIR_NAME: str = "namespaces"
+# namespaces name directories as well as vector store namespaces, so they are restricted to safe names
+NAMESPACE_PATTERN: str = r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$"
 
 #vector database
 PINECONE_INDEX_NAME: str = "poc-101-rag"
+EMBEDDING_DIMENSION: int = 1536
+# chunk metadata: sha256 of the uploaded document a chunk comes from, and the session that uploaded it
+DOCUMENT_ID_METADATA_KEY: str = "document_id"
+SESSION_ID_METADATA_KEY: str = "session_id"
+
+# "pinecone", "local" (in-process index persisted under ARTIFACT_DIR) or "memory" (in-process, not persisted)
+VECTOR_STORE_BACKEND: str = os.getenv("VECTOR_STORE_BACKEND", "pinecone")
+
+#local vector index
+LOCAL_VECTOR_INDEX_DIR_NAME: str = "vector_index"
+LOCAL_VECTOR_INDEX_TYPE: str = os.getenv("LOCAL_VECTOR_INDEX_TYPE", "auto")  # auto | flat | ivf
+LOCAL_VECTOR_INDEX_FLAT_THRESHOLD: int = 20_000
+LOCAL_VECTOR_INDEX_NPROBE: int = 8
+
+#lexical index
+LEXICAL_INDEX_DIR_NAME: str = "lexical_index"
+# BM25 index maintained next to the vector store; used for hybrid retrieval
+LEXICAL_INDEX_ENABLED: bool = os.getenv("LEXICAL_INDEX_ENABLED", "true").lower() == "true"
+BM25_K1: float = 1.2
+BM25_B: float = 0.75
+
+#mmr retrieval
+MMR_K: int = int(os.getenv("MMR_K", "4"))
+# candidates fetched from the vector store before the MMR re-ranking
+MMR_FETCH_K: int = int(os.getenv("MMR_FETCH_K", "20"))
+# 1 ranks by relevance only, 0 by diversity only
+MMR_LAMBDA_MULT: float = float(os.getenv("MMR_LAMBDA_MULT", "0.5"))
+# a follow-up question this similar to an earlier one of the conversation is re-ranked from its candidates
+MMR_CANDIDATE_REUSE_SIMILARITY: float = 0.85
+MMR_CANDIDATE_POOL_SIZE: int = 200
+MMR_MAX_CONVERSATIONS: int = 1_000
+MMR_CONVERSATION_TTL_SECONDS: int = 30 * 60
+
+#context packing
+# upper bound on the tokens of retrieved context put into the prompt
+CONTEXT_MAX_TOKENS: int = int(os.getenv("CONTEXT_MAX_TOKENS", "2000"))
+# "estimate" counts tokens locally; "tiktoken" uses CONTEXT_TIKTOKEN_ENCODING (downloaded on first use)
+CONTEXT_TOKENIZER: str = os.getenv("CONTEXT_TOKENIZER", "estimate")
+CONTEXT_TIKTOKEN_ENCODING: str = "cl100k_base"
+# shortest shared text that counts as an overlap between two chunks
+CONTEXT_MIN_OVERLAP: int = 20
+# a block truncated to fit the budget must keep at least this many tokens, otherwise it is dropped
+CONTEXT_MIN_BLOCK_TOKENS: int = 50
+
+#hybrid retrieval
+HYBRID_RETRIEVAL_CANDIDATES: int = 10
+HYBRID_RETRIEVAL_RRF_K: int = 60
+# answer from BM25 alone when the top hit contains every identifier (part number, clause id) of the query
+HYBRID_LEXICAL_FAST_PATH: bool = os.getenv("HYBRID_LEXICAL_FAST_PATH", "true").lower() == "true"
+HYBRID_FAST_PATH_MIN_COVERAGE: float = 0.5
+
+#embedding cache
+EMBEDDING_CACHE_DIR_NAME: str = "embedding_cache"
+EMBEDDING_CACHE_MAX_ENTRIES: int = 200_000
+EMBEDDING_CACHE_DTYPE: str = "float16"  # float16 | float32
+
+#vector ingestion
+VECTOR_INGESTION_BATCH_SIZE: int = 64
+VECTOR_INGESTION_EMBEDDING_WORKERS: int = 4
+VECTOR_INGESTION_MAX_IN_FLIGHT: int = 8
+VECTOR_INGESTION_MAX_RETRIES: int = 3
+
+#data transformation
+CHUNK_SIZE: int = 1000
+CHUNK_OVERLAP: int = 200
+PARALLEL_TRANSFORMATION: bool = os.getenv("PARALLEL_TRANSFORMATION", "false").lower() == "true"
+TRANSFORMATION_MAX_WORKERS: int = os.cpu_count() or 1
+# large PDFs are split into page ranges of this size so one file can use several workers
+TRANSFORMATION_PAGES_PER_TASK: int = 32
+
+#document conversion
+# office uploads are converted to PDF by LibreOffice; "auto" keeps warm unoserver processes when
+# unoserver is installed and otherwise converts a batch of files per soffice run
+CONVERSION_BACKEND: str = os.getenv("CONVERSION_BACKEND", "auto")  # auto | unoserver | soffice
+CONVERSION_WORKERS: int = int(os.getenv("CONVERSION_WORKERS", "2"))
+CONVERSION_BATCH_SIZE: int = 8
+# per file; a batch may take this long for each of its files
+CONVERSION_TIMEOUT_SECONDS: int = 120
+CONVERSION_STARTUP_TIMEOUT_SECONDS: int = 60
+# worker i listens on CONVERSION_UNOSERVER_PORT + 2 * i, LibreOffice on the port after it
+CONVERSION_UNOSERVER_PORT: int = 2003
+CONVERTED_DOCUMENTS_DIR_NAME: str = "converted_documents"
+
+#csv
+# rows read per batch; row groups of up to CHUNK_SIZE characters become the documents
+CSV_BATCH_ROWS: int = 1_000
+# utf-8-sig also accepts the byte order mark spreadsheet exports start with
+CSV_ENCODING: str = "utf-8-sig"
+CSV_SNIFF_BYTES: int = 64 * 1024
+
+#archives
+# zip members are read as streams and parsed in worker processes; these limits guard against zip bombs
+ARCHIVE_MAX_MEMBERS: int = 2_000
+ARCHIVE_MAX_MEMBER_BYTES: int = 200 * 1024 * 1024
+ARCHIVE_MAX_TOTAL_BYTES: int = 2 * 1024 * 1024 * 1024
+# uncompressed / compressed size, checked for the whole archive and for members above ARCHIVE_RATIO_MIN_BYTES
+ARCHIVE_MAX_COMPRESSION_RATIO: float = 100.0
+ARCHIVE_RATIO_MIN_BYTES: int = 1024 * 1024
+ARCHIVE_MAX_WORKERS: int = os.cpu_count() or 1
+
+#pipeline
+# push pages to the vector store as they are split instead of materialising the corpus first
+STREAMING_INGESTION: bool = os.getenv("STREAMING_INGESTION", "true").lower() == "true"
+
+#shared resources
+QA_MODEL_NAME: str = "gpt-4o-mini"
+CHAIN_REGISTRY_TTL_SECONDS: int = 60 * 60
+PINECONE_CLIENT_TTL_SECONDS: int = 6 * 60 * 60
+# how long a Pinecone index is trusted to exist before list_indexes is called again
+PINECONE_INDEX_READY_TTL_SECONDS: int = 6 * 60 * 60
+
+#answer cache
+DOCUMENT_VERSIONS_FILE_NAME: str = "document_versions.json"
+ANSWER_CACHE_ENABLED: bool = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_MAX_ENTRIES: int = 1_000
+ANSWER_CACHE_SIMILARITY_THRESHOLD: float = 0.95
+ANSWER_CACHE_TTL_SECONDS: int = 24 * 60 * 60
+
+#qa service
+SERVICE_MAX_CONCURRENT_LLM_CALLS: int = 16
+SERVICE_MAX_CONCURRENT_EMBEDDING_CALLS: int = 16
+SERVICE_MAX_CONCURRENT_VECTOR_DB_CALLS: int = 32
+SERVICE_MAX_CONCURRENT_INGESTIONS: int = 2
+
+#summarization
+SUMMARIZER_MODEL_NAME: str = "gpt-4o-mini"
+# concurrent LLM calls across the chunks and files of a summarization run
+SUMMARIZER_MAX_CONCURRENCY: int = 8
+# token budget of one map (chunk group) or reduce (summary group) prompt
+SUMMARIZER_MAX_INPUT_TOKENS: int = 3000
+SUMMARY_FILE_STORAGE_DIR_NAME: str = "summary_files"
+SUMMARY_CACHE_FILE_NAME: str = "summaries.json"
+# bump when the prompts change so cached summaries are regenerated
+SUMMARY_PROMPT_VERSION: str = "1"
+
+#sentiment analysis
+SENTIMENT_MODEL_NAME: str = "gpt-4o-mini"
+# texts classified by one structured-output request
+SENTIMENT_BATCH_SIZE: int = 25
+SENTIMENT_MAX_CONCURRENCY: int = 4
+# longer texts are cut before they are sent to the model
+SENTIMENT_MAX_TEXT_CHARS: int = 1000
+SENTIMENT_CACHE_MAX_ENTRIES: int = 50_000
+# classify with the local lexicon first and only send low-confidence texts to the model
+SENTIMENT_FAST_PATH: bool = os.getenv("SENTIMENT_FAST_PATH", "true").lower() == "true"
+SENTIMENT_FAST_PATH_MIN_CONFIDENCE: float = 0.6
+
+#batch qa
+BATCH_QA_MAX_CONCURRENCY: int = 8
+
+#telemetry
+TELEMETRY_ENABLED: bool = os.getenv("TELEMETRY_ENABLED", "true").lower() == "true"
+# also write every finished stage as a JSON line to the log
+TELEMETRY_JSON_LOGS: bool = os.getenv("TELEMETRY_JSON_LOGS", "false").lower() == "true"
+TELEMETRY_HISTOGRAM_BUCKETS: tuple = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
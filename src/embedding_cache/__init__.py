@@ -0,0 +1,245 @@
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from src.entity.config_entity import EmbeddingCacheConfig
+from src.exception import CustomException
+from src.logger import get_logger
+from src.telemetry import telemetry
+
+VECTORS_FILE_NAME: str = "vectors.npy"
+INDEX_FILE_NAME: str = "index.sqlite"
+
+
+def get_model_name(embeddings: Embeddings) -> str:
+    return getattr(embeddings, "model", None) or type(embeddings).__name__
+
+
+class EmbeddingStore:
+    """
+    Size-bounded, memory-mapped vector store keyed by content hash.
+
+    Vectors live in a fixed-size ``(max_entries, dimension)`` memmap; a sqlite table maps
+    each key to its slot and records recency so the LRU order survives restarts.
+    When the store is full the least recently used slot is reused.
+
+    Several processes (the Streamlit app and the API) may share one store, so sqlite is
+    the only record of which key owns which slot: slots are allocated and their vectors
+    written under an exclusive sqlite lock, and readers hold a read transaction while
+    they copy vectors out, so a slot is never reassigned under them.
+    """
+
+    _instances: Dict[str, "EmbeddingStore"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, store_dir: str, config: EmbeddingCacheConfig):
+        self.store_dir = store_dir
+        self.config = config
+        self.logger = get_logger(__name__)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(self.store_dir, exist_ok=True)
+        # autocommit mode: every transaction below is opened explicitly
+        self._index = sqlite3.connect(os.path.join(self.store_dir, INDEX_FILE_NAME), check_same_thread=False,
+                                      timeout=30, isolation_level=None)
+        self._index.execute("CREATE TABLE IF NOT EXISTS entries "
+                            "(key TEXT PRIMARY KEY, slot INTEGER, last_used INTEGER)")
+        self._vectors_path = os.path.join(self.store_dir, VECTORS_FILE_NAME)
+        self._vectors: Optional[np.ndarray] = None
+
+    @classmethod
+    def open(cls, store_dir: str, config: EmbeddingCacheConfig = None) -> "EmbeddingStore":
+        store_dir = os.path.abspath(store_dir)
+        with cls._instances_lock:
+            if store_dir not in cls._instances:
+                cls._instances[store_dir] = cls(store_dir, config or EmbeddingCacheConfig())
+            return cls._instances[store_dir]
+
+    def __len__(self) -> int:
+        return self._index.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    @contextmanager
+    def _transaction(self, mode: str = "DEFERRED"):
+        self._index.execute(f"BEGIN {mode}")
+        try:
+            yield
+        except BaseException:
+            self._index.execute("ROLLBACK")
+            raise
+        self._index.execute("COMMIT")
+
+    def _open_vectors(self, dimension: Optional[int] = None) -> Optional[np.ndarray]:
+        """
+        Maps the vectors file, creating it when ``dimension`` is given and it does not exist
+        yet. Creation only happens under the exclusive lock, and an existing file (possibly
+        written by another process) is never truncated.
+        """
+        if self._vectors is None:
+            if os.path.exists(self._vectors_path):
+                self._vectors = np.load(self._vectors_path, mmap_mode="r+")
+            elif dimension is not None:
+                self._vectors = np.lib.format.open_memmap(self._vectors_path, mode="w+",
+                                                          dtype=np.dtype(self.config.dtype),
+                                                          shape=(self.config.max_entries, dimension))
+        return self._vectors
+
+    def _get_slots(self, keys: List[str]) -> Dict[str, int]:
+        slots = {}
+        for start in range(0, len(keys), 900):
+            batch = keys[start:start + 900]
+            slots.update(self._index.execute(
+                f"SELECT key, slot FROM entries WHERE key IN ({','.join('?' * len(batch))})", batch))
+        return slots
+
+    def _next_clock(self) -> int:
+        return self._index.execute("SELECT COALESCE(MAX(last_used), 0) FROM entries").fetchone()[0] + 1
+
+    def get_many(self, keys: List[str]) -> List[Optional[List[float]]]:
+        with self._lock:
+            results: List[Optional[List[float]]] = [None] * len(keys)
+            with self._transaction():
+                slots = self._get_slots(list(dict.fromkeys(keys)))
+                vectors = self._open_vectors() if slots else None
+                if vectors is not None:
+                    for position, key in enumerate(keys):
+                        if key in slots:
+                            results[position] = vectors[slots[key]].astype(np.float32).tolist()
+            found = sum(result is not None for result in results)
+            self.hits += found
+            self.misses += len(keys) - found
+
+            touched = [key for key in dict.fromkeys(keys) if key in slots and vectors is not None]
+            if touched:
+                with self._transaction("IMMEDIATE"):
+                    clock = self._next_clock()
+                    self._index.executemany("UPDATE entries SET last_used = ? WHERE key = ?",
+                                            [(clock + offset, key) for offset, key in enumerate(touched)])
+            return results
+
+    def put_many(self, keys: List[str], vectors: List[List[float]]):
+        with self._lock:
+            # the last vector of a repeated key wins; a batch larger than the store only caches
+            # its first max_entries keys, so no key of the batch evicts another one
+            items = list(dict(zip(keys, vectors)).items())[:self.config.max_entries]
+            if not items:
+                return
+            with self._transaction("EXCLUSIVE"):
+                store = self._open_vectors(len(items[0][1]))
+                slots = self._get_slots([key for key, _ in items])
+                new_keys = [key for key, _ in items if key not in slots]
+
+                # slots are handed out densely and only freed by eviction, which reuses them at once
+                next_slot = self._index.execute("SELECT COALESCE(MAX(slot), -1) + 1 FROM entries").fetchone()[0]
+                free_slots = list(range(next_slot, min(self.config.max_entries, next_slot + len(new_keys))))
+                if len(free_slots) < len(new_keys):
+                    batch_keys = {key for key, _ in items}
+                    evicted = []
+                    for key, slot in self._index.execute("SELECT key, slot FROM entries ORDER BY last_used"):
+                        if key not in batch_keys:
+                            evicted.append((key, slot))
+                            if len(free_slots) + len(evicted) == len(new_keys):
+                                break
+                    self._index.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key, _ in evicted])
+                    free_slots.extend(slot for _, slot in evicted)
+                    self.evictions += len(evicted)
+                slots.update(zip(new_keys, free_slots))
+
+                clock = self._next_clock()
+                for key, vector in items:
+                    store[slots[key]] = vector
+                store.flush()
+                self._index.executemany("INSERT OR REPLACE INTO entries (key, slot, last_used) VALUES (?, ?, ?)",
+                                        [(key, slots[key], clock + offset)
+                                         for offset, (key, _) in enumerate(items)])
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "max_entries": self.config.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that serves repeated texts from a persistent on-disk cache.
+
+    Vectors are keyed by ``sha256(model name + text)`` so re-ingesting unchanged chunks
+    never reaches the embedding API. Only cache misses are sent to the wrapped model,
+    in a single ``embed_documents`` call.
+    """
+
+    def __init__(self, underlying_embeddings: Embeddings, config: EmbeddingCacheConfig = None):
+        self.underlying_embeddings = underlying_embeddings
+        self.config = config or EmbeddingCacheConfig()
+        self.model_name = get_model_name(underlying_embeddings)
+        self.logger = get_logger(__name__)
+
+        # one store per model, vectors of different models never share a file
+        store_dir = os.path.join(self.config.cache_dir, re.sub(r"[^A-Za-z0-9_.-]", "_", self.model_name))
+        self.store = EmbeddingStore.open(store_dir, self.config)
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        try:
+            keys = [self._key(text) for text in texts]
+            vectors = self.store.get_many(keys)
+
+            missing = {}
+            for position, (key, vector) in enumerate(zip(keys, vectors)):
+                if vector is None:
+                    missing.setdefault(key, []).append(position)
+
+            if missing:
+                missing_keys = list(missing)
+                new_vectors = self.underlying_embeddings.embed_documents(
+                    [texts[missing[key][0]] for key in missing_keys])
+                self.store.put_many(missing_keys, new_vectors)
+                for key, vector in zip(missing_keys, new_vectors):
+                    for position in missing[key]:
+                        vectors[position] = vector
+
+            telemetry.record_cache("embedding", hits=len(texts) - len(missing), misses=len(missing))
+            self.logger.info(f"Embedding cache: {len(texts) - len(missing)} hits, "
+                             f"{len(missing)} misses for {len(texts)} texts")
+            return vectors
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def embed_query(self, text: str) -> List[float]:
+        try:
+            if not self.config.cache_queries:
+                return self.underlying_embeddings.embed_query(text)
+
+            key = self._key(text)
+            vector = self.store.get_many([key])[0]
+            telemetry.record_cache("query_embedding", hits=int(vector is not None), misses=int(vector is None))
+            if vector is None:
+                vector = self.underlying_embeddings.embed_query(text)
+                self.store.put_many([key], [vector])
+            return vector
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def stats(self) -> dict:
+        return self.store.stats()
@@ -1,5 +1,5 @@
-from dataclasses import dataclass
-from typing import Union, List, Dict
+from dataclasses import dataclass, field
+from typing import Union, List, Dict, Optional, Tuple
 
 from langchain_core.documents import Document
 
@@ -7,9 +7,54 @@ from langchain_core.documents import Document
 @dataclass
 class FileHandlerArtifact:
     file_storage_dir: str
+    # document paths (file_storage_dir/<upload name>, the chunks' source) of the files stored by this run;
+    # None means every file in file_storage_dir
+    file_paths: Optional[List[str]] = None
+    # document path -> sha256 of its content
+    content_hashes: Dict[str, str] = field(default_factory=dict)
+    # document path -> content-addressed object holding its bytes; paths missing here are read directly
+    object_paths: Dict[str, str] = field(default_factory=dict)
+    # document path -> (upload name, sha256, object path, size) of every stored upload; written to the
+    # manifest by DataIngestion.commit_files once the batch is indexed
+    stored_files: Dict[str, Tuple[str, str, str, int]] = field(default_factory=dict)
+    # objects of uploads replaced within the batch, removed by commit_files if nothing refers to them
+    superseded_objects: List[str] = field(default_factory=list)
+    # names of uploads skipped because their content is already indexed
+    skipped_files: List[str] = field(default_factory=list)
+    # sha256 of every upload of the batch, skipped ones included; the chunks' document_id, so the retrieval scope
+    document_ids: List[str] = field(default_factory=list)
+    # session that uploaded the batch, tagged on the chunks it indexes
+    session_id: Optional[str] = None
     
     
 @dataclass
 class DataTransformationArtifact:
     documents: Union[List[Document], Dict[str, Dict[str, List[Document]]]]
-    
\ No newline at end of file
+
+
+@dataclass
+class AnswerTimingArtifact:
+    time_to_first_token: Optional[float] = None
+    total_latency: Optional[float] = None
+    chunks: int = 0
+
+
+@dataclass
+class BatchAnswerArtifact:
+    question: str
+    answer: Optional[str] = None
+    error: Optional[str] = None
+    cached: bool = False
+    retrieval_time: Optional[float] = None
+    generation_time: Optional[float] = None
+    total_time: Optional[float] = None
+
+
+@dataclass
+class SentimentArtifact:
+    text: str
+    # Positive, Neutral or Negative
+    sentiment: str
+    confidence: float
+    # "cache", "lexicon" or "llm"
+    source: str
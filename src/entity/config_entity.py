@@ -1,4 +1,5 @@
 from src.constant import *
+from src.utils import validate_namespace
 from dataclasses import dataclass
 from datetime import datetime
 import os 
@@ -15,13 +16,180 @@ base_artifact_config: BaseArtifactConfig = BaseArtifactConfig()
 
 @dataclass
 class FileHandlerConfig:
-    artifact_dir: str = base_artifact_config.artifact_dir
+    artifact_dir: str = ARTIFACT_DIR
+    # not timestamped: a re-uploaded file keeps its source path, so its old chunks get replaced
     file_storage_dir: str = os.path.join(
         artifact_dir,
         FILE_STORAGE_ARTIFACT_DIR_NAME
     )
+    copy_buffer_size: int = FILE_COPY_BUFFER_SIZE
+    indexed_files_path: str = os.path.join(artifact_dir, INDEXED_FILES_FILE_NAME)
+    object_storage_dir: str = os.path.join(file_storage_dir, FILE_OBJECTS_DIR_NAME)
+    manifest_path: str = os.path.join(artifact_dir, FILE_MANIFEST_FILE_NAME)
+
+    @classmethod
+    def for_namespace(cls, namespace: str = None) -> "FileHandlerConfig":
+        """Config keeping the uploads, objects and registries of ``namespace`` apart from every other namespace."""
+        if namespace is None:
+            return cls()
+        artifact_dir = os.path.join(ARTIFACT_DIR, NAMESPACES_DIR_NAME, validate_namespace(namespace))
+        file_storage_dir = os.path.join(artifact_dir, FILE_STORAGE_ARTIFACT_DIR_NAME)
+        return cls(artifact_dir=artifact_dir,
+                   file_storage_dir=file_storage_dir,
+                   indexed_files_path=os.path.join(artifact_dir, INDEXED_FILES_FILE_NAME),
+                   object_storage_dir=os.path.join(file_storage_dir, FILE_OBJECTS_DIR_NAME),
+                   manifest_path=os.path.join(artifact_dir, FILE_MANIFEST_FILE_NAME))
     
     
 @dataclass
 class DataTransformationConfig:
-    pass
\ No newline at end of file
+    chunk_size: int = CHUNK_SIZE
+    chunk_overlap: int = CHUNK_OVERLAP
+    parallel: bool = PARALLEL_TRANSFORMATION
+    max_workers: int = TRANSFORMATION_MAX_WORKERS
+    pages_per_task: int = TRANSFORMATION_PAGES_PER_TASK
+
+@dataclass
+class DocumentConversionConfig:
+    backend: str = CONVERSION_BACKEND
+    workers: int = CONVERSION_WORKERS
+    batch_size: int = CONVERSION_BATCH_SIZE
+    timeout_seconds: int = CONVERSION_TIMEOUT_SECONDS
+    startup_timeout_seconds: int = CONVERSION_STARTUP_TIMEOUT_SECONDS
+    unoserver_port: int = CONVERSION_UNOSERVER_PORT
+    # converted PDFs, named by the sha256 of their source
+    cache_dir: str = os.path.join(ARTIFACT_DIR, CONVERTED_DOCUMENTS_DIR_NAME)
+
+@dataclass
+class CSVConfig:
+    batch_rows: int = CSV_BATCH_ROWS
+    encoding: str = CSV_ENCODING
+    sniff_bytes: int = CSV_SNIFF_BYTES
+
+@dataclass
+class ArchiveConfig:
+    max_members: int = ARCHIVE_MAX_MEMBERS
+    max_member_bytes: int = ARCHIVE_MAX_MEMBER_BYTES
+    max_total_bytes: int = ARCHIVE_MAX_TOTAL_BYTES
+    max_compression_ratio: float = ARCHIVE_MAX_COMPRESSION_RATIO
+    ratio_min_bytes: int = ARCHIVE_RATIO_MIN_BYTES
+    max_workers: int = ARCHIVE_MAX_WORKERS
+
+@dataclass
+class LocalVectorIndexConfig:
+    index_root_dir: str = os.path.join(ARTIFACT_DIR, LOCAL_VECTOR_INDEX_DIR_NAME)
+    index_type: str = LOCAL_VECTOR_INDEX_TYPE
+    flat_threshold: int = LOCAL_VECTOR_INDEX_FLAT_THRESHOLD
+    min_train_size: int = 1_000
+    nlist: int = None
+    nprobe: int = LOCAL_VECTOR_INDEX_NPROBE
+    train_sample_size: int = 50_000
+    train_iterations: int = 10
+    initial_capacity: int = 1_024
+
+
+@dataclass
+class LexicalIndexConfig:
+    index_root_dir: str = os.path.join(ARTIFACT_DIR, LEXICAL_INDEX_DIR_NAME)
+    enabled: bool = LEXICAL_INDEX_ENABLED
+    k1: float = BM25_K1
+    b: float = BM25_B
+
+
+@dataclass
+class ContextPackingConfig:
+    max_tokens: int = CONTEXT_MAX_TOKENS
+    tokenizer: str = CONTEXT_TOKENIZER
+    tiktoken_encoding: str = CONTEXT_TIKTOKEN_ENCODING
+    min_overlap: int = CONTEXT_MIN_OVERLAP
+    # chunks never overlap by more than the splitter's chunk_overlap
+    max_overlap: int = CHUNK_OVERLAP
+    min_block_tokens: int = CONTEXT_MIN_BLOCK_TOKENS
+
+
+@dataclass
+class MMRConfig:
+    k: int = MMR_K
+    fetch_k: int = MMR_FETCH_K
+    lambda_mult: float = MMR_LAMBDA_MULT
+    # 1.0 or more disables reusing candidates across the turns of a conversation
+    reuse_similarity: float = MMR_CANDIDATE_REUSE_SIMILARITY
+    pool_size: int = MMR_CANDIDATE_POOL_SIZE
+    max_conversations: int = MMR_MAX_CONVERSATIONS
+    conversation_ttl_seconds: int = MMR_CONVERSATION_TTL_SECONDS
+
+
+@dataclass
+class HybridRetrievalConfig:
+    k: int = MMR_K
+    # documents taken from each retriever before the rank fusion
+    candidates: int = HYBRID_RETRIEVAL_CANDIDATES
+    rrf_k: int = HYBRID_RETRIEVAL_RRF_K
+    lexical_fast_path: bool = HYBRID_LEXICAL_FAST_PATH
+    # share of the query's BM25 weight (idf) the top hit must match to skip the vector search
+    fast_path_min_coverage: float = HYBRID_FAST_PATH_MIN_COVERAGE
+
+
+@dataclass
+class EmbeddingCacheConfig:
+    cache_dir: str = os.path.join(ARTIFACT_DIR, EMBEDDING_CACHE_DIR_NAME)
+    max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES
+    dtype: str = EMBEDDING_CACHE_DTYPE
+    cache_queries: bool = True
+
+
+@dataclass
+class VectorIngestionConfig:
+    batch_size: int = VECTOR_INGESTION_BATCH_SIZE
+    embedding_workers: int = VECTOR_INGESTION_EMBEDDING_WORKERS
+    # batches embedded ahead of the upsert; bounds memory and provides backpressure
+    max_in_flight: int = VECTOR_INGESTION_MAX_IN_FLIGHT
+    max_retries: int = VECTOR_INGESTION_MAX_RETRIES
+    retry_base_delay: float = 0.5
+    retry_max_delay: float = 8.0
+
+
+@dataclass
+class AnswerCacheConfig:
+    max_entries: int = ANSWER_CACHE_MAX_ENTRIES
+    # cosine similarity above which a cached answer is reused for a reworded question
+    similarity_threshold: float = ANSWER_CACHE_SIMILARITY_THRESHOLD
+    ttl_seconds: int = ANSWER_CACHE_TTL_SECONDS
+
+
+@dataclass
+class QAServiceConfig:
+    max_concurrent_llm_calls: int = SERVICE_MAX_CONCURRENT_LLM_CALLS
+    max_concurrent_embedding_calls: int = SERVICE_MAX_CONCURRENT_EMBEDDING_CALLS
+    max_concurrent_vector_db_calls: int = SERVICE_MAX_CONCURRENT_VECTOR_DB_CALLS
+    max_concurrent_ingestions: int = SERVICE_MAX_CONCURRENT_INGESTIONS
+
+
+@dataclass
+class SummarizerConfig:
+    model_name: str = SUMMARIZER_MODEL_NAME
+    max_concurrency: int = SUMMARIZER_MAX_CONCURRENCY
+    max_input_tokens: int = SUMMARIZER_MAX_INPUT_TOKENS
+    file_storage_dir: str = os.path.join(ARTIFACT_DIR, SUMMARY_FILE_STORAGE_DIR_NAME)
+    cache_path: str = os.path.join(ARTIFACT_DIR, SUMMARY_CACHE_FILE_NAME)
+    prompt_version: str = SUMMARY_PROMPT_VERSION
+
+
+@dataclass
+class SentimentConfig:
+    model_name: str = SENTIMENT_MODEL_NAME
+    batch_size: int = SENTIMENT_BATCH_SIZE
+    max_concurrency: int = SENTIMENT_MAX_CONCURRENCY
+    max_text_chars: int = SENTIMENT_MAX_TEXT_CHARS
+    cache_max_entries: int = SENTIMENT_CACHE_MAX_ENTRIES
+    fast_path: bool = SENTIMENT_FAST_PATH
+    fast_path_min_confidence: float = SENTIMENT_FAST_PATH_MIN_CONFIDENCE
+
+
+@dataclass
+class BatchQAConfig:
+    # questions retrieved and answered concurrently (bounds parallel LLM calls)
+    max_concurrency: int = BATCH_QA_MAX_CONCURRENCY
+    k: int = MMR_K
+    fetch_k: int = MMR_FETCH_K
+    lambda_mult: float = MMR_LAMBDA_MULT
@@ -1,25 +1,155 @@
+import atexit
+import json
 import logging
+import logging.handlers
 import os
-from datetime import datetime
+import queue
+import threading
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Optional
 
-from src.constant import ARTIFACT_DIR, LOG_DIR
+from src.constant import (ARTIFACT_DIR, LOG_BACKUP_COUNT, LOG_DEBUG_SAMPLE_EVERY, LOG_DIR, LOG_FILE_NAME, LOG_JSON,
+                          LOG_LEVEL, LOG_MAX_BYTES, LOG_ROTATE_WHEN, LOG_ROTATION)
 
+TEXT_FORMAT = "[ %(asctime)s ] %(name)s - %(levelname)s - %(message)s"
 
-def get_logger(name:str):
-    LOG_FILE = f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log"
 
-    logs_path = os.path.join(os.getcwd(),
-                             ARTIFACT_DIR,
-                             LOG_DIR)
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line. Structured fields passed as ``extra={"fields": {...}}``
+    are merged into the object instead of the formatted message.
+    """
 
-    os.makedirs(logs_path, exist_ok=True)
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        else:
+            entry["message"] = record.getMessage()
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
 
-    LOG_FILE_PATH = os.path.join(logs_path, LOG_FILE)
 
-    logging.basicConfig(
-        filename=LOG_FILE_PATH,
-        format="[ %(asctime)s ] %(name)s - %(levelname)s - %(message)s",
-        level=logging.INFO,
-    )
+class DebugSamplingFilter(logging.Filter):
+    """Keeps every ``sample_every``-th DEBUG record per logger; other levels always pass."""
 
-    return logging.getLogger(name)
\ No newline at end of file
+    def __init__(self, sample_every: int = LOG_DEBUG_SAMPLE_EVERY):
+        super().__init__()
+        self.sample_every = max(1, sample_every)
+        self._seen = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno != logging.DEBUG or self.sample_every == 1:
+            return True
+        with self._lock:
+            seen = self._seen[record.name]
+            self._seen[record.name] = seen + 1
+        return seen % self.sample_every == 0
+
+
+class _EnqueueHandler(logging.handlers.QueueHandler):
+    # the stock QueueHandler formats the message on the calling thread; leave it to the listener
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.Handler] = None
+_direct_handler: Optional[logging.Handler] = None
+_configure_lock = threading.Lock()
+
+
+def _file_handler(log_file_path: str, rotation: str) -> logging.Handler:
+    if rotation == "time":
+        return logging.handlers.TimedRotatingFileHandler(log_file_path, when=LOG_ROTATE_WHEN,
+                                                         backupCount=LOG_BACKUP_COUNT, encoding="utf-8", delay=True)
+    if rotation != "size":
+        raise ValueError(f"Unsupported log rotation: {rotation}. Expected 'size' or 'time'")
+    return logging.handlers.RotatingFileHandler(log_file_path, maxBytes=LOG_MAX_BYTES,
+                                                backupCount=LOG_BACKUP_COUNT, encoding="utf-8", delay=True)
+
+
+def configure_logging(log_dir: str = None,
+                      level: str = LOG_LEVEL,
+                      json_lines: bool = LOG_JSON,
+                      rotation: str = LOG_ROTATION) -> None:
+    """
+    Routes the root logger through a queue to a rotating file written by a background thread.
+
+    Logging calls only append the record to the queue; formatting and file I/O happen on
+    the listener thread, which is flushed and stopped at interpreter exit. Only the first
+    call has an effect (``get_logger`` makes it on demand).
+    """
+    global _listener, _queue_handler
+    with _configure_lock:
+        if _listener is not None:
+            return
+
+        log_dir = log_dir or os.path.join(os.getcwd(), ARTIFACT_DIR, LOG_DIR)
+        os.makedirs(log_dir, exist_ok=True)
+
+        file_handler = _file_handler(os.path.join(log_dir, LOG_FILE_NAME), rotation)
+        file_handler.setFormatter(JsonFormatter() if json_lines else logging.Formatter(TEXT_FORMAT))
+
+        _queue_handler = _EnqueueHandler(queue.SimpleQueue())
+        _queue_handler.addFilter(DebugSamplingFilter())
+
+        root_logger = logging.getLogger()
+        root_logger.setLevel(level)
+        root_logger.addHandler(_queue_handler)
+
+        _listener = logging.handlers.QueueListener(_queue_handler.queue, file_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Writes out every queued record and stops the background writer."""
+    global _listener, _queue_handler
+    with _configure_lock:
+        if _listener is None:
+            return
+        logging.getLogger().removeHandler(_queue_handler)
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = _queue_handler = None
+
+
+def _log_directly_after_fork() -> None:
+    """
+    A forked child (e.g. a ProcessPoolExecutor worker) inherits the queue handler but not
+    the listener thread, so its records would sit in a queue nobody drains. The child writes
+    straight to the same file instead, appending without rotating; the parent owns rotation.
+    """
+    global _listener, _queue_handler, _direct_handler, _configure_lock
+    _configure_lock = threading.Lock()
+    if _listener is None:
+        return
+    file_handler = _listener.handlers[0]
+    _direct_handler = logging.FileHandler(file_handler.baseFilename, encoding="utf-8", delay=True)
+    _direct_handler.setFormatter(file_handler.formatter)
+    _direct_handler.addFilter(DebugSamplingFilter())
+
+    root_logger = logging.getLogger()
+    root_logger.removeHandler(_queue_handler)
+    root_logger.addHandler(_direct_handler)
+    _listener = _queue_handler = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_log_directly_after_fork)
+
+
+def get_logger(name: str) -> logging.Logger:
+    if _listener is None and _direct_handler is None:
+        configure_logging()
+    return logging.getLogger(name)
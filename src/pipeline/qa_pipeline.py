@@ -1,38 +1,75 @@
 import os, sys
+import time
+from typing import Iterable, Iterator, List, Optional
 
+from langchain_core.embeddings import Embeddings
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI
 
 from src.components.data_transformation import DataTransformation
 from src.components.vector_ingestion import VectorIngestion
-from src.entity.artifact_entity import FileHandlerArtifact, DataTransformationArtifact
-from src.entity.config_entity import FileHandlerConfig, DataTransformationConfig
+from src.entity.artifact_entity import (FileHandlerArtifact, DataTransformationArtifact, AnswerTimingArtifact,
+                                        BatchAnswerArtifact)
+from src.entity.config_entity import FileHandlerConfig, DataTransformationConfig, BatchQAConfig
 from src.components.data_ingestion import DataIngestion
 from src.components.qa_chain_formation import QAFormatter
+from src.embedding_cache import CachedEmbeddings
 from src.logger import get_logger
 from src.exception import CustomException
-from src.constant import PINECONE_INDEX_NAME
+from src.constant import (PINECONE_INDEX_NAME, STREAMING_INGESTION, QA_MODEL_NAME, CHAIN_REGISTRY_TTL_SECONDS,
+                          ANSWER_CACHE_ENABLED)
+from src.components.answer_cache import AnswerCache
+from src.components.batch_qa import BatchQuestionAnswerer
+from src.components.mmr_retriever import CONVERSATION_ID_KEY, DOCUMENT_IDS_KEY, QUERY_EMBEDDING_KEY, QueryEmbedding
+from src.telemetry import telemetry
+from src.utils import validate_namespace
+from src.utils.registry import resource_registry
+from src.vector_db_connection.document_registry import FileManifest, IndexedFileRegistry
 from dotenv import load_dotenv
 
 load_dotenv()
 
 class QAPipeline:
-    embedding_function = OpenAIEmbeddings(api_key=os.getenv("OPENAI_API_KEY"))
+    # replaces the shared embeddings when set (benchmarks assign a fake model here)
+    embedding_function: Optional[Embeddings] = None
 
-    def __init__(self, file) -> None:
+    def __init__(self, file=None, file_handler_config: FileHandlerConfig = None, files: List = None,
+                 namespace: str = None, session_id: str = None) -> None:
         self.file = file
+        # every file of an upload batch goes through a single ingestion run
+        self.files = list(files) if files is not None else [file] if file is not None else []
+        # tenant namespace: uploads, ingestion state and vectors are kept apart from every other namespace
+        self.namespace = validate_namespace(namespace)
+        # tagged on the chunks indexed by this pipeline
+        self.session_id = session_id
+        self.file_handler_config = file_handler_config or FileHandlerConfig.for_namespace(self.namespace)
         self.logger = get_logger(__name__)
 
+    @staticmethod
+    def get_embedding_function() -> Embeddings:
+        """This method returns the process-wide embeddings, built on first use.
+
+        Re-uploads of unchanged chunks are served from the on-disk cache instead
+        of the API. Building it lazily keeps importing the app or the API from
+        creating the cache in the working directory.
+        """
+        if QAPipeline.embedding_function is not None:
+            return QAPipeline.embedding_function
+        return resource_registry.get_or_create(
+            "qa-embeddings", lambda: CachedEmbeddings(OpenAIEmbeddings(api_key=os.getenv("OPENAI_API_KEY"))))
+
     def start_data_ingestion(self):
         """This method is initiates the data ingestion process and
         returns the file handler artifact with the file storage dir path.
 
-    
+        Files whose content is already indexed are skipped.
+
         Returns:
-            FileHandlerArtifact: path of the file storage directory
+            FileHandlerArtifact: path of the file storage directory, the new files and
+                the document ids of the whole batch
         """
         try:
-            data_ingestion = DataIngestion(FileHandlerConfig())
-            file_handler_artifact = data_ingestion.ingest(self.file)
+            data_ingestion = DataIngestion(self.file_handler_config)
+            file_handler_artifact = data_ingestion.ingest_files(self.files, session_id=self.session_id)
             return file_handler_artifact
         except Exception as e:
             raise CustomException(e, sys)
@@ -61,51 +98,234 @@ class QAPipeline:
             VectorStore: uploaded documents
         """
         try:
-            vector_ingestion = VectorIngestion(data_transformation_artifacts)
-            vector_ingestion.ingest_data_to_vectordb(embeddings=self.embedding_function)
+            vector_ingestion = VectorIngestion(data_transformation_artifacts, namespace=self.namespace)
+            vector_ingestion.ingest_data_to_vectordb(embeddings=self.get_embedding_function())
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def start_streaming_ingestion(self, file_handler_artifact: FileHandlerArtifact):
+        """This method streams split documents straight into the vector store.
+
+        Pages are loaded lazily and chunked one at a time; the vector ingestion
+        pulls bounded batches from the generator, so peak memory does not grow
+        with the document size and early chunks are searchable before the file
+        is fully processed.
+        """
+        try:
+            data_transformation = DataTransformation(file_handler_artifact, DataTransformationConfig())
+            vector_ingestion = VectorIngestion(namespace=self.namespace)
+            documents = data_transformation.stream_documents()
+            result = vector_ingestion.ingest_batches(self.get_embedding_function(),
+                                                     vector_ingestion.iter_batches(documents))
+            self.logger.info(f"Streaming ingestion finished: {result}")
 
         except Exception as e:
             raise CustomException(e, sys)
 
-    def start_processing_documents(self):
+    def start_processing_documents(self, streaming: bool = STREAMING_INGESTION):
         """This method initiates the entire pipeline by calling the
         respective methods in the order of data ingestion, transformation,
         and vector ingestion.
+
+        Only new or changed files are parsed, embedded and upserted; they are
+        recorded as indexed, and the files they replace are deleted, once the
+        vector ingestion has succeeded. Chunks are
+        tagged with their document id and the session id, and written to the
+        pipeline's namespace.
+
+        Args:
+            streaming (bool): stream pages through transformation and vector
+                ingestion instead of materialising every split document first.
+
+        Returns:
+            FileHandlerArtifact: the processed and the skipped files; its document_ids
+                are the retrieval scope of the batch
         """
         try:
-            file_handler_artifact = self.start_data_ingestion()
-            data_transformation_artifacts = self.start_data_transformation(file_handler_artifact)
-            self.start_vector_ingestion(data_transformation_artifacts)
+            with telemetry.span("ingestion", files=len(self.files), streaming=streaming) as span:
+                file_handler_artifact = self.start_data_ingestion()
+                span.set(new_files=len(file_handler_artifact.file_paths))
+                if not file_handler_artifact.file_paths:
+                    DataIngestion(self.file_handler_config).commit_files(file_handler_artifact)
+                    self.logger.info("No new documents to process.")
+                    return file_handler_artifact
+
+                if streaming:
+                    self.start_streaming_ingestion(file_handler_artifact)
+                else:
+                    data_transformation_artifacts = self.start_data_transformation(file_handler_artifact)
+                    self.start_vector_ingestion(data_transformation_artifacts)
 
-            self.logger.info("Document Processing Completed.")
+                IndexedFileRegistry.open(self.file_handler_config.indexed_files_path).mark_indexed(
+                    {content_hash: file_path
+                     for file_path, content_hash in file_handler_artifact.content_hashes.items()})
+                # only now is the new content indexed: repoint the manifest and drop the replaced objects
+                DataIngestion(self.file_handler_config).commit_files(file_handler_artifact)
+
+            self.logger.info(f"Document Processing Completed in {span.duration or 0:.3f}s.")
+            return file_handler_artifact
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def get_document_ids(self, file_names: Iterable[str] = None) -> List[str]:
+        """This method returns the document ids of files uploaded to the pipeline's
+        namespace, for use as the retrieval scope of later questions.
+
+        Args:
+            file_names: upload names to look up; every uploaded document by default.
+                Names that were never uploaded are ignored.
+
+        Returns:
+            List[str]: the content hashes the chunks of those files are tagged with.
+        """
+        try:
+            manifest = FileManifest.open(self.file_handler_config.manifest_path)
+            data_ingestion = DataIngestion(self.file_handler_config)
+            document_paths = (None if file_names is None
+                              else [data_ingestion.get_document_path(name) for name in file_names])
+            return sorted(set(manifest.get_hashes(document_paths).values()))
 
         except Exception as e:
             raise CustomException(e, sys)
 
     @staticmethod
-    def start_qa(question):
+    def get_run_config(conversation_id: str = None, document_ids: Iterable[str] = None,
+                       query_embedding: QueryEmbedding = None) -> Optional[dict]:
+        """This method returns the RunnableConfig carrying the conversation and
+        the document scope of a question to the retriever and the answer cache.
+
+        Args:
+            conversation_id (str): identifies the chat; retrieval candidates are
+                reused across its turns.
+            document_ids: only chunks of these documents are retrieved (see
+                FileHandlerArtifact.document_ids); None searches the whole namespace.
+            query_embedding (QueryEmbedding): embeds the question when retrieval needs
+                it, keeping the vector for the answer cache.
+        """
+        metadata = {}
+        if conversation_id:
+            metadata[CONVERSATION_ID_KEY] = conversation_id
+        if document_ids is not None:
+            metadata[DOCUMENT_IDS_KEY] = sorted(set(document_ids))
+        if query_embedding is not None:
+            metadata[QUERY_EMBEDDING_KEY] = query_embedding
+        return {"metadata": metadata} if metadata else None
+
+    @staticmethod
+    def start_qa(question, namespace: str = None, document_ids: Iterable[str] = None):
         try:
-            qa_formatter = QAFormatter(
-                llm=ChatOpenAI(model="gpt-4o-mini")
+            rag_chain = QAPipeline.get_doc_chain(namespace)
+            return rag_chain.invoke(question, QAPipeline.get_run_config(document_ids=document_ids))
+
+        except Exception as e:
+            raise CustomException(e, sys)
 
-            )
+    @staticmethod
+    def start_batch_qa(questions: List[str],
+                       namespace: str = None,
+                       model: str = QA_MODEL_NAME,
+                       batch_qa_config: BatchQAConfig = None,
+                       document_ids: Iterable[str] = None) -> List[BatchAnswerArtifact]:
+        """Answers a list of questions against the indexed documents.
 
-            rag_chain = qa_formatter.form_qa_chain(embeddings=QAPipeline.embedding_function)
-            return rag_chain.invoke(question)
+        Query embeddings are computed in one request, duplicate questions are
+        retrieved and answered once, and LLM calls run with bounded concurrency.
+        Retrieval is restricted to ``document_ids`` when given.
+
+        Returns:
+            List[BatchAnswerArtifact]: answers in input order, with per-item errors and timings.
+        """
+        try:
+            qa_formatter = QAFormatter(llm=ChatOpenAI(model=model))
+            embeddings = QAPipeline.get_embedding_function()
+            vector_store = qa_formatter.get_vector_store(embeddings, namespace=namespace)
+            answer_cache = QAPipeline.get_answer_cache(namespace, model) if ANSWER_CACHE_ENABLED else None
+            batch_answerer = BatchQuestionAnswerer(qa_formatter,
+                                                   embeddings,
+                                                   vector_store,
+                                                   batch_qa_config,
+                                                   answer_cache=answer_cache,
+                                                   hybrid_retriever=qa_formatter.get_hybrid_retriever(
+                                                       embeddings, namespace=namespace))
+            return batch_answerer.answer(questions,
+                                         sorted(set(document_ids)) if document_ids is not None else None)
 
         except Exception as e:
             raise CustomException(e, sys)
 
     @staticmethod
-    def get_doc_chain():
+    def stream_answer(question: str,
+                      doc_chain=None,
+                      timing: AnswerTimingArtifact = None,
+                      conversation_id: str = None,
+                      document_ids: Iterable[str] = None) -> Iterator[str]:
+        """Streams the answer to ``question`` token by token.
+
+        Args:
+            question (str): the user question.
+            doc_chain: chain to use; defaults to the shared chain from get_doc_chain.
+            timing (AnswerTimingArtifact): filled in with the time to first token
+                and the total latency of the turn, in seconds.
+            conversation_id (str): identifies the chat; retrieval candidates are
+                reused across its turns.
+            document_ids: restricts retrieval to the chunks of these documents;
+                None searches every document of the chain's namespace.
+        """
         try:
-            qa_formatter = QAFormatter(
-                llm=ChatOpenAI(model="gpt-4o-mini")
+            doc_chain = doc_chain or QAPipeline.get_doc_chain()
+            timing = timing if timing is not None else AnswerTimingArtifact()
+            started_at = time.perf_counter()
+            config = QAPipeline.get_run_config(conversation_id, document_ids)
+            for chunk in doc_chain.stream(question, config):
+                if timing.time_to_first_token is None:
+                    timing.time_to_first_token = time.perf_counter() - started_at
+                timing.chunks += 1
+                yield chunk
+            timing.total_latency = time.perf_counter() - started_at
+            telemetry.record_stage("answer", timing.total_latency, chunks=timing.chunks,
+                                   time_to_first_token=timing.time_to_first_token)
+
+            logger = get_logger(__name__)
+            logger.info(f"Answered question in {timing.total_latency:.3f}s "
+                        f"(first token after {timing.time_to_first_token or 0:.3f}s, {timing.chunks} chunks)")
 
-            )
+        except Exception as e:
+            raise CustomException(e, sys)
 
-            rag_chain = qa_formatter.form_qa_chain(embeddings=QAPipeline.embedding_function)
-            return rag_chain
+    @staticmethod
+    def get_answer_cache(namespace: str = None, model: str = QA_MODEL_NAME) -> AnswerCache:
+        """Returns the process-wide answer cache for ``namespace`` and ``model``."""
+        # no TTL: cached answers expire individually and on document re-ingestion
+        return resource_registry.get_or_create(("answer-cache", PINECONE_INDEX_NAME, namespace, model),
+                                               AnswerCache)
+
+    @staticmethod
+    def get_doc_chain(namespace: str = None, model: str = QA_MODEL_NAME):
+        """Returns the RAG chain for ``namespace`` and ``model``.
+
+        Chains are shared process-wide through the resource registry, so Streamlit
+        reruns and repeated questions reuse the LLM client and vector store
+        connection instead of rebuilding them on every call. When the answer
+        cache is enabled the chain is a CachedQAChain.
+        """
+        try:
+            def build_chain():
+                qa_formatter = QAFormatter(
+                    llm=ChatOpenAI(model=model)
+
+                )
+                if not ANSWER_CACHE_ENABLED:
+                    return qa_formatter.form_qa_chain(embeddings=QAPipeline.get_embedding_function(),
+                                                      namespace=namespace)
+                return qa_formatter.form_cached_qa_chain(QAPipeline.get_embedding_function(),
+                                                         QAPipeline.get_answer_cache(namespace, model),
+                                                         namespace=namespace)
+
+            return resource_registry.get_or_create(("qa-chain", PINECONE_INDEX_NAME, namespace, model),
+                                                   build_chain,
+                                                   ttl=CHAIN_REGISTRY_TTL_SECONDS)
 
         except Exception as e:
-            raise CustomException(e, sys)
\ No newline at end of file
+            raise CustomException(e, sys)
@@ -0,0 +1,166 @@
+import asyncio
+import sys
+import time
+from typing import AsyncIterator, BinaryIO, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.runnables import Runnable
+from langchain_openai import ChatOpenAI
+
+from src.components.mmr_retriever import QueryEmbedding, get_scope_key
+from src.components.qa_chain_formation import QAFormatter
+from src.constant import (ANSWER_CACHE_ENABLED, CHAIN_REGISTRY_TTL_SECONDS, PINECONE_INDEX_NAME, QA_MODEL_NAME,
+                          STREAMING_INGESTION)
+from src.entity.artifact_entity import AnswerTimingArtifact, FileHandlerArtifact
+from src.entity.config_entity import QAServiceConfig
+from src.exception import CustomException
+from src.logger import get_logger
+from src.pipeline.qa_pipeline import QAPipeline
+from src.telemetry import telemetry
+from src.utils.registry import resource_registry
+
+
+class UploadedFile:
+    """Minimal file-like adapter exposing the ``name``/``read`` interface DataIngestion expects."""
+
+    def __init__(self, name: str, file: BinaryIO):
+        self.name = name
+        self.file = file
+
+    def read(self, size: int = -1) -> bytes:
+        return self.file.read(size)
+
+
+class QAService:
+    """
+    Asyncio front end for QAPipeline and QAFormatter.
+
+    Retrievers, generation chains and clients are shared across requests through the
+    resource registry. Every call to an upstream (LLM, embeddings, vector DB) and every
+    ingestion run is gated by its own semaphore, so a burst of requests queues inside
+    the process instead of overrunning rate limits.
+    """
+
+    def __init__(self, qa_service_config: QAServiceConfig = None):
+        self.qa_service_config = qa_service_config or QAServiceConfig()
+        self.logger = get_logger(__name__)
+
+        self.llm_limit = asyncio.Semaphore(self.qa_service_config.max_concurrent_llm_calls)
+        self.embedding_limit = asyncio.Semaphore(self.qa_service_config.max_concurrent_embedding_calls)
+        self.vector_db_limit = asyncio.Semaphore(self.qa_service_config.max_concurrent_vector_db_calls)
+        self.ingestion_limit = asyncio.Semaphore(self.qa_service_config.max_concurrent_ingestions)
+
+    @staticmethod
+    def get_qa_components(namespace: str = None, model: str = QA_MODEL_NAME) -> Tuple[BaseRetriever, Runnable]:
+        """Returns the shared (retriever, generation chain) pair for ``namespace`` and ``model``."""
+        def build_components():
+            qa_formatter = QAFormatter(llm=ChatOpenAI(model=model))
+            return (qa_formatter.get_retriever(QAPipeline.get_embedding_function(), namespace=namespace),
+                    qa_formatter.form_generation_chain())
+
+        return resource_registry.get_or_create(("qa-components", PINECONE_INDEX_NAME, namespace, model),
+                                               build_components,
+                                               ttl=CHAIN_REGISTRY_TTL_SECONDS)
+
+    async def retrieve(self, question: str, namespace: str = None, conversation_id: str = None,
+                       document_ids: Optional[List[str]] = None,
+                       query_embedding: Optional[QueryEmbedding] = None) -> List[Document]:
+        retriever, _ = self.get_qa_components(namespace)
+        config = QAPipeline.get_run_config(conversation_id, document_ids, query_embedding)
+        # retrieval embeds the query and searches the index in one call, so it holds both limits
+        async with self.embedding_limit, self.vector_db_limit:
+            with telemetry.span("retrieval") as span:
+                documents = await retriever.ainvoke(question, config)
+                span.set(documents=len(documents))
+        telemetry.record_chunks("retrieval", len(documents))
+        return documents
+
+    async def stream_answer(self, question: str, namespace: str = None,
+                            timing: AnswerTimingArtifact = None,
+                            conversation_id: str = None,
+                            document_ids: Optional[List[str]] = None) -> AsyncIterator[str]:
+        """
+        Streams the answer to ``question``; ``timing`` receives the time to first token
+        and the total latency of the request. Questions sharing a ``conversation_id``
+        reuse each other's retrieval candidates. ``document_ids`` restricts retrieval
+        (and the cached answers served) to those documents of the namespace.
+        """
+        try:
+            timing = timing if timing is not None else AnswerTimingArtifact()
+            started_at = time.perf_counter()
+
+            answer_cache = QAPipeline.get_answer_cache(namespace) if ANSWER_CACHE_ENABLED else None
+            vector = fingerprint = None
+            scope = get_scope_key(document_ids)
+            if answer_cache is not None:
+                cached_answer = await asyncio.to_thread(answer_cache.lookup, question, scope)
+                if cached_answer is not None:
+                    timing.time_to_first_token = timing.total_latency = time.perf_counter() - started_at
+                    timing.chunks = 1
+                    yield cached_answer
+                    return
+                fingerprint = await asyncio.to_thread(answer_cache.version_registry.fingerprint)
+
+            # embedded only if retrieval misses the lexical fast path; the answer cache reuses the vector
+            query_embedding = QueryEmbedding(QAPipeline.get_embedding_function(), question)
+            documents = await self.retrieve(question, namespace, conversation_id, document_ids, query_embedding)
+            if answer_cache is not None:
+                cached_answer, vector = await asyncio.to_thread(answer_cache.lookup_similar, query_embedding.vector,
+                                                                scope)
+                if cached_answer is not None:
+                    timing.time_to_first_token = timing.total_latency = time.perf_counter() - started_at
+                    timing.chunks = 1
+                    yield cached_answer
+                    return
+            _, generation_chain = self.get_qa_components(namespace)
+
+            chunks = []
+            async with self.llm_limit:
+                async for chunk in generation_chain.astream({"context": QAFormatter.format_docs(documents),
+                                                             "question": question}):
+                    if timing.time_to_first_token is None:
+                        timing.time_to_first_token = time.perf_counter() - started_at
+                    timing.chunks += 1
+                    chunks.append(chunk)
+                    yield chunk
+            timing.total_latency = time.perf_counter() - started_at
+            telemetry.record_stage("answer", timing.total_latency, chunks=timing.chunks,
+                                   time_to_first_token=timing.time_to_first_token)
+
+            if answer_cache is not None:
+                await asyncio.to_thread(answer_cache.store, question, "".join(chunks), vector, fingerprint,
+                                        scope)
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    async def answer(self, question: str, namespace: str = None,
+                     conversation_id: str = None,
+                     document_ids: Optional[List[str]] = None) -> Tuple[str, AnswerTimingArtifact]:
+        timing = AnswerTimingArtifact()
+        chunks = [chunk async for chunk in self.stream_answer(question, namespace, timing, conversation_id,
+                                                              document_ids)]
+        return "".join(chunks), timing
+
+    async def ingest(self, files: List[UploadedFile], streaming: bool = STREAMING_INGESTION,
+                     namespace: str = None, session_id: str = None) -> FileHandlerArtifact:
+        """
+        Ingests ``files`` as one batch into ``namespace`` in a worker thread. Files whose
+        content is already indexed are skipped; the returned artifact lists the processed
+        and skipped files and the document ids to scope questions to.
+        """
+        try:
+            def run_ingestion():
+                return QAPipeline(files=files, namespace=namespace,
+                                  session_id=session_id).start_processing_documents(streaming=streaming)
+
+            async with self.ingestion_limit:
+                file_handler_artifact = await asyncio.to_thread(run_ingestion)
+
+            self.logger.info(f"Ingested {len(file_handler_artifact.file_paths)} files through the service, "
+                             f"skipped {len(file_handler_artifact.skipped_files)}")
+            return file_handler_artifact
+
+        except Exception as e:
+            raise CustomException(e, sys)
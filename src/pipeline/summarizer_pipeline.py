@@ -1,66 +1,111 @@
 import os, sys
+from typing import Dict, List
 
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_openai import ChatOpenAI
 
 from src.components.data_ingestion import DataIngestion
 from src.components.data_transformation import DataTransformation
-from src.entity.config_entity import DataTransformationConfig, FileHandlerConfig
-from src.entity.artifact_entity import FileHandlerArtifact, DataTransformationArtifact
+from src.components.summarizer import Summarizer, SummaryCache
+from src.entity.config_entity import DataTransformationConfig, FileHandlerConfig, SummarizerConfig
+from src.entity.artifact_entity import FileHandlerArtifact
 from src.logger import get_logger
-from src.components.summarizer import Summarizer
-from src.file_readers import ReadFiles
 from src.exception import CustomException
+from src.telemetry import telemetry
 
 
 class SummarizationPipeline:
+    """
+    Summarizes uploaded files. Summaries are cached by the sha256 of the file content,
+    so a file summarized before (under any name) is neither parsed nor sent to the LLM
+    again.
+    """
 
-    def __init__(self,files):
+    def __init__(self, files, summarizer_config: SummarizerConfig = None):
         self.files = files
+        self.summarizer_config = summarizer_config or SummarizerConfig()
+        self.summary_cache = SummaryCache.open(self.summarizer_config.cache_path)
+        # uploaded file name -> sha256 of its content
+        self.content_hashes: Dict[str, str] = {}
         self.logger = get_logger(__name__)
 
-    def start_data_ingestion(self):
-        """This method is initiates the data ingestion process and
-        returns the file handler artifact with the file storage dir path.
+    def cache_key(self, content_hash: str) -> str:
+        return SummaryCache.key(content_hash, self.summarizer_config.model_name,
+                                self.summarizer_config.prompt_version)
 
+    def start_data_ingestion(self, summaries: Dict[str, str]) -> FileHandlerArtifact:
+        """This method stores the uploaded files whose summary is not cached yet and
+        fills ``summaries`` ({content hash: summary}) with the cached ones.
 
         Returns:
-            FileHandlerArtifact: path of the file storage directory
+            FileHandlerArtifact: stored file paths mapped to their content hashes
         """
         try:
-            data_ingestion = DataIngestion(FileHandlerConfig())
-            file_handler_artifact = data_ingestion.ingest(self.files)
+            # kept apart from the QA file storage, so summarizing never replaces an indexed file
+            data_ingestion = DataIngestion(FileHandlerConfig(file_storage_dir=self.summarizer_config.file_storage_dir))
+            file_handler_artifact = FileHandlerArtifact(file_storage_dir=self.summarizer_config.file_storage_dir,
+                                                        file_paths=[])
+            for file in self.files:
+                file_full_path = os.path.join(self.summarizer_config.file_storage_dir,
+                                              data_ingestion.get_file_name(file))
+                tmp_path, content_hash = data_ingestion.store_file(file, file_full_path)
+                self.content_hashes[file.name] = content_hash
+                summary = summaries.get(content_hash) or self.summary_cache.get(self.cache_key(content_hash))
+                if summary is not None or content_hash in file_handler_artifact.content_hashes.values():
+                    # summarized before, or the same content is already stored in this batch
+                    os.remove(tmp_path)
+                    if summary is not None:
+                        summaries[content_hash] = summary
+                    file_handler_artifact.skipped_files.append(file.name)
+                    continue
+                os.replace(tmp_path, file_full_path)
+                file_handler_artifact.file_paths.append(file_full_path)
+                file_handler_artifact.content_hashes[file_full_path] = content_hash
+            telemetry.record_cache("summaries", hits=len(file_handler_artifact.skipped_files),
+                                   misses=len(file_handler_artifact.file_paths))
             return file_handler_artifact
         except Exception as e:
             raise CustomException(e, sys)
 
     @staticmethod
-    def start_data_transformation(file_handler_artifact: FileHandlerArtifact):
+    def start_data_transformation(file_handler_artifact: FileHandlerArtifact) -> Dict[str, List]:
         """This method initiates the data transformation process and
-        returns the data transformation artifact with the split documents.
+        returns the split documents of every stored file.
 
         Returns:
-            DataTransformationArtifact: split documents
+            Dict[str, List[Document]]: split documents keyed by stored file path
         """
         try:
             data_transformation = DataTransformation(file_handler_artifact, DataTransformationConfig())
-            data_transformation_artifact = data_transformation.transform_data(return_file_names=True)
-            return data_transformation_artifact
+            # artifacts come back in the order of get_file_paths, one per file
+            return dict(zip(data_transformation.get_file_paths(),
+                            [artifact.documents for artifact in data_transformation.transform_data()]))
         except Exception as e:
             raise CustomException(e, sys)
 
-    def start_summmarization(self):
+    def start_summmarization(self) -> Dict[str, str]:
+        """This method summarizes the uploaded files, parsing and summarizing only those
+        whose content has no cached summary.
+
+        Returns:
+            Dict[str, str]: summary of every uploaded file, keyed by its uploaded name
+        """
         try:
-            file_handler_artifact = self.start_data_ingestion()
-            data_transformation_artifact = self.start_data_transformation(file_handler_artifact)
-            summarizer = Summarizer(data_transformation_artifact)
-            summaries = summarizer.summarize()
-            
-            formed_summaries = {}
-            for file_name in summaries:
-                file_summary = summaries[file_name]["output_text"]
-                formed_summaries[file_name] = file_summary
-                
-            return formed_summaries
-                
+            summaries: Dict[str, str] = {}
+            file_handler_artifact = self.start_data_ingestion(summaries)
+            if file_handler_artifact.file_paths:
+                documents = self.start_data_transformation(file_handler_artifact)
+                summarizer = Summarizer(ChatOpenAI(temperature=0, model=self.summarizer_config.model_name),
+                                        self.summarizer_config)
+                new_summaries = {file_handler_artifact.content_hashes[file_path]: summary
+                                 for file_path, summary in summarizer.summarize(documents).items()}
+                self.summary_cache.store({self.cache_key(content_hash): summary
+                                          for content_hash, summary in new_summaries.items()})
+                summaries.update(new_summaries)
+
+            self.logger.info(f"Summarized {len(file_handler_artifact.file_paths)} files, "
+                             f"{len(file_handler_artifact.skipped_files)} served from cache")
+            return {file_name: summaries[content_hash] for file_name, content_hash in self.content_hashes.items()
+                    if content_hash in summaries}
+
         except Exception as e:
-            raise CustomException(e, sys)
\ No newline at end of file
+            raise CustomException(e, sys)
@@ -0,0 +1,252 @@
+import bisect
+import contextvars
+import json
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from src.constant import TELEMETRY_ENABLED, TELEMETRY_HISTOGRAM_BUCKETS, TELEMETRY_JSON_LOGS
+from src.logger import get_logger
+
+
+def _format_labels(label_names: Sequence[str], label_values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(label_names, label_values) if value != ""]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, value: float = 1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            self._values[key] += value
+
+    def samples(self) -> Dict[Tuple[str, ...], float]:
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.samples().items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = TELEMETRY_HISTOGRAM_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [per-bucket counts (last one is +Inf), sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        bucket = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][bucket] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self) -> Dict[Tuple[str, ...], dict]:
+        with self._lock:
+            return {key: {"sum": total, "count": count, "buckets": list(counts)}
+                    for key, (counts, total, count) in self._values.items()}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, sample in sorted(self.samples().items()):
+            cumulative = 0
+            for upper_bound, bucket_count in zip(self.buckets + (float("inf"),), sample["buckets"]):
+                cumulative += bucket_count
+                le = "+Inf" if upper_bound == float("inf") else f"{upper_bound:g}"
+                labels = _format_labels(self.label_names, key, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {sample['sum']:g}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {sample['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """Process-wide counters and histograms, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = cls(name, *args, **kwargs)
+            return self._metrics[name]
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, label_names)
+
+    def histogram(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = TELEMETRY_HISTOGRAM_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, label_names, buckets)
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+metrics_registry = MetricsRegistry()
+
+STAGE_DURATION = metrics_registry.histogram("rag_stage_duration_seconds",
+                                            "Wall time of a pipeline stage.", ("stage",))
+STAGE_ERRORS = metrics_registry.counter("rag_stage_errors_total", "Pipeline stages that raised.", ("stage",))
+CHUNKS = metrics_registry.counter("rag_chunks_total", "Chunks produced or processed per stage.", ("stage",))
+TOKENS = metrics_registry.counter("rag_llm_tokens_total", "LLM tokens by kind (prompt or completion).",
+                                  ("model", "kind"))
+CACHE_EVENTS = metrics_registry.counter("rag_cache_events_total", "Cache lookups by cache and result.",
+                                        ("cache", "result"))
+TIME_TO_FIRST_TOKEN = metrics_registry.histogram("rag_llm_time_to_first_token_seconds",
+                                                 "Time until the LLM streamed its first token.", ("model",))
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """Times one stage; nested spans share the trace id of the outermost one."""
+
+    __slots__ = ("telemetry", "name", "attributes", "trace_id", "span_id", "parent_id", "started_at", "duration",
+                 "_token")
+
+    def __init__(self, telemetry: "Telemetry", name: str, attributes: dict):
+        self.telemetry = telemetry
+        self.name = name
+        self.attributes = attributes
+        self.duration: Optional[float] = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def __enter__(self) -> "Span":
+        parent = _current_span.get()
+        self.trace_id = parent.trace_id if parent is not None else uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent is not None else None
+        self.span_id = uuid.uuid4().hex[:8]
+        self._token = _current_span.set(self)
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> bool:
+        self.duration = time.perf_counter() - self.started_at
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.attributes["exception"] = exc_type.__name__
+        self.telemetry.record_stage(self.name, self.duration, error=exc_type is not None,
+                               trace_id=self.trace_id, span_id=self.span_id, parent_id=self.parent_id,
+                               **self.attributes)
+        return False
+
+
+class _NoopSpan:
+    """Returned by ``span`` when telemetry is disabled; entering and leaving it costs nothing."""
+
+    __slots__ = ()
+    duration = None
+
+    def set(self, **attributes):
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> bool:
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Telemetry:
+    """
+    Spans, counters and histograms for the ingestion and QA stages.
+
+    Durations go to the ``rag_stage_duration_seconds`` histogram (exported by
+    ``render_prometheus``) and, when ``json_logs`` is set, every finished stage is also
+    written as one JSON line to the ``telemetry`` logger. When disabled, ``span`` returns
+    a shared no-op and the record helpers return immediately.
+    """
+
+    def __init__(self, enabled: bool = TELEMETRY_ENABLED, json_logs: bool = TELEMETRY_JSON_LOGS,
+                 registry: MetricsRegistry = metrics_registry):
+        self.enabled = enabled
+        self.json_logs = json_logs
+        self.registry = registry
+        self.logger = get_logger("telemetry")
+
+    def span(self, name: str, **attributes):
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(self, name, attributes)
+
+    def record_stage(self, stage: str, duration: float, error: bool = False, **attributes):
+        """Records a stage timed outside a span (e.g. by the LangChain callback handler)."""
+        if not self.enabled:
+            return
+        STAGE_DURATION.observe(duration, stage=stage)
+        if error:
+            STAGE_ERRORS.inc(stage=stage)
+        if self.json_logs:
+            if "trace_id" not in attributes:
+                parent = _current_span.get()
+                attributes["trace_id"] = parent.trace_id if parent is not None else None
+            fields = {"event": "stage", "stage": stage, "duration": round(duration, 6), **attributes}
+            # with LOG_JSON the formatter writes the fields themselves instead of the message
+            self.logger.info(json.dumps(fields, default=str), extra={"fields": fields})
+
+    def record_chunks(self, stage: str, count: int):
+        if self.enabled and count:
+            CHUNKS.inc(count, stage=stage)
+
+    def record_tokens(self, model: str, prompt_tokens: int = 0, completion_tokens: int = 0):
+        if not self.enabled:
+            return
+        if prompt_tokens:
+            TOKENS.inc(prompt_tokens, model=model, kind="prompt")
+        if completion_tokens:
+            TOKENS.inc(completion_tokens, model=model, kind="completion")
+
+    def record_cache(self, cache: str, hits: int = 0, misses: int = 0):
+        if not self.enabled:
+            return
+        if hits:
+            CACHE_EVENTS.inc(hits, cache=cache, result="hit")
+        if misses:
+            CACHE_EVENTS.inc(misses, cache=cache, result="miss")
+
+    def record_time_to_first_token(self, model: str, seconds: float):
+        if self.enabled:
+            TIME_TO_FIRST_TOKEN.observe(seconds, model=model)
+
+    def render_prometheus(self) -> str:
+        return self.registry.render_prometheus()
+
+
+# shared by every pipeline, component and the HTTP service in the process
+telemetry = Telemetry()
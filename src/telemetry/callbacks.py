@@ -0,0 +1,110 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.documents import Document
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import LLMResult
+
+from src.telemetry import Telemetry, telemetry as default_telemetry
+
+
+class TelemetryCallbackHandler(BaseCallbackHandler):
+    """
+    Records LLM and retriever runs of LangChain chains: latency, time to first token,
+    token usage and the number of retrieved chunks.
+
+    Attach one shared instance through ``with_config(callbacks=[...])``; LangChain
+    ignores a handler that is already registered on a parent run, so nested chains
+    configured with the same instance are not counted twice.
+    """
+
+    def __init__(self, telemetry: Telemetry = default_telemetry):
+        self.telemetry = telemetry
+        # run id -> (model name, start time, first token seen)
+        self._runs: Dict[UUID, Tuple[str, float, bool]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _model_name(serialized: Optional[dict], kwargs: dict) -> str:
+        params = kwargs.get("invocation_params") or {}
+        return str(params.get("model_name") or params.get("model")
+                   or ((serialized or {}).get("kwargs") or {}).get("model_name") or "unknown")
+
+    def _start(self, run_id: UUID, name: str):
+        with self._lock:
+            self._runs[run_id] = (name, time.perf_counter(), False)
+
+    def _finish(self, run_id: UUID) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return None
+        return run[0], time.perf_counter() - run[1]
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[BaseMessage]], *,
+                            run_id: UUID, **kwargs: Any) -> Any:
+        if self.telemetry.enabled:
+            self._start(run_id, self._model_name(serialized, kwargs))
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any) -> Any:
+        if self.telemetry.enabled:
+            self._start(run_id, self._model_name(serialized, kwargs))
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> Any:
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is None or run[2]:
+                return
+            self._runs[run_id] = (run[0], run[1], True)
+        self.telemetry.record_time_to_first_token(run[0], time.perf_counter() - run[1])
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> Any:
+        finished = self._finish(run_id)
+        if finished is None:
+            return
+        model, duration = finished
+        prompt_tokens, completion_tokens = self._token_usage(response)
+        self.telemetry.record_tokens(model, prompt_tokens, completion_tokens)
+        self.telemetry.record_stage("llm", duration, model=model,
+                                    prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> Any:
+        finished = self._finish(run_id)
+        if finished is not None:
+            self.telemetry.record_stage("llm", finished[1], error=True, model=finished[0],
+                                        exception=type(error).__name__)
+
+    @staticmethod
+    def _token_usage(response: LLMResult) -> Tuple[int, int]:
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        if usage:
+            return usage.get("prompt_tokens", 0) or 0, usage.get("completion_tokens", 0) or 0
+        # streamed responses carry the usage on the message instead
+        for generations in response.generations:
+            for generation in generations:
+                usage_metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage_metadata:
+                    return usage_metadata.get("input_tokens", 0), usage_metadata.get("output_tokens", 0)
+        return 0, 0
+
+    def on_retriever_start(self, serialized: Dict[str, Any], query: str, *, run_id: UUID, **kwargs: Any) -> Any:
+        if self.telemetry.enabled:
+            self._start(run_id, "retriever")
+
+    def on_retriever_end(self, documents: Sequence[Document], *, run_id: UUID, **kwargs: Any) -> Any:
+        finished = self._finish(run_id)
+        if finished is not None:
+            self.telemetry.record_chunks("retrieval", len(documents))
+            self.telemetry.record_stage("retrieval", finished[1], documents=len(documents))
+
+    def on_retriever_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> Any:
+        finished = self._finish(run_id)
+        if finished is not None:
+            self.telemetry.record_stage("retrieval", finished[1], error=True, exception=type(error).__name__)
+
+
+# a single instance, so chains nested in each other register it only once
+telemetry_callback = TelemetryCallbackHandler()
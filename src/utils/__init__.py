@@ -3,6 +3,16 @@ import sys
 import subprocess
 import shutil
 import os
+import random
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+from src.constant import NAMESPACE_PATTERN
 
 def extract_s3_info(url):
     # Define the regex pattern for extracting bucket name and filename
@@ -35,3 +45,65 @@ def delete_folder(folder_path):
         print(f"{folder_path} does not exist.")
 
 
+def validate_namespace(namespace):
+    """
+    Returns ``namespace`` if it is None or a safe namespace name (see NAMESPACE_PATTERN).
+
+    Raises:
+        ValueError: for any other name, e.g. one containing path separators.
+    """
+    if namespace is not None and not re.match(NAMESPACE_PATTERN, namespace):
+        raise ValueError(f"Invalid namespace: {namespace!r}")
+    return namespace
+
+
+def retry_with_backoff(func,
+                       max_retries: int = 3,
+                       base_delay: float = 0.5,
+                       max_delay: float = 8.0,
+                       logger=None):
+    """
+    Calls ``func`` and retries it on any exception with exponential backoff and full jitter.
+
+    Args:
+        func: zero-argument callable to invoke.
+        max_retries (int): number of retries after the first attempt.
+        base_delay (float): backoff base in seconds.
+        max_delay (float): upper bound of a single sleep in seconds.
+        logger: optional logger used to report retried failures.
+    """
+    attempt = 0
+    while True:
+        try:
+            return func()
+        except Exception as e:
+            if attempt >= max_retries:
+                raise
+            # full jitter keeps concurrent workers from retrying in lock step
+            delay = random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+            if logger is not None:
+                logger.warning(f"Attempt {attempt + 1} failed ({e}); retrying in {delay:.2f}s")
+            time.sleep(delay)
+            attempt += 1
+
+
+@contextmanager
+def file_lock(lock_path):
+    """
+    Holds an exclusive advisory lock on ``lock_path`` (created if missing) while the block
+    runs, so processes sharing the files next to it take turns. Locks are per open file,
+    so a process must not nest two ``file_lock`` calls on the same path. Without
+    ``fcntl`` (Windows) the block runs unlocked.
+
+    Args:
+        lock_path (str): path of the lock file.
+    """
+    os.makedirs(os.path.dirname(lock_path) or ".", exist_ok=True)
+    with open(lock_path, "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -1,4 +1,6 @@
 # a decorator to handle streamlit chatbot ui
+import uuid
+
 import streamlit as st
 from streamlit.runtime.uploaded_file_manager import UploadedFile
 
@@ -8,6 +10,9 @@ def chatbot(func):
     if "messages" not in st.session_state:
         st.session_state.messages = [{"role": "assistant",
                                       "content": "I am ready to use. Ask anything about the document."}]
+    # lets the retriever reuse candidates across the turns of this chat
+    if "conversation_id" not in st.session_state:
+        st.session_state.conversation_id = uuid.uuid4().hex
 
     # Display chat messages in sequence (preserve history)
     for message in st.session_state.messages:
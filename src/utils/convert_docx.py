@@ -1,23 +1,72 @@
-import re
+import atexit
+import hashlib
+import os
+import queue
+import shutil
+import signal
+import socket
 import subprocess
 import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
+from src.constant import FILE_COPY_BUFFER_SIZE
+from src.entity.config_entity import DocumentConversionConfig
+from src.logger import get_logger
+from src.telemetry import telemetry
+from src.utils.registry import resource_registry
+
+# uploads converted to PDF before parsing
+OFFICE_EXTENSIONS = (".doc", ".docx", ".odt", ".rtf", ".ppt", ".pptx", ".odp", ".xls", ".xlsx", ".ods")
+
+
+def is_office_document(file_path: str) -> bool:
+    return file_path.lower().endswith(OFFICE_EXTENSIONS)
 
-def convert_docx_to_pdf(dest_folder, source_file_path, timeout=None):
-    try:
-        args = ['libreoffice', '--headless', '--convert-to', 'pdf', '--outdir', dest_folder, source_file_path]
 
-        process = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout)
+def file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as source_file:
+        while chunk := source_file.read(FILE_COPY_BUFFER_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
 
-        if process.returncode != 0:
-            error_message = f"LibreOffice conversion failed. stderr: {process.stderr.decode()}"
-            raise LibreOfficeError(error_message)
 
+def run_process(args: List[str], timeout: Optional[float]) -> subprocess.CompletedProcess:
+    """
+    ``subprocess.run`` that kills the whole process group on timeout, so LibreOffice
+    helper processes (oosplash, soffice.bin) do not outlive a hung conversion.
+    """
+    process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, start_new_session=True)
+    try:
+        stdout, stderr = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        if hasattr(os, "killpg"):
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+        process.communicate()
+        raise
+    return subprocess.CompletedProcess(args, process.returncode, stdout, stderr)
+
+
+def convert_docx_to_pdf(dest_folder, source_file_path, timeout=None):
+    """Converts one file through the shared converter pool and copies the PDF to ``dest_folder``."""
+    try:
+        pdf_path = get_document_converter().convert([source_file_path], timeout=timeout)[source_file_path]
+        os.makedirs(dest_folder, exist_ok=True)
+        shutil.copyfile(pdf_path, os.path.join(dest_folder, Path(source_file_path).stem + ".pdf"))
         return "Conversion successful"
 
     except subprocess.TimeoutExpired as timeout_error:
         raise LibreOfficeError(f"LibreOffice conversion timed out: {timeout_error}")
 
+    except LibreOfficeError:
+        raise
+
     except Exception as e:
         raise LibreOfficeError(f"Error during LibreOffice conversion: {str(e)}")
 
@@ -31,4 +80,218 @@ def libreoffice_exec():
 
 class LibreOfficeError(Exception):
     def __init__(self, output):
+        super().__init__(output)
         self.output = output
+
+
+class ConverterWorker:
+    """
+    One converter slot with its own LibreOffice profile, so workers never contend for
+    the profile lock.
+
+    With unoserver installed the worker keeps a LibreOffice instance running behind
+    unoserver and converts each file with the light ``unoconvert`` client; the
+    instance is restarted when it dies or a conversion times out. Without it, a whole
+    batch is converted by a single ``soffice --convert-to`` run, so the startup cost is
+    paid once per batch instead of once per file.
+    """
+
+    def __init__(self, index: int, config: DocumentConversionConfig):
+        self.index = index
+        self.config = config
+        self.profile_dir = os.path.abspath(os.path.join(config.cache_dir, "profiles", f"worker-{index}"))
+        self.port = config.unoserver_port + 2 * index
+        self.use_unoserver = (config.backend != "soffice"
+                              and shutil.which("unoserver") is not None and shutil.which("unoconvert") is not None)
+        if config.backend == "unoserver" and not self.use_unoserver:
+            raise LibreOfficeError("CONVERSION_BACKEND is unoserver but unoserver/unoconvert are not installed")
+        self.process: Optional[subprocess.Popen] = None
+        self.logger = get_logger(__name__)
+
+    def _server_ready(self) -> bool:
+        try:
+            with socket.create_connection(("127.0.0.1", self.port), timeout=1):
+                return True
+        except OSError:
+            return False
+
+    def start(self):
+        if not self.use_unoserver or (self.process is not None and self.process.poll() is None):
+            return
+        with telemetry.span("converter_start", worker=self.index):
+            self.process = subprocess.Popen(["unoserver", "--interface", "127.0.0.1",
+                                             "--port", str(self.port), "--uno-port", str(self.port + 1),
+                                             "--user-installation", self.profile_dir],
+                                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                            start_new_session=True)
+            deadline = time.monotonic() + self.config.startup_timeout_seconds
+            while not self._server_ready():
+                if self.process.poll() is not None or time.monotonic() > deadline:
+                    self.stop()
+                    raise LibreOfficeError(f"Converter worker {self.index} failed to start")
+                time.sleep(0.2)
+        self.logger.info(f"Started converter worker {self.index} on port {self.port}")
+
+    def stop(self):
+        if self.process is None:
+            return
+        if self.process.poll() is None:
+            if hasattr(os, "killpg"):
+                os.killpg(self.process.pid, signal.SIGTERM)
+            else:
+                self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
+
+    def restart(self):
+        if not self.use_unoserver:
+            # every soffice run is a fresh process; the timed out one was killed already
+            return
+        self.logger.warning(f"Restarting converter worker {self.index}")
+        self.stop()
+        self.start()
+
+    def convert_batch(self, file_paths: List[str], output_dir: str, timeout: float) -> Dict[str, str]:
+        """Converts ``file_paths`` (unique stems) into ``output_dir``; returns ``{source: pdf path}``."""
+        outputs = {file_path: os.path.join(output_dir, Path(file_path).stem + ".pdf") for file_path in file_paths}
+        if self.use_unoserver:
+            self.start()
+            for file_path, output_path in outputs.items():
+                process = run_process(["unoconvert", "--host", "127.0.0.1", "--port", str(self.port),
+                                       "--convert-to", "pdf", os.path.abspath(file_path), output_path], timeout)
+                if process.returncode != 0:
+                    raise LibreOfficeError(f"LibreOffice conversion failed. stderr: {process.stderr.decode()}")
+        else:
+            process = run_process([libreoffice_exec(), f"-env:UserInstallation={Path(self.profile_dir).as_uri()}",
+                                   "--headless", "--norestore", "--convert-to", "pdf", "--outdir", output_dir,
+                                   *map(os.path.abspath, file_paths)], timeout * len(file_paths))
+            if process.returncode != 0:
+                raise LibreOfficeError(f"LibreOffice conversion failed. stderr: {process.stderr.decode()}")
+
+        missing = [file_path for file_path, output_path in outputs.items() if not os.path.exists(output_path)]
+        if missing:
+            raise LibreOfficeError(f"LibreOffice produced no PDF for {', '.join(missing)}")
+        return outputs
+
+
+class DocumentConverter:
+    """
+    Pool of ConverterWorkers converting office documents to PDF.
+
+    Converted PDFs are cached under ``cache_dir`` by the sha256 of their source, so a
+    re-uploaded document is never converted twice. Uncached files are converted in
+    batches of ``batch_size``, one batch per free worker. A batch that fails or times
+    out restarts its worker and is retried file by file, so the good documents of
+    the batch are still converted and cached.
+    """
+
+    def __init__(self, document_conversion_config: DocumentConversionConfig = None):
+        self.config = document_conversion_config or DocumentConversionConfig()
+        self.workers: "queue.Queue[ConverterWorker]" = queue.Queue()
+        for index in range(max(1, self.config.workers)):
+            self.workers.put(ConverterWorker(index, self.config))
+        self.executor = ThreadPoolExecutor(max_workers=max(1, self.config.workers),
+                                           thread_name_prefix="document-converter")
+        self.logger = get_logger(__name__)
+
+    def cache_path(self, content_hash: str) -> str:
+        return os.path.join(self.config.cache_dir, f"{content_hash}.pdf")
+
+    def get_batches(self, items: List[Tuple[str, str]]) -> List[List[Tuple[str, str]]]:
+        """Batches of ``(path, content hash)``; stems are unique within a batch since outputs share a directory."""
+        batches: List[List[Tuple[str, str]]] = []
+        for item in items:
+            stem = Path(item[0]).stem
+            batch = next((batch for batch in batches
+                          if len(batch) < self.config.batch_size
+                          and all(Path(path).stem != stem for path, _ in batch)), None)
+            if batch is None:
+                batches.append([item])
+            else:
+                batch.append(item)
+        return batches
+
+    def _convert_with_worker(self, worker: ConverterWorker, batch: List[Tuple[str, str]],
+                             timeout: float) -> Dict[str, str]:
+        with tempfile.TemporaryDirectory(dir=os.path.abspath(self.config.cache_dir)) as output_dir:
+            outputs = worker.convert_batch([path for path, _ in batch], output_dir, timeout)
+            converted = {}
+            for path, content_hash in batch:
+                # atomic, so a concurrent reader never sees a partial PDF
+                os.replace(outputs[path], self.cache_path(content_hash))
+                converted[path] = self.cache_path(content_hash)
+            return converted
+
+    def _convert_batch(self, batch: List[Tuple[str, str]], timeout: float) -> Tuple[Dict[str, str], List[str]]:
+        """Returns the converted files and the error of every file that could not be converted."""
+        worker = self.workers.get()
+        try:
+            with telemetry.span("document_conversion", worker=worker.index, files=len(batch)):
+                try:
+                    return self._convert_with_worker(worker, batch, timeout), []
+                except (LibreOfficeError, subprocess.TimeoutExpired) as e:
+                    worker.restart()
+                    if len(batch) == 1:
+                        return {}, [f"{batch[0][0]}: {e}"]
+                    self.logger.warning(f"Batch of {len(batch)} failed ({e}); converting its files one by one")
+
+                converted, errors = {}, []
+                for item in batch:
+                    try:
+                        converted.update(self._convert_with_worker(worker, [item], timeout))
+                    except (LibreOfficeError, subprocess.TimeoutExpired) as e:
+                        errors.append(f"{item[0]}: {e}")
+                        worker.restart()
+                return converted, errors
+        finally:
+            self.workers.put(worker)
+
+    def convert(self, file_paths: List[str], content_hashes: Dict[str, str] = None,
+                timeout: float = None) -> Dict[str, str]:
+        """
+        Returns ``{source path: converted PDF path}`` for ``file_paths``. ``content_hashes``
+        may carry the already known sha256 of the sources; the others are hashed here.
+        """
+        content_hashes = content_hashes or {}
+        timeout = timeout or self.config.timeout_seconds
+        os.makedirs(self.config.cache_dir, exist_ok=True)
+
+        converted, pending = {}, []
+        for file_path in file_paths:
+            content_hash = content_hashes.get(file_path) or file_sha256(file_path)
+            if os.path.exists(self.cache_path(content_hash)):
+                converted[file_path] = self.cache_path(content_hash)
+            else:
+                pending.append((file_path, content_hash))
+        telemetry.record_cache("converted_documents", hits=len(converted), misses=len(pending))
+
+        futures = [self.executor.submit(self._convert_batch, batch, timeout) for batch in self.get_batches(pending)]
+        errors = []
+        for future in futures:
+            batch_converted, batch_errors = future.result()
+            converted.update(batch_converted)
+            errors.extend(batch_errors)
+        if errors:
+            # the documents that did convert are cached for the next attempt
+            raise LibreOfficeError(f"Could not convert {len(errors)} documents: {'; '.join(errors)}")
+        if pending:
+            self.logger.info(f"Converted {len(pending)} documents to PDF, {len(file_paths) - len(pending)} cached")
+        return converted
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        while not self.workers.empty():
+            self.workers.get_nowait().stop()
+
+
+def get_document_converter() -> DocumentConverter:
+    """Returns the process-wide converter pool; its workers stay warm between uploads."""
+    def build_converter():
+        converter = DocumentConverter()
+        atexit.register(converter.close)
+        return converter
+
+    return resource_registry.get_or_create("document-converter", build_converter)
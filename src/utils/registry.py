@@ -0,0 +1,67 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class TTLRegistry:
+    """
+    Thread-safe, process-wide cache of expensive objects (clients, index handles, chains).
+
+    ``get_or_create`` builds an entry at most once per key even when several threads
+    ask for it at the same time; entries expire ``ttl`` seconds after creation.
+    """
+
+    def __init__(self, default_ttl: Optional[float] = None):
+        self.default_ttl = default_ttl
+        self._entries: Dict[Hashable, Tuple[Any, Optional[float]]] = {}
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _get_live(self, key: Hashable):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        _, expires_at = entry
+        if expires_at is not None and time.monotonic() >= expires_at:
+            self._entries.pop(key, None)
+            return None
+        return entry
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        with self._lock:
+            entry = self._get_live(key)
+            if entry is not None:
+                return entry[0]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # build outside the registry lock so slow factories only block callers of the same key
+        with key_lock:
+            with self._lock:
+                entry = self._get_live(key)
+                if entry is not None:
+                    return entry[0]
+
+            value = factory()
+            ttl = self.default_ttl if ttl is None else ttl
+            with self._lock:
+                self._entries[key] = (value, time.monotonic() + ttl if ttl is not None else None)
+            return value
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return self._get_live(key) is not None
+
+    def invalidate(self, key: Hashable = None, prefix: Hashable = None):
+        """Drops ``key``, every tuple key starting with ``prefix``, or everything when neither is given."""
+        with self._lock:
+            if key is not None:
+                self._entries.pop(key, None)
+            elif prefix is not None:
+                for existing in [k for k in self._entries if isinstance(k, tuple) and k and k[0] == prefix]:
+                    self._entries.pop(existing, None)
+            else:
+                self._entries.clear()
+
+
+# shared by every pipeline in the process (Streamlit reruns, service requests, batch jobs)
+resource_registry = TTLRegistry()
@@ -1,38 +1,123 @@
 import os, sys
 import time
+from typing import Iterable, List, Optional
 
 from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings
 
+from src.constant import (EMBEDDING_DIMENSION, VECTOR_STORE_BACKEND, PINECONE_CLIENT_TTL_SECONDS,
+                          PINECONE_INDEX_READY_TTL_SECONDS)
+from src.entity.config_entity import LexicalIndexConfig, LocalVectorIndexConfig
 from src.logger import get_logger
 from src.exception import CustomException
+from src.utils import validate_namespace
+from src.utils.registry import resource_registry
+from src.vector_db_connection.document_registry import DocumentVersionRegistry
+from src.vector_db_connection.lexical_index import LexicalIndex
+from src.vector_db_connection.local_index import LocalIndex, LocalVectorStore, MemoryIndex
+from langchain_core.vectorstores import VectorStore as LangchainVectorStore
 from langchain_pinecone import PineconeVectorStore
 from langchain.indexes import SQLRecordManager, index
+from langchain.indexes._sql_record_manager import UpsertionRecord
 from pinecone import Pinecone, ServerlessSpec
+from sqlalchemy import create_engine, or_
+from sqlalchemy.pool import StaticPool
+
+# "memory" keeps vectors and the record manager in the process only (tests, offline benchmarks)
+SUPPORTED_BACKENDS = ("pinecone", "local", "memory")
 
 
 class VectorStore:
     def __init__(self,
-                 pinecone_index_name: str):
+                 pinecone_index_name: str,
+                 backend: str = None,
+                 local_index_config: LocalVectorIndexConfig = None,
+                 lexical_index_config: LexicalIndexConfig = None):
+        """
+        Parameters:
+        pinecone_index_name (str): Name of the index; also names the local index directory.
+        backend (str): "pinecone", "local" or "memory". Defaults to the VECTOR_STORE_BACKEND setting.
+        local_index_config (LocalVectorIndexConfig): Settings for the local backend.
+        lexical_index_config (LexicalIndexConfig): Settings for the BM25 index kept next to the vectors.
+        """
         self.pinecone_index_name = pinecone_index_name
+        self.backend = (backend or VECTOR_STORE_BACKEND).lower()
+        self.local_index_config = local_index_config or LocalVectorIndexConfig()
+        self.lexical_index_config = lexical_index_config or LexicalIndexConfig()
 
         self.logger = get_logger(__name__)
-        try:
-            self.pinecone_api_key = os.getenv('PINECONE_API_KEY')
+        self._record_managers = {}
+        if self.backend not in SUPPORTED_BACKENDS:
+            raise ValueError(f"Unsupported vector store backend: {self.backend}. "
+                             f"Expected one of {SUPPORTED_BACKENDS}")
+
+        if self.backend == "pinecone":
+            try:
+                self.pinecone_api_key = os.getenv('PINECONE_API_KEY')
 
-        except KeyError:
-            raise CustomException('PINECONE_API_KEY environment variable not found.')
+            except KeyError:
+                raise CustomException('PINECONE_API_KEY environment variable not found.')
 
-        self.pinecone_connection = Pinecone(api_key=self.pinecone_api_key)
+            # one client per API key for the whole process
+            self.pinecone_connection = resource_registry.get_or_create(
+                ("pinecone-client", self.pinecone_api_key),
+                lambda: Pinecone(api_key=self.pinecone_api_key),
+                ttl=PINECONE_CLIENT_TTL_SECONDS,
+            )
+
+    @property
+    def record_manager_db_url(self) -> str:
+        if self.backend == "local":
+            # keep the record manager next to the index so both are wiped together
+            os.makedirs(self.local_index_config.index_root_dir, exist_ok=True)
+            return f"sqlite:///{os.path.join(self.local_index_config.index_root_dir, 'record_manager_cache.sql')}"
+        return "sqlite:///record_manager_cache.sql"
+
+    def get_local_index(self, namespace: str = None) -> LocalIndex:
+        index_dir = os.path.join(self.local_index_config.index_root_dir,
+                                 self.pinecone_index_name,
+                                 validate_namespace(namespace) or "default")
+        return LocalIndex.open(index_dir, self.local_index_config)
+
+    def get_memory_index(self, namespace: str = None) -> MemoryIndex:
+        return resource_registry.get_or_create(("memory-index", self.pinecone_index_name, namespace or "default"),
+                                               MemoryIndex)
+
+    def get_lexical_index(self, namespace: str = None) -> LexicalIndex:
+        """Returns the BM25 index holding the same chunks as the vector index of ``namespace``."""
+        if self.backend == "memory":
+            return resource_registry.get_or_create(("memory-lexical-index", self.pinecone_index_name,
+                                                    namespace or "default"),
+                                                   lambda: LexicalIndex(config=self.lexical_index_config))
+        index_dir = os.path.join(self.lexical_index_config.index_root_dir,
+                                 self.backend,
+                                 self.pinecone_index_name,
+                                 validate_namespace(namespace) or "default")
+        return LexicalIndex.open(index_dir, self.lexical_index_config)
 
     def create_index(self):
+        """
+        Returns the Pinecone index handle, creating the index if needed.
+
+        The handle is kept in the process-wide registry, so once an index is known to be
+        ready no further list_indexes/describe_index round trips are made until it expires.
+        """
+        try:
+            return resource_registry.get_or_create(("pinecone-index", self.pinecone_api_key, self.pinecone_index_name),
+                                                   self._ensure_index,
+                                                   ttl=PINECONE_INDEX_READY_TTL_SECONDS)
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _ensure_index(self):
         try:
             existing_indexes = [index_info["name"] for index_info in self.pinecone_connection.list_indexes()]
 
             if self.pinecone_index_name not in existing_indexes:
                 self.pinecone_connection.create_index(
                     name=self.pinecone_index_name,
-                    dimension=1536,
+                    dimension=EMBEDDING_DIMENSION,
                     metric="cosine",
                     spec=ServerlessSpec(cloud="aws", region="us-east-1"),
                 )
@@ -48,31 +133,38 @@ class VectorStore:
     @staticmethod
     def upload_docs_to_pinecone(docs: list,
                                 record_manager=None,
-                                vectorstore=None):
+                                vectorstore=None,
+                                cleanup: Optional[str] = "incremental") -> dict:
         try:
             # Upload documents to pinecome
-            index(docs, record_manager, vectorstore,
-                  cleanup="incremental", source_id_key="source")
+            return index(docs, record_manager, vectorstore,
+                         cleanup=cleanup, source_id_key="source")
 
         except Exception as e:
             raise CustomException(e, sys)
 
     def get_vectorstore(self, embeddings: Embeddings,
-                        namespace: str=None) -> PineconeVectorStore:
+                        namespace: str=None) -> LangchainVectorStore:
         """
-        This function creates a PineconeVectorStore instance using the provided embeddings and namespace.
+        This function creates a PineconeVectorStore instance using the provided embeddings and namespace,
+        or a LocalVectorStore when the local or memory backend is selected.
 
         Parameters:
         - embeddings (Embeddings): The embeddings to be used for vectorizing the documents.
         - namespace (str): The namespace for the vector store.
 
         Returns:
-        - PineconeVectorStore: An instance of PineconeVectorStore with the given embeddings and namespace.
+        - LangchainVectorStore: A PineconeVectorStore or LocalVectorStore with the given embeddings and namespace.
 
         Raises:
         - CustomException: If an error occurs while creating the vector store.
         """
         try:
+            if self.backend == "local":
+                return LocalVectorStore(self.get_local_index(namespace), embeddings)
+            if self.backend == "memory":
+                return LocalVectorStore(self.get_memory_index(namespace), embeddings)
+
             # Create a Pinecone vector store with the given embeddings and namespace
             pinecone_index = self.create_index()
             pinecone_vector_store = PineconeVectorStore(pinecone_index,
@@ -83,31 +175,129 @@ class VectorStore:
         except Exception as e:
             raise CustomException(e, sys)
 
+    def get_record_manager(self, namespace: str = None) -> SQLRecordManager:
+        """
+        Returns the record manager for ``namespace``, creating it and its schema only once per instance.
+        """
+        try:
+            # the default namespace keeps its historical key, so existing record manager state stays valid
+            namespace = (f"pinecone/{self.pinecone_index_name}/{namespace}" if namespace
+                         else f"pinecone/{self.pinecone_index_name}")
+            if self.backend == "memory":
+                # shared by every VectorStore in the process, like the memory index itself
+                return resource_registry.get_or_create(("memory-record-manager", namespace),
+                                                       lambda: self._create_memory_record_manager(namespace))
+            if namespace not in self._record_managers:
+                record_manager = SQLRecordManager(
+                    namespace, db_url=self.record_manager_db_url
+                )
+                record_manager.create_schema()
+                self._record_managers[namespace] = record_manager
+            return self._record_managers[namespace]
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @staticmethod
+    def _create_memory_record_manager(namespace: str) -> SQLRecordManager:
+        # a single connection, so every thread sees the same in-memory database
+        engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        record_manager = SQLRecordManager(namespace, engine=engine)
+        record_manager.create_schema()
+        return record_manager
+
     def upload_document(self, embeddings: Embeddings,
                         documents: list[list[Document]],
-                        namespace: str = None):
+                        namespace: str = None,
+                        cleanup: Optional[str] = "incremental") -> dict:
+        """
+        Indexes ``documents`` through the record manager so unchanged chunks are skipped.
+
+        Pass ``cleanup=None`` when a single source is uploaded across several calls and
+        call ``cleanup_sources`` once all of its batches are in; incremental cleanup would
+        otherwise delete the chunks written by the earlier batches.
+        """
         try:
             pinecone_vector_store = self.get_vectorstore(embeddings,
                                                          namespace=namespace)
+            record_manager = self.get_record_manager(namespace)
 
-            if not namespace:
-                namespace = f"pinecone/{self.pinecone_index_name}"
-                
-            record_manager = SQLRecordManager(
-                namespace, db_url="sqlite:///record_manager_cache.sql"
-            )
+            # upload docs
+            result = self.upload_docs_to_pinecone(docs=documents,
+                                                  record_manager=record_manager,
+                                                  vectorstore=pinecone_vector_store,
+                                                  cleanup=cleanup)
 
-            record_manager.create_schema()
+            if self.lexical_index_config.enabled:
+                # unchanged chunks are added too (a no-op once present), so chunks indexed
+                # before the lexical index existed are picked up on their next upload
+                lexical_index = self.get_lexical_index(namespace)
+                if cleanup is None:
+                    lexical_index.add(documents)
+                else:
+                    lexical_index.replace_sources(documents)
+                    lexical_index.save()
 
-            # upload docs
-            
-            self.upload_docs_to_pinecone(docs=documents,
-                                             record_manager=record_manager,
-                                             vectorstore=pinecone_vector_store)
-                
-                
-
-            self.logger.info(f"Documents uploaded successfully to Pinecone index: {self.pinecone_index_name}")
+            if result["num_added"] or result["num_updated"] or result["num_deleted"]:
+                # anything cached against the previous content of these sources is now stale
+                DocumentVersionRegistry.open().bump({document.metadata.get("source") for document in documents},
+                                                    documents, namespace=namespace)
+
+            self.logger.info(f"Documents uploaded successfully to {self.backend} index: {self.pinecone_index_name} "
+                             f"{result}")
+            return result
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @staticmethod
+    def _sources_under(record_manager: SQLRecordManager, prefixes: Iterable[str], before: float) -> List[str]:
+        # the record manager only filters by exact group id, so prefixes are resolved against its table
+        with record_manager._make_session() as session:
+            query = session.query(UpsertionRecord.group_id).filter(
+                UpsertionRecord.namespace == record_manager.namespace,
+                UpsertionRecord.updated_at < before,
+                or_(*(UpsertionRecord.group_id.startswith(prefix, autoescape=True) for prefix in prefixes)),
+            ).distinct()
+            return [group_id for (group_id,) in query.all()]
+
+    def cleanup_sources(self, embeddings: Embeddings,
+                        sources: Iterable[str],
+                        before: float,
+                        namespace: str = None,
+                        source_prefixes: Iterable[str] = ()) -> int:
+        """
+        Deletes chunks of ``sources`` that were not re-indexed since ``before``
+        (the record manager time taken when the upload run started).
+
+        Every source starting with one of ``source_prefixes`` is cleaned as well, so the
+        members an archive no longer contains are removed when the archive is re-uploaded.
+
+        Returns:
+        int: number of deleted chunks.
+        """
+        try:
+            record_manager = self.get_record_manager(namespace)
+            sources = {source for source in sources if source is not None}
+            source_prefixes = [prefix for prefix in source_prefixes if prefix]
+            if source_prefixes:
+                sources.update(self._sources_under(record_manager, source_prefixes, before))
+            sources = sorted(sources)
+            if not sources:
+                return 0
+
+            stale_ids = record_manager.list_keys(group_ids=sources, before=before)
+            if stale_ids:
+                self.get_vectorstore(embeddings, namespace=namespace).delete(stale_ids)
+                record_manager.delete_keys(stale_ids)
+                DocumentVersionRegistry.open().bump(sources, namespace=namespace)
+                self.logger.info(f"Removed {len(stale_ids)} stale chunks from {self.pinecone_index_name}")
+            if self.lexical_index_config.enabled:
+                # called once at the end of an upload run, so the batches added before are saved here
+                lexical_index = self.get_lexical_index(namespace)
+                lexical_index.delete(stale_ids)
+                lexical_index.save()
+            return len(stale_ids)
 
         except Exception as e:
             raise CustomException(e, sys)
@@ -0,0 +1,198 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from langchain_core.documents import Document
+
+from src.constant import ARTIFACT_DIR, DOCUMENT_VERSIONS_FILE_NAME, FILE_MANIFEST_FILE_NAME, INDEXED_FILES_FILE_NAME
+
+
+class JsonRegistry:
+    """
+    Small dict persisted as a JSON file, shared per path within the process and reloaded
+    when another process (e.g. the upload page vs. the chat) rewrites it.
+    """
+
+    _instances: Dict[str, "JsonRegistry"] = {}
+    _instances_lock = threading.Lock()
+    default_file_name: str = None
+
+    def __init__(self, registry_path: str):
+        self.registry_path = registry_path
+        self._lock = threading.Lock()
+        self._data: Dict[str, object] = {}
+        self._mtime = None
+        self._reload_if_changed()
+
+    @classmethod
+    def open(cls, registry_path: str = None):
+        registry_path = os.path.abspath(registry_path or os.path.join(ARTIFACT_DIR, cls.default_file_name))
+        with cls._instances_lock:
+            key = f"{cls.__name__}:{registry_path}"
+            if key not in cls._instances:
+                cls._instances[key] = cls(registry_path)
+            return cls._instances[key]
+
+    def _on_change(self):
+        pass
+
+    def _reload_if_changed(self):
+        mtime = os.path.getmtime(self.registry_path) if os.path.exists(self.registry_path) else None
+        if mtime == self._mtime:
+            return
+        if mtime is None:
+            self._data = {}
+        else:
+            with open(self.registry_path) as registry_file:
+                self._data = json.load(registry_file)
+        self._mtime = mtime
+        self._on_change()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.registry_path), exist_ok=True)
+        tmp_path = self.registry_path + ".tmp"
+        with open(tmp_path, "w") as registry_file:
+            json.dump(self._data, registry_file, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.registry_path)
+        self._mtime = os.path.getmtime(self.registry_path)
+        self._on_change()
+
+
+class DocumentVersionRegistry(JsonRegistry):
+    """
+    Tracks a content version per indexed source.
+
+    ``fingerprint`` summarises the versions of every indexed source; anything derived
+    from the index (e.g. cached answers) can be keyed on it and becomes stale as soon
+    as a source is re-ingested with different content.
+    """
+
+    default_file_name = DOCUMENT_VERSIONS_FILE_NAME
+
+    def __init__(self, registry_path: str):
+        self._fingerprint = None
+        super().__init__(registry_path)
+
+    def _on_change(self):
+        self._fingerprint = None
+
+    @staticmethod
+    def _key(namespace: str, source: str) -> str:
+        return f"{namespace or 'default'}:{source}"
+
+    def bump(self, sources: Iterable[str], documents: List[Document] = (), namespace: str = None):
+        """Advances the version of ``sources`` after their chunks changed in the index."""
+        digest = hashlib.sha256()
+        for document in documents:
+            digest.update(document.page_content.encode("utf-8"))
+        with self._lock:
+            self._reload_if_changed()
+            for source in sources:
+                if source is None:
+                    continue
+                key = self._key(namespace, source)
+                previous = self._data.get(key, "")
+                self._data[key] = hashlib.sha256(
+                    (previous + digest.hexdigest()).encode("utf-8")).hexdigest()[:16]
+            self._save()
+
+    def get_version(self, source: str, namespace: str = None):
+        with self._lock:
+            self._reload_if_changed()
+            return self._data.get(self._key(namespace, source))
+
+    def fingerprint(self) -> str:
+        with self._lock:
+            self._reload_if_changed()
+            if self._fingerprint is None:
+                payload = json.dumps(self._data, sort_keys=True).encode("utf-8")
+                self._fingerprint = hashlib.sha256(payload).hexdigest()[:16]
+            return self._fingerprint
+
+
+class IndexedFileRegistry(JsonRegistry):
+    """Content hashes of the uploaded files whose chunks are already in the index."""
+
+    default_file_name = INDEXED_FILES_FILE_NAME
+
+    def get_indexed_path(self, content_hash: str):
+        """Returns the stored path the content was indexed from, or None if it is not indexed."""
+        with self._lock:
+            self._reload_if_changed()
+            entry = self._data.get(content_hash)
+            return entry["path"] if entry else None
+
+    def mark_indexed(self, files: Dict[str, str]):
+        """Records ``{content_hash: stored path}`` once the files have been ingested."""
+        if not files:
+            return
+        with self._lock:
+            self._reload_if_changed()
+            indexed_at = datetime.now().isoformat(timespec="seconds")
+            stored_paths = set(files.values())
+            # a path re-uploaded with new content no longer holds the old content
+            for content_hash in [h for h, entry in self._data.items() if entry["path"] in stored_paths]:
+                del self._data[content_hash]
+            for content_hash, file_path in files.items():
+                self._data[content_hash] = {"path": file_path, "indexed_at": indexed_at}
+            self._save()
+
+    def forget(self, content_hashes: Iterable[str]):
+        with self._lock:
+            self._reload_if_changed()
+            for content_hash in content_hashes:
+                self._data.pop(content_hash, None)
+            self._save()
+
+
+class FileManifest(JsonRegistry):
+    """
+    Maps every uploaded document path to the sha256 of its current content and the
+    content-addressed object holding it. Documents with the same content share one
+    object; an object is superseded once no document refers to it any more.
+    """
+
+    default_file_name = FILE_MANIFEST_FILE_NAME
+
+    def get_hash(self, document_path: str) -> Optional[str]:
+        with self._lock:
+            self._reload_if_changed()
+            entry = self._data.get(document_path)
+            return entry["hash"] if entry else None
+
+    def get_hashes(self, document_paths: Iterable[str] = None) -> Dict[str, str]:
+        """``{document path: sha256}`` of ``document_paths`` (all documents by default); unknown paths are left out."""
+        with self._lock:
+            self._reload_if_changed()
+            if document_paths is None:
+                return {path: entry["hash"] for path, entry in self._data.items()}
+            return {path: self._data[path]["hash"] for path in document_paths if path in self._data}
+
+    def record(self, document_path: str, original_name: str, content_hash: str, object_path: str,
+               size: int) -> Optional[str]:
+        """
+        Points ``document_path`` at ``content_hash``. Returns the object of the previous
+        content when it is no longer referenced by any document, so it can be removed.
+        """
+        with self._lock:
+            self._reload_if_changed()
+            previous = self._data.get(document_path)
+            if previous is not None and previous["hash"] == content_hash and previous["name"] == original_name:
+                return None
+            self._data[document_path] = {"name": original_name, "hash": content_hash, "object": object_path,
+                                         "size": size, "stored_at": datetime.now().isoformat(timespec="seconds")}
+            self._save()
+            if previous is None or previous["hash"] == content_hash:
+                return None
+            if any(entry["hash"] == previous["hash"] for entry in self._data.values()):
+                return None
+            return previous["object"]
+
+    def is_referenced(self, object_path: str) -> bool:
+        """Whether any document still points at ``object_path``."""
+        with self._lock:
+            self._reload_if_changed()
+            return any(entry["object"] == object_path for entry in self._data.values())
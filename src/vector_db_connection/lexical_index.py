@@ -0,0 +1,375 @@
+import json
+import math
+import os
+import re
+import threading
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.indexing.api import _HashedDocument
+
+from src.entity.config_entity import LexicalIndexConfig
+from src.logger import get_logger
+from src.utils import file_lock
+from src.vector_db_connection.local_index import matches_filter
+
+POSTINGS_FILE_NAME: str = "postings.npz"
+DOCUMENTS_FILE_NAME: str = "documents.json"
+LEXICON_FILE_NAME: str = "lexicon.json"
+LOCK_FILE_NAME: str = ".lock"
+
+# words and identifiers such as "ab-1234", "4.2.1" or "iso_9001"
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-./_:][a-z0-9]+)*")
+IDENTIFIER_SEPARATORS = re.compile(r"[-./_:]")
+STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from has have how i if in into is it its of on or "
+    "our so that the their then there these this to was we were what when where which who why will "
+    "with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased terms of ``text``; compound identifiers are indexed whole and by their parts."""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(part for part in IDENTIFIER_SEPARATORS.split(token) if part not in STOPWORDS)
+    return tokens
+
+
+def is_identifier(term: str) -> bool:
+    """Part numbers, clause ids and other terms containing a digit."""
+    return any(character.isdigit() for character in term)
+
+
+def record_ids(documents: Iterable[Document]) -> List[str]:
+    """The ids ``index()`` stores ``documents`` under, so both indexes can be kept in step."""
+    return [_HashedDocument.from_document(document).uid for document in documents]
+
+
+class LexicalHit(NamedTuple):
+    document: Document
+    score: float
+    # share of the query's idf weight matched by the document
+    coverage: float
+    # share of the query's identifiers found in the document (0 when the query has none)
+    identifier_coverage: float
+
+
+class LexicalIndex:
+    """
+    BM25 inverted index over the indexed chunks.
+
+    Every term owns two integer arrays (``array("i")``): the rows of the documents it
+    occurs in and its frequency in each of them. Search scores only the postings of the
+    query terms, vectorised with numpy over a dense per-row accumulator. Deleted rows
+    are tombstoned and the index is compacted once they outnumber the live ones.
+
+    With an ``index_dir`` the index is persisted by ``save`` as numpy arrays plus JSON
+    and reloaded when another process rewrites it; without one it lives in memory only.
+    Changes not saved yet are kept as a journal and replayed onto every reload, and
+    ``save`` reloads and writes under a file lock, so processes sharing the directory
+    never overwrite each other's chunks.
+    """
+
+    _instances: Dict[str, "LexicalIndex"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, index_dir: Optional[str] = None, config: LexicalIndexConfig = None):
+        self.index_dir = index_dir
+        self.config = config or LexicalIndexConfig()
+        self.logger = get_logger(__name__)
+        self._lock = threading.RLock()
+        self._reset()
+        self._mtime = None
+        # ("add", doc_id, text, metadata) and ("delete", doc_id) since the last save
+        self._journal: List[tuple] = []
+        if self.index_dir:
+            self._load()
+
+    @classmethod
+    def open(cls, index_dir: str, config: LexicalIndexConfig = None) -> "LexicalIndex":
+        """Returns the shared index for ``index_dir``."""
+        index_dir = os.path.abspath(index_dir)
+        with cls._instances_lock:
+            if index_dir not in cls._instances:
+                cls._instances[index_dir] = cls(index_dir, config)
+            return cls._instances[index_dir]
+
+    def _reset(self):
+        self._terms: Dict[str, int] = {}
+        self._postings: List[array] = []
+        self._frequencies: List[array] = []
+        self._lengths = array("i")
+        self._live = bytearray()
+        self._records: List[Optional[Tuple[str, str, dict]]] = []
+        self._rows: Dict[str, int] = {}
+        self._source_rows: Dict[str, Set[int]] = {}
+        self.live_count = 0
+        self._total_length = 0
+        self._length_norms: Optional[np.ndarray] = None
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return self.live_count
+
+    def _path(self, file_name: str) -> str:
+        return os.path.join(self.index_dir, file_name)
+
+    def _load(self):
+        lexicon_path = self._path(LEXICON_FILE_NAME)
+        if not os.path.exists(lexicon_path):
+            return
+        with open(lexicon_path) as lexicon_file:
+            terms = json.load(lexicon_file)["terms"]
+        with open(self._path(DOCUMENTS_FILE_NAME)) as documents_file:
+            records = json.load(documents_file)
+        with np.load(self._path(POSTINGS_FILE_NAME)) as postings:
+            offsets, rows, frequencies = postings["offsets"], postings["rows"], postings["frequencies"]
+            lengths = postings["lengths"]
+
+        self._reset()
+        self._terms = {term: term_id for term_id, term in enumerate(terms)}
+        for term_id in range(len(terms)):
+            start, end = offsets[term_id], offsets[term_id + 1]
+            self._postings.append(array("i", rows[start:end].tobytes()))
+            self._frequencies.append(array("i", frequencies[start:end].tobytes()))
+        self._lengths = array("i", lengths.astype(np.int32).tobytes())
+        for row, record in enumerate(records):
+            if record is None:
+                self._records.append(None)
+                self._live.append(0)
+                continue
+            doc_id, text, metadata = record
+            self._records.append((doc_id, text, metadata))
+            self._live.append(1)
+            self._rows[doc_id] = row
+            self._source_rows.setdefault(metadata.get("source"), set()).add(row)
+            self.live_count += 1
+            self._total_length += self._lengths[row]
+        self._mtime = os.path.getmtime(lexicon_path)
+
+    def _is_stale(self) -> bool:
+        lexicon_path = self._path(LEXICON_FILE_NAME)
+        return os.path.exists(lexicon_path) and os.path.getmtime(lexicon_path) != self._mtime
+
+    def _reload(self):
+        # the saved state of the other processes plus this one's unsaved changes
+        self._load()
+        for entry in self._journal:
+            if entry[0] == "add":
+                _, doc_id, text, metadata = entry
+                self._add([Document(page_content=text, metadata=metadata)], [doc_id])
+            else:
+                self._delete([entry[1]])
+
+    def _refresh_if_stale(self):
+        if not self.index_dir or not self._is_stale():
+            return
+        # the lock keeps a writer from replacing the files halfway through the load
+        with file_lock(self._path(LOCK_FILE_NAME)):
+            if self._is_stale():
+                self._reload()
+
+    def save(self):
+        """
+        Writes the index to ``index_dir`` if it changed since the last save. Under the file
+        lock, the index is first reloaded if another process saved in the meantime.
+        """
+        with self._lock:
+            if not self.index_dir or not self._dirty:
+                return
+            with file_lock(self._path(LOCK_FILE_NAME)):
+                if self._is_stale():
+                    self._reload()
+                self._write()
+            self._journal = []
+
+    def _write(self):
+        os.makedirs(self.index_dir, exist_ok=True)
+        offsets = np.zeros(len(self._postings) + 1, dtype=np.int64)
+        np.cumsum([len(postings) for postings in self._postings], out=offsets[1:])
+        rows = np.frombuffer(b"".join(postings.tobytes() for postings in self._postings), dtype=np.int32)
+        frequencies = np.frombuffer(b"".join(freqs.tobytes() for freqs in self._frequencies), dtype=np.int32)
+        with open(self._path(POSTINGS_FILE_NAME + ".tmp"), "wb") as postings_file:
+            np.savez(postings_file, offsets=offsets, rows=rows, frequencies=frequencies,
+                     lengths=np.array(self._lengths, dtype=np.int32))
+        with open(self._path(DOCUMENTS_FILE_NAME + ".tmp"), "w") as documents_file:
+            json.dump(self._records, documents_file)
+        terms = sorted(self._terms, key=self._terms.get)
+        with open(self._path(LEXICON_FILE_NAME + ".tmp"), "w") as lexicon_file:
+            json.dump({"terms": terms}, lexicon_file)
+        # the lexicon goes last: readers reload when its mtime changes
+        for file_name in (POSTINGS_FILE_NAME, DOCUMENTS_FILE_NAME, LEXICON_FILE_NAME):
+            os.replace(self._path(file_name + ".tmp"), self._path(file_name))
+        self._mtime = os.path.getmtime(self._path(LEXICON_FILE_NAME))
+        self._dirty = False
+
+    def add(self, documents: List[Document], ids: Optional[List[str]] = None) -> int:
+        """Indexes ``documents``; ids already present are skipped. Returns the number added."""
+        with self._lock:
+            self._refresh_if_stale()
+            ids = ids or record_ids(documents)
+            if self.index_dir:
+                self._journal.extend(("add", doc_id, document.page_content, dict(document.metadata))
+                                     for doc_id, document in zip(ids, documents) if doc_id not in self._rows)
+            return self._add(documents, ids)
+
+    def _add(self, documents: List[Document], ids: List[str]) -> int:
+        with self._lock:
+            added = 0
+            for doc_id, document in zip(ids, documents):
+                if doc_id in self._rows:
+                    continue
+                tokens = tokenize(document.page_content)
+                row = len(self._records)
+                for term, frequency in Counter(tokens).items():
+                    term_id = self._terms.get(term)
+                    if term_id is None:
+                        term_id = self._terms[term] = len(self._postings)
+                        self._postings.append(array("i"))
+                        self._frequencies.append(array("i"))
+                    self._postings[term_id].append(row)
+                    self._frequencies[term_id].append(frequency)
+                metadata = dict(document.metadata)
+                self._records.append((doc_id, document.page_content, metadata))
+                self._lengths.append(len(tokens))
+                self._live.append(1)
+                self._rows[doc_id] = row
+                self._source_rows.setdefault(metadata.get("source"), set()).add(row)
+                self.live_count += 1
+                self._total_length += len(tokens)
+                added += 1
+            if added:
+                self._length_norms = None
+                self._dirty = True
+            return added
+
+    def delete(self, ids: Iterable[str]) -> int:
+        with self._lock:
+            self._refresh_if_stale()
+            ids = list(ids)
+            if self.index_dir:
+                self._journal.extend(("delete", doc_id) for doc_id in ids)
+            return self._delete(ids)
+
+    def _delete(self, ids: Iterable[str]) -> int:
+        with self._lock:
+            deleted = 0
+            for doc_id in ids:
+                row = self._rows.pop(doc_id, None)
+                if row is None:
+                    continue
+                _, _, metadata = self._records[row]
+                self._source_rows.get(metadata.get("source"), set()).discard(row)
+                self._records[row] = None
+                self._live[row] = 0
+                self.live_count -= 1
+                self._total_length -= self._lengths[row]
+                deleted += 1
+            if deleted:
+                self._length_norms = None
+                self._dirty = True
+                if len(self._records) - self.live_count > max(self.live_count, 1_000):
+                    self._compact()
+            return deleted
+
+    def replace_sources(self, documents: List[Document], ids: Optional[List[str]] = None) -> int:
+        """
+        Mirrors ``index(cleanup="incremental")``: chunks of the sources in ``documents``
+        that are not among ``documents`` are deleted, then ``documents`` are added.
+        """
+        with self._lock:
+            self._refresh_if_stale()
+            ids = ids or record_ids(documents)
+            keep = set(ids)
+            stale = [self._records[row][0]
+                     for source in {document.metadata.get("source") for document in documents}
+                     for row in self._source_rows.get(source, ())
+                     if self._records[row][0] not in keep]
+            self.delete(stale)
+            return self.add(documents, ids)
+
+    def _compact(self):
+        live_records = [record for record in self._records if record is not None]
+        self._reset()
+        self._dirty = True
+        self._add([Document(page_content=text, metadata=metadata) for _, text, metadata in live_records],
+                 [doc_id for doc_id, _, _ in live_records])
+
+    def _norms(self) -> np.ndarray:
+        # the length part of the BM25 denominator, k1 * (1 - b + b * |d| / avgdl), per row
+        if self._length_norms is None:
+            config = self.config
+            average_length = self._total_length / self.live_count if self.live_count else 1.0
+            lengths = np.array(self._lengths, dtype=np.float32)
+            self._length_norms = config.k1 * (1 - config.b + config.b * lengths / max(average_length, 1e-9))
+        return self._length_norms
+
+    def search(self, query: str, k: int, filter: Optional[dict] = None) -> List[LexicalHit]:
+        """
+        Returns up to ``k`` hits for ``query``, best BM25 score first. A metadata
+        ``filter`` (same syntax as the vector indexes) restricts the scored rows.
+        """
+        with self._lock:
+            self._refresh_if_stale()
+            query_terms = list(dict.fromkeys(tokenize(query)))
+            if not query_terms or not self.live_count:
+                return []
+
+            k1 = self.config.k1
+            live = np.frombuffer(bytes(self._live), dtype=np.uint8).astype(bool)
+            norms = self._norms()
+            scores = np.zeros(len(self._records), dtype=np.float32)
+            matched_weight = np.zeros(len(self._records), dtype=np.float32)
+            matched_identifiers = np.zeros(len(self._records), dtype=np.int32)
+            # terms missing from the vocabulary still count towards the query weight
+            missing_idf = math.log(1 + (self.live_count + 0.5) / 0.5)
+            total_weight = 0.0
+            identifiers = [term for term in query_terms if is_identifier(term)]
+
+            for term in query_terms:
+                term_id = self._terms.get(term)
+                if term_id is None:
+                    total_weight += missing_idf
+                    continue
+                rows = np.array(self._postings[term_id], dtype=np.int32)
+                rows_live = live[rows]
+                rows = rows[rows_live]
+                document_frequency = len(rows)
+                if not document_frequency:
+                    total_weight += missing_idf
+                    continue
+                frequencies = np.array(self._frequencies[term_id], dtype=np.float32)[rows_live]
+                idf = math.log(1 + (self.live_count - document_frequency + 0.5) / (document_frequency + 0.5))
+                total_weight += idf
+                # a row occurs at most once per postings list, so fancy-index += is exact
+                scores[rows] += idf * frequencies * (k1 + 1) / (frequencies + norms[rows])
+                matched_weight[rows] += idf
+                if is_identifier(term):
+                    matched_identifiers[rows] += 1
+
+            candidates = np.flatnonzero(scores > 0)
+            if filter:
+                candidates = np.array([row for row in candidates.tolist()
+                                       if matches_filter(self._records[row][2], filter)], dtype=np.int64)
+            if len(candidates) > k:
+                candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+            candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+            hits = []
+            for row in candidates.tolist():
+                _, text, metadata = self._records[row]
+                hits.append(LexicalHit(
+                    document=Document(page_content=text, metadata=dict(metadata)),
+                    score=float(scores[row]),
+                    coverage=float(matched_weight[row] / total_weight) if total_weight else 0.0,
+                    identifier_coverage=matched_identifiers[row] / len(identifiers) if identifiers else 0.0,
+                ))
+            return hits
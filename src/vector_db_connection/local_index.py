@@ -0,0 +1,577 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore as LangchainVectorStore
+
+from src.entity.config_entity import LocalVectorIndexConfig
+from src.exception import CustomException
+from src.logger import get_logger
+from src.utils import file_lock
+from src.vector_db_connection.mmr import maximal_marginal_relevance, normalize as _normalize
+
+META_FILE_NAME: str = "meta.json"
+VECTORS_FILE_NAME: str = "vectors.npy"
+ASSIGNMENTS_FILE_NAME: str = "assignments.npy"
+CENTROIDS_FILE_NAME: str = "centroids.npy"
+DOCSTORE_FILE_NAME: str = "docstore.sqlite"
+# held from the refresh to the meta.json write of every change, so processes never hand out the same rows
+LOCK_FILE_NAME: str = ".lock"
+# row sets of the most recent metadata filters, kept until the index changes
+FILTER_CACHE_SIZE: int = 32
+
+
+def _matches_condition(value: Any, condition: Any) -> bool:
+    if not isinstance(condition, dict):
+        return value == condition
+    for operator, operand in condition.items():
+        if operator == "$eq" and value != operand:
+            return False
+        if operator == "$ne" and value == operand:
+            return False
+        if operator == "$in" and value not in operand:
+            return False
+        if operator == "$nin" and value in operand:
+            return False
+        if operator not in ("$eq", "$ne", "$in", "$nin"):
+            raise ValueError(f"Unsupported metadata filter operator: {operator}")
+    return True
+
+
+def matches_filter(metadata: dict, filter: Optional[dict]) -> bool:
+    """
+    Evaluates a Pinecone-style metadata ``filter``: ``{key: value}`` for equality or
+    ``{key: {"$in": [...]}}`` (also ``$eq``, ``$ne``, ``$nin``), every key must match.
+    """
+    if not filter:
+        return True
+    return all(_matches_condition(metadata.get(key), condition) for key, condition in filter.items())
+
+
+def _filter_sql(filter: dict) -> Tuple[str, List[Any]]:
+    """Translates a metadata ``filter`` to a docstore WHERE clause with the semantics of ``matches_filter``."""
+    clauses, parameters = [], []
+    for key, condition in filter.items():
+        value = "json_extract(metadata, ?)"
+        path = '$."' + key.replace('"', '""') + '"'
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for operator, operand in condition.items():
+            if operator in ("$eq", "$ne"):
+                clauses.append(f"{value} {'IS' if operator == '$eq' else 'IS NOT'} ?")
+                parameters.extend([path, operand])
+            elif operator in ("$in", "$nin"):
+                placeholders = ",".join("?" * len(operand))
+                clauses.append(f"{value} IN ({placeholders})" if operator == "$in"
+                               else f"({value} IS NULL OR {value} NOT IN ({placeholders}))")
+                parameters.extend([path, *operand] if operator == "$in" else [path, path, *operand])
+            else:
+                raise ValueError(f"Unsupported metadata filter operator: {operator}")
+    return " AND ".join(clauses), parameters
+
+
+class LocalIndex:
+    """
+    In-process vector index persisted as memory-mapped numpy files.
+
+    Vectors are stored L2-normalised so cosine similarity is a single inner product.
+    Small indexes are searched exactly (flat); once the index grows past
+    ``flat_threshold`` rows an IVF coarse quantizer is trained and only the
+    ``nprobe`` closest inverted lists are scanned.
+
+    Layout of ``index_dir``:
+        meta.json        - dimension, row count, capacity and IVF state
+        vectors.npy      - float32 (capacity, dimension) memmap
+        assignments.npy  - int32 (capacity,) IVF list id per row
+        centroids.npy    - float32 (nlist, dimension) IVF centroids
+        docstore.sqlite  - ids, texts, metadata and tombstones per row
+        .lock            - serialises writers across processes (``add``, ``delete``)
+    """
+
+    _instances: Dict[str, "LocalIndex"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, index_dir: str, config: LocalVectorIndexConfig):
+        self.index_dir = index_dir
+        self.config = config
+        self.logger = get_logger(__name__)
+        self._lock = threading.RLock()
+
+        self.dimension: Optional[int] = None
+        self.count: int = 0
+        self.capacity: int = 0
+        self.trained_count: int = 0
+        self._vectors: Optional[np.ndarray] = None
+        self._assignments: Optional[np.ndarray] = None
+        self._centroids: Optional[np.ndarray] = None
+        self._deleted: np.ndarray = np.zeros(0, dtype=bool)
+        self._lists: Optional[List[np.ndarray]] = None
+        # metadata filter (as JSON) -> matching live rows
+        self._filter_rows_cache: Dict[str, np.ndarray] = {}
+        self._meta_mtime: float = 0.0
+
+        os.makedirs(self.index_dir, exist_ok=True)
+        self._docstore = sqlite3.connect(os.path.join(self.index_dir, DOCSTORE_FILE_NAME),
+                                         check_same_thread=False)
+        self._docstore.execute("CREATE TABLE IF NOT EXISTS docs ("
+                               "row INTEGER PRIMARY KEY, id TEXT UNIQUE, "
+                               "text TEXT, metadata TEXT, live INTEGER DEFAULT 1)")
+        self._docstore.commit()
+        self._load()
+
+    @classmethod
+    def open(cls, index_dir: str, config: LocalVectorIndexConfig = None) -> "LocalIndex":
+        """Returns the shared index for ``index_dir`` so readers and writers in one process see the same rows."""
+        index_dir = os.path.abspath(index_dir)
+        with cls._instances_lock:
+            if index_dir not in cls._instances:
+                cls._instances[index_dir] = cls(index_dir, config or LocalVectorIndexConfig())
+            return cls._instances[index_dir]
+
+    @property
+    def kind(self) -> str:
+        return "ivf" if self._centroids is not None else "flat"
+
+    def _path(self, file_name: str) -> str:
+        return os.path.join(self.index_dir, file_name)
+
+    def _load(self):
+        meta_path = self._path(META_FILE_NAME)
+        if not os.path.exists(meta_path):
+            return
+
+        with open(meta_path) as meta_file:
+            meta = json.load(meta_file)
+        self._meta_mtime = os.path.getmtime(meta_path)
+
+        self.dimension = meta["dimension"]
+        self.count = meta["count"]
+        self.capacity = meta["capacity"]
+        self.trained_count = meta.get("trained_count", 0)
+
+        self._vectors = np.load(self._path(VECTORS_FILE_NAME), mmap_mode="r+")
+        self._assignments = np.load(self._path(ASSIGNMENTS_FILE_NAME), mmap_mode="r+")
+        centroids_path = self._path(CENTROIDS_FILE_NAME)
+        self._centroids = np.load(centroids_path) if os.path.exists(centroids_path) else None
+
+        self._deleted = np.zeros(self.capacity, dtype=bool)
+        dead_rows = [row for (row,) in self._docstore.execute("SELECT row FROM docs WHERE live = 0")]
+        self._deleted[dead_rows] = True
+        self._lists = None
+        self._filter_rows_cache = {}
+
+    def _save_meta(self):
+        meta = {
+            "dimension": self.dimension,
+            "count": self.count,
+            "capacity": self.capacity,
+            "trained_count": self.trained_count,
+            "kind": self.kind,
+        }
+        tmp_path = self._path(META_FILE_NAME + ".tmp")
+        with open(tmp_path, "w") as meta_file:
+            json.dump(meta, meta_file)
+        os.replace(tmp_path, self._path(META_FILE_NAME))
+        self._meta_mtime = os.path.getmtime(self._path(META_FILE_NAME))
+
+    def _refresh_if_stale(self):
+        # another process (e.g. the upload page) may have appended rows since we loaded
+        meta_path = self._path(META_FILE_NAME)
+        if os.path.exists(meta_path) and os.path.getmtime(meta_path) != self._meta_mtime:
+            self._load()
+
+    def _grow(self, required: int):
+        if required <= self.capacity:
+            return
+        new_capacity = max(required, self.capacity * 2, self.config.initial_capacity)
+
+        vectors = np.lib.format.open_memmap(self._path(VECTORS_FILE_NAME + ".tmp"), mode="w+",
+                                            dtype=np.float32, shape=(new_capacity, self.dimension))
+        assignments = np.lib.format.open_memmap(self._path(ASSIGNMENTS_FILE_NAME + ".tmp"), mode="w+",
+                                                dtype=np.int32, shape=(new_capacity,))
+        assignments[:] = -1
+        if self.count:
+            vectors[:self.count] = self._vectors[:self.count]
+            assignments[:self.count] = self._assignments[:self.count]
+        vectors.flush()
+        assignments.flush()
+        del vectors, assignments
+        self._vectors = self._assignments = None
+
+        os.replace(self._path(VECTORS_FILE_NAME + ".tmp"), self._path(VECTORS_FILE_NAME))
+        os.replace(self._path(ASSIGNMENTS_FILE_NAME + ".tmp"), self._path(ASSIGNMENTS_FILE_NAME))
+        self._vectors = np.load(self._path(VECTORS_FILE_NAME), mmap_mode="r+")
+        self._assignments = np.load(self._path(ASSIGNMENTS_FILE_NAME), mmap_mode="r+")
+
+        deleted = np.zeros(new_capacity, dtype=bool)
+        deleted[:self.count] = self._deleted[:self.count]
+        self._deleted = deleted
+        self.capacity = new_capacity
+
+    def _should_train(self) -> bool:
+        if self.config.index_type == "flat":
+            return False
+        if self.config.index_type == "ivf":
+            return self.count >= self.config.min_train_size and (
+                self._centroids is None or self.count >= 4 * self.trained_count)
+        # auto: switch to IVF past the threshold and retrain when the corpus has grown 4x
+        if self.count < self.config.flat_threshold:
+            return False
+        return self._centroids is None or self.count >= 4 * self.trained_count
+
+    def _train(self):
+        """Runs spherical k-means on a sample of the live rows to build the IVF coarse quantizer."""
+        live_rows = np.flatnonzero(~self._deleted[:self.count])
+        nlist = self.config.nlist or max(1, int(np.sqrt(len(live_rows))))
+        rng = np.random.default_rng(0)
+        sample_rows = live_rows
+        if len(sample_rows) > self.config.train_sample_size:
+            sample_rows = np.sort(rng.choice(live_rows, self.config.train_sample_size, replace=False))
+        sample = np.asarray(self._vectors[sample_rows])
+        nlist = min(nlist, len(sample))
+
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(self.config.train_iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            for list_id in range(nlist):
+                members = sample[labels == list_id]
+                if len(members):
+                    centroids[list_id] = members.mean(axis=0)
+            centroids = _normalize(centroids)
+
+        self._centroids = centroids.astype(np.float32)
+        np.save(self._path(CENTROIDS_FILE_NAME), self._centroids)
+        for start in range(0, self.count, 65536):
+            end = min(start + 65536, self.count)
+            self._assignments[start:end] = np.argmax(self._vectors[start:end] @ self._centroids.T, axis=1)
+        self._assignments.flush()
+        self.trained_count = self.count
+        self._lists = None
+        self.logger.info(f"Trained IVF index with {nlist} lists on {len(sample_rows)} vectors: {self.index_dir}")
+
+    def _inverted_lists(self) -> List[np.ndarray]:
+        if self._lists is None:
+            assignments = np.asarray(self._assignments[:self.count])
+            order = np.argsort(assignments, kind="stable")
+            bounds = np.searchsorted(assignments[order], np.arange(len(self._centroids) + 1))
+            self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self._centroids))]
+        return self._lists
+
+    def add(self, vectors: List[List[float]], texts: List[str], metadatas: List[dict],
+            ids: List[str]) -> List[str]:
+        with self._lock, file_lock(self._path(LOCK_FILE_NAME)):
+            # rows are allocated from the count the last writer saved
+            self._refresh_if_stale()
+            matrix = _normalize(np.asarray(vectors, dtype=np.float32))
+            if self.dimension is None:
+                self.dimension = matrix.shape[1]
+            elif matrix.shape[1] != self.dimension:
+                raise ValueError(f"Expected vectors of dimension {self.dimension}, got {matrix.shape[1]}")
+
+            # upserts replace the previous row for the same id
+            self._delete(ids)
+
+            start = self.count
+            self._grow(start + len(matrix))
+            end = start + len(matrix)
+            self._vectors[start:end] = matrix
+            if self._centroids is not None:
+                self._assignments[start:end] = np.argmax(matrix @ self._centroids.T, axis=1)
+            self._vectors.flush()
+            self._assignments.flush()
+
+            self._docstore.executemany(
+                "INSERT OR REPLACE INTO docs (row, id, text, metadata, live) VALUES (?, ?, ?, ?, 1)",
+                [(start + offset, doc_id, text, json.dumps(metadata))
+                 for offset, (doc_id, text, metadata) in enumerate(zip(ids, texts, metadatas))]
+            )
+            self._docstore.commit()
+            self.count = end
+            self._lists = None
+            self._filter_rows_cache = {}
+
+            if self._should_train():
+                self._train()
+            self._save_meta()
+            return ids
+
+    def delete(self, ids: List[str]) -> int:
+        if not ids:
+            return 0
+        with self._lock, file_lock(self._path(LOCK_FILE_NAME)):
+            self._refresh_if_stale()
+            return self._delete(ids)
+
+    def _delete(self, ids: List[str]) -> int:
+        with self._lock:
+            if not ids:
+                return 0
+            placeholders = ",".join("?" * len(ids))
+            rows = [row for (row,) in self._docstore.execute(
+                f"SELECT row FROM docs WHERE live = 1 AND id IN ({placeholders})", ids)]
+            if rows:
+                self._deleted[rows] = True
+                self._docstore.execute(f"UPDATE docs SET live = 0, id = NULL WHERE row IN "
+                                       f"({','.join('?' * len(rows))})", rows)
+                self._docstore.commit()
+                self._filter_rows_cache = {}
+                self._save_meta()
+            return len(rows)
+
+    def _candidate_rows(self, query: np.ndarray) -> Optional[np.ndarray]:
+        if self._centroids is None:
+            return None
+        nprobe = min(self.config.nprobe, len(self._centroids))
+        probes = np.argpartition(-(self._centroids @ query), nprobe - 1)[:nprobe]
+        lists = self._inverted_lists()
+        return np.concatenate([lists[list_id] for list_id in probes])
+
+    def _filter_rows(self, filter: dict) -> np.ndarray:
+        """Live rows whose metadata matches ``filter``, selected in the docstore and cached until the index changes."""
+        key = json.dumps(filter, sort_keys=True)
+        rows = self._filter_rows_cache.get(key)
+        if rows is None:
+            where, parameters = _filter_sql(filter)
+            rows = np.array([row for (row,) in self._docstore.execute(
+                f"SELECT row FROM docs WHERE live = 1 AND {where} ORDER BY row", parameters)], dtype=np.int64)
+            # rows another process committed but has not yet published in meta.json
+            rows = rows[rows < self.count]
+            if len(self._filter_rows_cache) >= FILTER_CACHE_SIZE:
+                self._filter_rows_cache.clear()
+            self._filter_rows_cache[key] = rows
+        return rows
+
+    def search(self, embedding: List[float], k: int, filter: Optional[dict] = None,
+               include_vectors: bool = False) -> List[Tuple[Document, float, Optional[np.ndarray]]]:
+        """
+        Returns up to ``k`` (document, cosine similarity, vector) tuples, best first.
+
+        A metadata ``filter`` selects the matching rows before ranking, so a small scope
+        is never crowded out of the top ``k`` by the rest of the index. With IVF only the
+        matching rows of the probed lists are scored, unless they are fewer than ``k``;
+        then every matching row is.
+        """
+        with self._lock:
+            self._refresh_if_stale()
+            if not self.count:
+                return []
+
+            query = _normalize(np.asarray(embedding, dtype=np.float32))
+            rows = self._candidate_rows(query)
+            if filter:
+                matching = self._filter_rows(filter)
+                if rows is not None:
+                    rows = np.intersect1d(rows, matching, assume_unique=True)
+                if rows is None or len(rows) < k:
+                    rows = matching
+            if rows is None:
+                scores = self._vectors[:self.count] @ query
+                rows = np.arange(self.count)
+            else:
+                scores = self._vectors[rows] @ query
+            live = ~self._deleted[rows]
+            rows, scores = rows[live], scores[live]
+
+            if len(rows) > k:
+                top = np.argpartition(-scores, k - 1)[:k]
+                rows, scores = rows[top], scores[top]
+            order = np.argsort(-scores, kind="stable")
+            rows, scores = rows[order], scores[order]
+
+            results = []
+            records = self._fetch_records(rows.tolist())
+            for row, score in zip(rows.tolist(), scores.tolist()):
+                _, text, metadata = records[row]
+                vector = np.array(self._vectors[row]) if include_vectors else None
+                results.append((Document(page_content=text, metadata=metadata), score, vector))
+            return results
+
+    def _fetch_records(self, rows: List[int]) -> Dict[int, Tuple[str, str, dict]]:
+        if not rows:
+            return {}
+        records = {}
+        for start in range(0, len(rows), 900):
+            batch = rows[start:start + 900]
+            for row, doc_id, text, metadata in self._docstore.execute(
+                    f"SELECT row, id, text, metadata FROM docs WHERE row IN ({','.join('?' * len(batch))})",
+                    batch):
+                records[row] = (doc_id, text, json.loads(metadata))
+        return records
+
+
+class MemoryIndex:
+    """
+    Flat, non-persistent index with the same add/delete/search interface as
+    :class:`LocalIndex`. Used by the "memory" backend for tests and benchmarks.
+    """
+
+    def __init__(self, initial_capacity: int = 1_024):
+        self._lock = threading.RLock()
+        self.initial_capacity = initial_capacity
+        self.dimension: Optional[int] = None
+        self.count: int = 0
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._deleted = np.zeros(0, dtype=bool)
+        self._records: List[Optional[Tuple[str, str, dict]]] = []
+        self._rows: Dict[str, int] = {}
+
+    @property
+    def kind(self) -> str:
+        return "memory"
+
+    def _grow(self, required: int):
+        if required <= len(self._vectors):
+            return
+        capacity = max(required, 2 * len(self._vectors), self.initial_capacity)
+        vectors = np.zeros((capacity, self.dimension), dtype=np.float32)
+        deleted = np.zeros(capacity, dtype=bool)
+        if self.count:
+            vectors[:self.count] = self._vectors[:self.count]
+            deleted[:self.count] = self._deleted[:self.count]
+        self._vectors, self._deleted = vectors, deleted
+
+    def add(self, vectors: List[List[float]], texts: List[str], metadatas: List[dict],
+            ids: List[str]) -> List[str]:
+        with self._lock:
+            matrix = _normalize(np.asarray(vectors, dtype=np.float32))
+            if self.dimension is None:
+                self.dimension = matrix.shape[1]
+            elif matrix.shape[1] != self.dimension:
+                raise ValueError(f"Expected vectors of dimension {self.dimension}, got {matrix.shape[1]}")
+
+            self.delete(ids)
+            start = self.count
+            self._grow(start + len(matrix))
+            self._vectors[start:start + len(matrix)] = matrix
+            for offset, (doc_id, text, metadata) in enumerate(zip(ids, texts, metadatas)):
+                self._records.append((doc_id, text, metadata))
+                self._rows[doc_id] = start + offset
+            self.count = start + len(matrix)
+            return ids
+
+    def delete(self, ids: List[str]) -> int:
+        with self._lock:
+            rows = [self._rows.pop(doc_id) for doc_id in ids or [] if doc_id in self._rows]
+            for row in rows:
+                self._deleted[row] = True
+                self._records[row] = None
+            return len(rows)
+
+    def search(self, embedding: List[float], k: int, filter: Optional[dict] = None,
+               include_vectors: bool = False) -> List[Tuple[Document, float, Optional[np.ndarray]]]:
+        with self._lock:
+            if not self.count:
+                return []
+            query = _normalize(np.asarray(embedding, dtype=np.float32))
+            scores = self._vectors[:self.count] @ query
+            scores[self._deleted[:self.count]] = -np.inf
+            if filter or self.count <= k:
+                order = np.argsort(-scores, kind="stable")
+            else:
+                top = np.argpartition(-scores, k - 1)[:k]
+                order = top[np.argsort(-scores[top], kind="stable")]
+
+            results = []
+            for row in order.tolist():
+                if scores[row] == -np.inf:
+                    break
+                _, text, metadata = self._records[row]
+                if not matches_filter(metadata, filter):
+                    continue
+                vector = self._vectors[row].copy() if include_vectors else None
+                results.append((Document(page_content=text, metadata=dict(metadata)), float(scores[row]), vector))
+                if len(results) == k:
+                    break
+            return results
+
+
+class LocalVectorStore(LangchainVectorStore):
+    """
+    LangChain vector store backed by a :class:`LocalIndex` (or a :class:`MemoryIndex`),
+    a drop-in for ``PineconeVectorStore``.
+    """
+
+    def __init__(self, local_index: Union[LocalIndex, MemoryIndex], embedding: Embeddings):
+        self.local_index = local_index
+        self._embedding = embedding
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        try:
+            texts = list(texts)
+            metadatas = metadatas or [{} for _ in texts]
+            ids = ids or [str(uuid.uuid4()) for _ in texts]
+            vectors = self._embedding.embed_documents(texts)
+            return self.local_index.add(vectors, texts, metadatas, ids)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        try:
+            self.local_index.delete(ids or [])
+            return True
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4,
+                                               filter: Optional[dict] = None,
+                                               **kwargs: Any) -> List[Tuple[Document, float]]:
+        return [(doc, score) for doc, score, _ in self.local_index.search(embedding, k, filter=filter)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: Optional[dict] = None,
+                                     **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self._embedding.embed_query(query), k, filter=filter)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4,
+                                    filter: Optional[dict] = None, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, filter=filter)]
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[dict] = None,
+                          **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter=filter)]
+
+    def similarity_search_with_vectors(self, embedding: List[float], k: int = 4,
+                                       filter: Optional[dict] = None) -> Tuple[List[Document], np.ndarray]:
+        """Returns the ``k`` nearest documents and their stored vectors as one (k, dimension) matrix."""
+        candidates = self.local_index.search(embedding, k, filter=filter, include_vectors=True)
+        if not candidates:
+            return [], np.zeros((0, len(embedding)), dtype=np.float32)
+        return [document for document, _, _ in candidates], np.stack([vector for _, _, vector in candidates])
+
+    def max_marginal_relevance_search_by_vector(self, embedding: List[float], k: int = 4,
+                                                fetch_k: int = 20, lambda_mult: float = 0.5,
+                                                filter: Optional[dict] = None,
+                                                **kwargs: Any) -> List[Document]:
+        documents, vectors = self.similarity_search_with_vectors(embedding, fetch_k, filter=filter)
+        return [documents[i] for i in maximal_marginal_relevance(embedding, vectors, k=k, lambda_mult=lambda_mult)]
+
+    def max_marginal_relevance_search(self, query: str, k: int = 4, fetch_k: int = 20,
+                                      lambda_mult: float = 0.5, filter: Optional[dict] = None,
+                                      **kwargs: Any) -> List[Document]:
+        return self.max_marginal_relevance_search_by_vector(self._embedding.embed_query(query), k=k,
+                                                            fetch_k=fetch_k, lambda_mult=lambda_mult,
+                                                            filter=filter)
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        # scores are cosine similarities in [-1, 1]
+        return lambda score: (score + 1.0) / 2.0
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   index_dir: Optional[str] = None, **kwargs: Any) -> "LocalVectorStore":
+        config = LocalVectorIndexConfig()
+        local_index = LocalIndex.open(index_dir or os.path.join(config.index_root_dir, "default"), config)
+        vector_store = cls(local_index, embedding)
+        vector_store.add_texts(texts, metadatas=metadatas, **kwargs)
+        return vector_store
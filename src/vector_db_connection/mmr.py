@@ -0,0 +1,43 @@
+from typing import List, Sequence, Union
+
+import numpy as np
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def maximal_marginal_relevance(query_embedding: Union[np.ndarray, Sequence[float]],
+                               candidate_embeddings: Union[np.ndarray, Sequence[Sequence[float]]],
+                               k: int = 4,
+                               lambda_mult: float = 0.5) -> List[int]:
+    """
+    Indices of the ``k`` candidates chosen by maximal marginal relevance, in selection order.
+
+    Selects the same candidates as ``langchain_community``'s implementation, but the
+    relevance of every candidate is one matrix-vector product and each pick updates a
+    running "most similar selected document" array with a single row of similarities,
+    instead of recomputing the similarity to every selected document on each step.
+    """
+    candidates = np.asarray(candidate_embeddings, dtype=np.float32)
+    if candidates.ndim != 2 or not len(candidates) or k <= 0:
+        return []
+    candidates = normalize(candidates)
+    query = normalize(np.asarray(query_embedding, dtype=np.float32).reshape(-1))
+    relevance = candidates @ query
+
+    best = int(np.argmax(relevance))
+    selected = [best]
+    redundancy = candidates @ candidates[best]
+    available = np.ones(len(candidates), dtype=bool)
+    available[best] = False
+    for _ in range(min(k, len(candidates)) - 1):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(redundancy, candidates @ candidates[best], out=redundancy)
+    return selected
@@ -0,0 +1,48 @@
+import io
+import os
+
+# must be set before src is imported: the backend and cache settings are read at import time
+os.environ["VECTOR_STORE_BACKEND"] = "memory"
+os.environ["ANSWER_CACHE_ENABLED"] = "false"
+os.environ.setdefault("OPENAI_API_KEY", "offline-test")
+
+import pytest  # noqa: E402
+from starlette.testclient import TestClient  # noqa: E402
+
+import api  # noqa: E402
+from benchmarks.fakes import FakeEmbeddings  # noqa: E402
+from src.pipeline.qa_pipeline import QAPipeline  # noqa: E402
+from src.utils.registry import resource_registry  # noqa: E402
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # uploads, registries and record managers live under the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(QAPipeline, "embedding_function", FakeEmbeddings())
+    for prefix in ("memory-index", "memory-record-manager", "memory-lexical-index"):
+        resource_registry.invalidate(prefix=prefix)
+    with TestClient(api.app) as test_client:
+        yield test_client
+
+
+def test_ingest_upload(client):
+    csv_bytes = b"colour,thing\n" + b"blue,sky\n" * 20
+    response = client.post("/ingest", files={"files": ("colours.csv", io.BytesIO(csv_bytes))})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["ingested"] == ["colours.csv"]
+    assert body["document_ids"]
+
+
+def test_ingest_without_files(client):
+    response = client.post("/ingest", data={"namespace": "team"})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("path", ["/ask", "/ask/stream"])
+@pytest.mark.parametrize("document_ids", ["doc", [1], {"id": "doc"}])
+def test_ask_rejects_invalid_document_ids(client, path, document_ids):
+    response = client.post(path, json={"question": "What colour is the sky?", "document_ids": document_ids})
+    assert response.status_code == 400
+    assert response.json() == {"error": "document_ids must be a list of strings"}